@@ -0,0 +1,62 @@
+"""add analytics rollups
+
+Revision ID: 20261017000004
+Revises: 20261017000003
+Create Date: 2026-10-17 00:00:04.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261017000004'
+down_revision = '20261017000003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'analytics_daily_totals',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('purchases', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('reviews_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('day')
+    )
+    op.create_table(
+        'category_analytics_daily',
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('views', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('purchases', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Float(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.PrimaryKeyConstraint('category_id', 'day')
+    )
+    op.create_index('ix_category_analytics_daily_day', 'category_analytics_daily', ['day'])
+
+    # Заполняем итоги по уже накопленной статистике
+    op.execute(
+        "INSERT INTO analytics_daily_totals "
+        "(day, views, purchases, revenue, reviews_count, rating_sum, rating_count) "
+        "SELECT day, COALESCE(SUM(views), 0), COALESCE(SUM(purchases), 0), COALESCE(SUM(revenue), 0), "
+        "COALESCE(SUM(reviews_count), 0), COALESCE(SUM(avg_rating), 0), COUNT(avg_rating) "
+        "FROM bot_analytics GROUP BY day"
+    )
+    op.execute(
+        "INSERT INTO category_analytics_daily (category_id, day, views, purchases, revenue) "
+        "SELECT b.category_id, a.day, COALESCE(SUM(a.views), 0), COALESCE(SUM(a.purchases), 0), "
+        "COALESCE(SUM(a.revenue), 0) "
+        "FROM bot_analytics a JOIN bots b ON b.id = a.bot_id "
+        "WHERE b.category_id IS NOT NULL GROUP BY b.category_id, a.day"
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_category_analytics_daily_day', 'category_analytics_daily')
+    op.drop_table('category_analytics_daily')
+    op.drop_table('analytics_daily_totals')
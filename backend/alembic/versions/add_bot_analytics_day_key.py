@@ -0,0 +1,43 @@
+"""add bot analytics day key
+
+Revision ID: 20261017000003
+Revises: 20261017000002
+Create Date: 2026-10-17 00:00:03.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261017000003'
+down_revision = '20261017000002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('bot_analytics', sa.Column('day', sa.Date(), nullable=True))
+    op.execute("UPDATE bot_analytics SET day = DATE(date), date = DATE(date)")
+
+    # Строки одного бота за один день (появлялись при параллельных обновлениях) сливаем в первую
+    op.execute(
+        "UPDATE bot_analytics b JOIN ("
+        "SELECT MIN(id) AS id, SUM(views) AS views, SUM(purchases) AS purchases, SUM(revenue) AS revenue "
+        "FROM bot_analytics GROUP BY bot_id, day HAVING COUNT(*) > 1"
+        ") d ON b.id = d.id "
+        "SET b.views = d.views, b.purchases = d.purchases, b.revenue = d.revenue"
+    )
+    op.execute(
+        "DELETE b FROM bot_analytics b "
+        "JOIN bot_analytics k ON b.bot_id = k.bot_id AND b.day = k.day AND b.id > k.id"
+    )
+
+    op.alter_column('bot_analytics', 'day', existing_type=sa.Date(), nullable=False)
+    op.create_index('ix_bot_analytics_day', 'bot_analytics', ['day'])
+    op.create_unique_constraint('uq_bot_analytics_bot_day', 'bot_analytics', ['bot_id', 'day'])
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_bot_analytics_bot_day', 'bot_analytics', type_='unique')
+    op.drop_index('ix_bot_analytics_day', 'bot_analytics')
+    op.drop_column('bot_analytics', 'day')
@@ -0,0 +1,24 @@
+"""add bot rating
+
+Revision ID: 20261017000000
+Revises: 20240319000000
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261017000000'
+down_revision = '20240319000000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Средний рейтинг бота по отзывам (используется в рекомендациях)
+    op.add_column('bots', sa.Column('rating', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('bots', 'rating')
@@ -0,0 +1,38 @@
+"""add list sort indexes
+
+Revision ID: 20261017000006
+Revises: 20261017000005
+Create Date: 2026-10-17 00:00:06.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261017000006'
+down_revision = '20261017000005'
+branch_labels = None
+depends_on = None
+
+# Столбцы сортировки списков: постраничный вывод по ключу идет по этим индексам
+INDEXES = [
+    ('users', 'created_at'),
+    ('users', 'username'),
+    ('categories', 'created_at'),
+    ('bots', 'price'),
+    ('bots', 'rating'),
+    ('bots', 'created_at'),
+    ('purchases', 'price'),
+    ('purchases', 'created_at'),
+    ('bug_reports', 'created_at'),
+    ('changelog', 'created_at'),
+]
+
+
+def upgrade() -> None:
+    for table, column in INDEXES:
+        op.create_index(f'ix_{table}_{column}', table, [column])
+
+
+def downgrade() -> None:
+    for table, column in reversed(INDEXES):
+        op.drop_index(f'ix_{table}_{column}', table)
@@ -0,0 +1,33 @@
+"""add user preferences unique key
+
+Revision ID: 20261017000002
+Revises: 20261017000001
+Create Date: 2026-10-17 00:00:02.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '20261017000002'
+down_revision = '20261017000001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Дубликаты могли появиться при параллельных обновлениях: оставляем первую запись
+    op.execute(
+        "DELETE p1 FROM user_preferences p1 "
+        "JOIN user_preferences p2 ON p1.user_id = p2.user_id "
+        "AND p1.category_id = p2.category_id AND p1.id > p2.id"
+    )
+    # Одна запись на пару пользователь/категория (ключ пакетного upsert)
+    op.create_unique_constraint(
+        'uq_user_preferences_user_category',
+        'user_preferences',
+        ['user_id', 'category_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_user_preferences_user_category', 'user_preferences', type_='unique')
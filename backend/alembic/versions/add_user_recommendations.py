@@ -0,0 +1,31 @@
+"""add user recommendations
+
+Revision ID: 20261017000001
+Revises: 20261017000000
+Create Date: 2026-10-17 00:00:01.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261017000001'
+down_revision = '20261017000000'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Результаты пакетного расчета рекомендаций
+    op.create_table(
+        'user_recommendations',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('bot_ids', sa.JSON(), nullable=False),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('user_recommendations')
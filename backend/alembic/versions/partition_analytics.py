@@ -0,0 +1,61 @@
+"""partition analytics by month
+
+Revision ID: 20261017000005
+Revises: 20261017000004
+Create Date: 2026-10-17 00:00:05.000000
+
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '20261017000005'
+down_revision = '20261017000004'
+branch_labels = None
+depends_on = None
+
+# Секции, создаваемые заранее; дальше их добавляет services/analytics_partitions.py
+MONTHS_AHEAD = 3
+
+
+def _add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+
+    # Секционированные таблицы InnoDB не поддерживают внешние ключи
+    for foreign_key in sa.inspect(bind).get_foreign_keys('analytics'):
+        op.drop_constraint(foreign_key['name'], 'analytics', type_='foreignkey')
+
+    # Ключ секционирования должен входить в первичный ключ
+    op.execute("UPDATE analytics SET created_at = UTC_TIMESTAMP() WHERE created_at IS NULL")
+    op.alter_column('analytics', 'created_at', existing_type=sa.DateTime(), nullable=False)
+    op.execute("ALTER TABLE analytics DROP PRIMARY KEY, ADD PRIMARY KEY (id, created_at)")
+    op.create_index('ix_analytics_user_created', 'analytics', ['user_id', 'created_at'])
+
+    # Секция на каждый месяц от самого старого события до MONTHS_AHEAD вперед
+    today = datetime.utcnow().date()
+    oldest = bind.execute(sa.text("SELECT MIN(created_at) FROM analytics")).scalar()
+    month = date(oldest.year, oldest.month, 1) if oldest else date(today.year, today.month, 1)
+    last = _add_months(date(today.year, today.month, 1), MONTHS_AHEAD)
+    clauses = []
+    while month <= last:
+        clauses.append(
+            f"PARTITION p{month.year:04d}{month.month:02d} "
+            f"VALUES LESS THAN (TO_DAYS('{_add_months(month, 1).isoformat()}'))"
+        )
+        month = _add_months(month, 1)
+    clauses.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+    op.execute(f"ALTER TABLE analytics PARTITION BY RANGE (TO_DAYS(created_at)) ({', '.join(clauses)})")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE analytics REMOVE PARTITIONING")
+    op.drop_index('ix_analytics_user_created', 'analytics')
+    op.execute("ALTER TABLE analytics DROP PRIMARY KEY, ADD PRIMARY KEY (id)")
+    op.alter_column('analytics', 'created_at', existing_type=sa.DateTime(), nullable=True)
+    op.create_foreign_key('analytics_ibfk_1', 'analytics', 'users', ['user_id'], ['id'])
@@ -1,32 +1,67 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Dict, Any
 from datetime import datetime, timedelta
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..dependencies import get_current_admin_user
 from ..services.analytics_service import AnalyticsService
+from ..services.analytics_ingest import IngestQueueFull, get_analytics_ingestor
+from ..services.analytics_query import AnalyticsQueryError, get_analytics_query_engine
+from ..json_stream import JSONStreamError, JSONStreamTooLarge, iter_json_array, iter_ndjson
+from ..config import settings
 from ..schemas.analytics import (
     AnalyticsCreate,
-    AnalyticsResponse,
+    AnalyticsAccepted,
+    AnalyticsBulkResult,
     BotAnalyticsResponse,
-    AnalyticsSummary
+    AnalyticsSummary,
+    AnalyticsQueryRequest,
+    AnalyticsQueryResult
 )
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
-@router.post("/events/", response_model=AnalyticsResponse)
-async def track_event(
-    event: AnalyticsCreate,
-    db: Session = Depends(get_db)
+@router.post("/events/", response_model=AnalyticsAccepted, status_code=202)
+async def track_event(event: AnalyticsCreate):
+    # Событие записывается фоновой задачей пакетом вместе с другими
+    try:
+        await get_analytics_ingestor().enqueue(event)
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    return AnalyticsAccepted(accepted=1)
+
+@router.post("/events/bulk", response_model=AnalyticsBulkResult)
+async def track_events_bulk(
+    request: Request,
+    db: AsyncSession = Depends(get_db)
 ):
+    # JSON-массив или NDJSON (application/x-ndjson); тело читается потоком
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = iter_ndjson(request.stream(), settings.ANALYTICS_BULK_MAX_ITEM_BYTES)
+    else:
+        items = iter_json_array(request.stream(), settings.ANALYTICS_BULK_MAX_ITEM_BYTES)
+
     analytics_service = AnalyticsService(db)
-    return await analytics_service.track_event(event)
+    try:
+        return await analytics_service.track_events_bulk(items)
+    except JSONStreamTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except JSONStreamError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/events/stats/")
+async def get_ingest_stats(
+    current_user = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    return get_analytics_ingestor().stats()
 
 @router.get("/bots/{bot_id}/", response_model=List[BotAnalyticsResponse])
 async def get_bot_analytics(
     bot_id: int,
     start_date: datetime,
     end_date: datetime,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     analytics_service = AnalyticsService(db)
     return await analytics_service.get_bot_analytics(bot_id, start_date, end_date)
@@ -34,7 +69,23 @@ async def get_bot_analytics(
 @router.get("/summary/", response_model=AnalyticsSummary)
 async def get_analytics_summary(
     days: int = 30,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     analytics_service = AnalyticsService(db)
-    return await analytics_service.get_analytics_summary(days) 
\ No newline at end of file
+    return await analytics_service.get_analytics_summary(days)
+
+@router.post("/query", response_model=AnalyticsQueryResult)
+async def run_analytics_query(
+    query: AnalyticsQueryRequest,
+    current_user = Depends(get_current_admin_user)
+):
+    # Отчет строится по выгрузке в Parquet, без нагрузки на MySQL
+    try:
+        return await get_analytics_query_engine().run_report(
+            query.report,
+            query.start_date,
+            query.end_date,
+            query.limit
+        )
+    except AnalyticsQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
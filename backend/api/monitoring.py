@@ -1,8 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional
 from datetime import datetime
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..services.monitoring_service import MonitoringService
 from ..schemas.monitoring import (
     MetricCreate,
@@ -19,7 +19,7 @@ router = APIRouter(prefix="/monitoring", tags=["monitoring"])
 @router.post("/metrics/", response_model=MetricResponse)
 async def record_metric(
     metric: MetricCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.record_metric(metric)
@@ -29,7 +29,7 @@ async def get_metrics(
     name: Optional[str] = None,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.get_metrics(name, start_time, end_time)
@@ -37,7 +37,7 @@ async def get_metrics(
 @router.post("/alerts/", response_model=AlertResponse)
 async def create_alert(
     alert: AlertCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.create_alert(alert)
@@ -46,7 +46,7 @@ async def create_alert(
 async def update_alert(
     alert_id: int,
     alert_update: AlertUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     monitoring_service = MonitoringService(db)
     try:
@@ -58,7 +58,7 @@ async def update_alert(
 async def get_alerts(
     status: Optional[str] = None,
     severity: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.get_alerts(status, severity)
@@ -68,12 +68,12 @@ async def get_alert_history(
     alert_id: int,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.get_alert_history(alert_id, start_time, end_time)
 
 @router.get("/summary/", response_model=MonitoringSummary)
-async def get_monitoring_summary(db: Session = Depends(get_db)):
+async def get_monitoring_summary(db: AsyncSession = Depends(get_read_db)):
     monitoring_service = MonitoringService(db)
     return await monitoring_service.get_monitoring_summary() 
\ No newline at end of file
@@ -17,6 +17,11 @@ class Settings(BaseSettings):
     MYSQL_PASSWORD: str = os.getenv("MYSQL_PASSWORD", "1234")
     MYSQL_HOST: str = os.getenv("MYSQL_HOST", "mysql")
     MYSQL_PORT: int = int(os.getenv("MYSQL_PORT", "3306"))
+    DB_REPLICA_HOSTS: str = os.getenv("DB_REPLICA_HOSTS", "")  # Реплики для чтения через запятую (host или host:port), пусто - только основная база
+    DB_REPLICA_POOL_SIZE: int = int(os.getenv("DB_REPLICA_POOL_SIZE", "10"))  # Соединений в пуле каждой реплики
+    DB_REPLICA_MAX_OVERFLOW: int = int(os.getenv("DB_REPLICA_MAX_OVERFLOW", "20"))
+    DB_REPLICA_HEALTH_CHECK_INTERVAL: float = float(os.getenv("DB_REPLICA_HEALTH_CHECK_INTERVAL", "5"))  # Проверка реплик и повтор после сбоя (секунды)
+    DB_REPLICA_MAX_LAG: int = int(os.getenv("DB_REPLICA_MAX_LAG", "0"))  # Допустимое отставание реплики (секунды, 0 - не проверять)
     
     # Настройки Redis
     REDIS_HOST: str = os.getenv("REDIS_HOST", "redis")
@@ -45,6 +50,16 @@ class Settings(BaseSettings):
     LOG_DIR: str = "logs/backend"
     LOG_FILE: str = "app.log"
     
+    # Поиск N+1 запросов: ленивые загрузки одной связи за HTTP-запрос
+    N_PLUS_ONE_DETECTION: bool = os.getenv("N_PLUS_ONE_DETECTION", str(os.getenv("ENVIRONMENT", "development") == "development")).lower() == "true"  # По умолчанию только в разработке
+    N_PLUS_ONE_THRESHOLD: int = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))  # Допустимо ленивых загрузок одной связи за запрос
+    N_PLUS_ONE_RAISE: bool = os.getenv("N_PLUS_ONE_RAISE", "false").lower() == "true"  # NPlusOneError вместо предупреждения в логе
+    
+    # Учет SQL-запросов каждого HTTP-запроса
+    SQL_SERVER_TIMING: bool = os.getenv("SQL_SERVER_TIMING", "true").lower() == "true"  # Заголовок Server-Timing с числом и временем запросов
+    SQL_SLOW_QUERY_THRESHOLD_MS: float = float(os.getenv("SQL_SLOW_QUERY_THRESHOLD_MS", "200"))  # Запросы дольше порога пишутся в лог (0 - выкл.)
+    SQL_SLOW_REQUEST_THRESHOLD_MS: float = float(os.getenv("SQL_SLOW_REQUEST_THRESHOLD_MS", "500"))  # HTTP-запросы с большим общим временем SQL пишутся в лог вместе с самым медленным запросом (0 - выкл.)
+    
     # Настройки безопасности
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key")
     ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
@@ -63,6 +78,72 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_CACHE_TTL: int = int(os.getenv("REDIS_CACHE_TTL", "3600"))  # Время жизни кэша в секундах
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))  # Размер общего пула соединений
+    
+    # Локальный (L1) кэш в памяти процесса перед Redis
+    CACHE_L1_ENABLED: bool = os.getenv("CACHE_L1_ENABLED", "true").lower() == "true"
+    CACHE_L1_MAX_BYTES: int = int(os.getenv("CACHE_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+    CACHE_L1_MAX_ITEMS: int = int(os.getenv("CACHE_L1_MAX_ITEMS", "10000"))
+    CACHE_L1_TTL: int = int(os.getenv("CACHE_L1_TTL", "60"))  # Максимальное время жизни записи в L1 (секунды)
+    
+    # Защита от одновременного пересчета (stampede) в get_or_compute
+    CACHE_LOCK_TIMEOUT: int = int(os.getenv("CACHE_LOCK_TIMEOUT", "30"))  # Время жизни блокировки пересчета (секунды)
+    CACHE_LOCK_WAIT_TIMEOUT: float = float(os.getenv("CACHE_LOCK_WAIT_TIMEOUT", "5"))  # Ожидание результата другого воркера
+    CACHE_COMPRESSION_THRESHOLD: int = int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "4096"))  # Сжатие значений больше N байт (0 - выкл.)
+    
+    # Движок расчета рекомендаций в памяти
+    SCORING_ENGINE_REFRESH_INTERVAL: int = int(os.getenv("SCORING_ENGINE_REFRESH_INTERVAL", "30"))  # Догрузка измененных ботов (секунды)
+    SCORING_ENGINE_FULL_RELOAD_INTERVAL: int = int(os.getenv("SCORING_ENGINE_FULL_RELOAD_INTERVAL", "600"))  # Полная перезагрузка каталога (секунды)
+    SIMILARITY_INDEX_REFRESH_INTERVAL: int = int(os.getenv("SIMILARITY_INDEX_REFRESH_INTERVAL", "60"))  # Догрузка измененных предпочтений (секунды)
+    SIMILARITY_INDEX_FULL_RELOAD_INTERVAL: int = int(os.getenv("SIMILARITY_INDEX_FULL_RELOAD_INTERVAL", "3600"))  # Полная перестройка индекса похожих пользователей (секунды)
+    SIMILARITY_INDEX_COMPACTION_THRESHOLD: int = int(os.getenv("SIMILARITY_INDEX_COMPACTION_THRESHOLD", "1000"))  # Размер оверлея до вливания в матрицу
+    SIMILARITY_INDEX_MAX_CANDIDATES: int = int(os.getenv("SIMILARITY_INDEX_MAX_CANDIDATES", "1000"))  # Кандидатов из одной категории при пакетном поиске похожих
+    
+    # Полнотекстовый поиск по каталогу (инвертированный индекс в памяти)
+    SEARCH_INDEX_REFRESH_INTERVAL: int = int(os.getenv("SEARCH_INDEX_REFRESH_INTERVAL", "30"))  # Догрузка измененных ботов (секунды)
+    SEARCH_INDEX_FULL_RELOAD_INTERVAL: int = int(os.getenv("SEARCH_INDEX_FULL_RELOAD_INTERVAL", "600"))  # Полная перестройка индекса (секунды)
+    SUGGEST_INDEX_REFRESH_INTERVAL: int = int(os.getenv("SUGGEST_INDEX_REFRESH_INTERVAL", "30"))  # Догрузка измененных названий для подсказок (секунды)
+    SUGGEST_INDEX_FULL_RELOAD_INTERVAL: int = int(os.getenv("SUGGEST_INDEX_FULL_RELOAD_INTERVAL", "600"))  # Полная перестройка индекса подсказок (секунды)
+    
+    # Пакетный расчет рекомендаций (вне запросов, в непиковое время)
+    RECOMMENDATIONS_PRECOMPUTE_ENABLED: bool = os.getenv("RECOMMENDATIONS_PRECOMPUTE_ENABLED", "false").lower() == "true"
+    RECOMMENDATIONS_PRECOMPUTE_HOUR: int = int(os.getenv("RECOMMENDATIONS_PRECOMPUTE_HOUR", "3"))  # Час запуска (UTC)
+    RECOMMENDATIONS_PRECOMPUTE_WORKERS: int = int(os.getenv("RECOMMENDATIONS_PRECOMPUTE_WORKERS", "2"))  # Процессы расчета (0 - в текущем процессе)
+    RECOMMENDATIONS_PRECOMPUTE_CHUNK_SIZE: int = int(os.getenv("RECOMMENDATIONS_PRECOMPUTE_CHUNK_SIZE", "1000"))  # Пользователей в пакете
+    RECOMMENDATIONS_PRECOMPUTE_LIMIT: int = int(os.getenv("RECOMMENDATIONS_PRECOMPUTE_LIMIT", "10"))  # Рекомендаций на пользователя
+    RECOMMENDATIONS_PRECOMPUTE_TTL: int = int(os.getenv("RECOMMENDATIONS_PRECOMPUTE_TTL", "93600"))  # Время жизни в кэше (секунды)
+    RECOMMENDATIONS_PRECOMPUTE_PERSIST: bool = os.getenv("RECOMMENDATIONS_PRECOMPUTE_PERSIST", "false").lower() == "true"  # Запись в user_recommendations и чтение при промахе кэша
+    
+    # Отложенная пакетная запись предпочтений пользователей (write-behind)
+    PREFERENCE_WRITE_BEHIND_ENABLED: bool = os.getenv("PREFERENCE_WRITE_BEHIND_ENABLED", "true").lower() == "true"
+    PREFERENCE_FLUSH_INTERVAL: float = float(os.getenv("PREFERENCE_FLUSH_INTERVAL", "5"))  # Период записи (секунды)
+    PREFERENCE_MAX_PENDING: int = int(os.getenv("PREFERENCE_MAX_PENDING", "10000"))  # Досрочная запись при N накопленных предпочтениях
+    
+    # Буферизованная запись событий аналитики
+    ANALYTICS_QUEUE_MAX_SIZE: int = int(os.getenv("ANALYTICS_QUEUE_MAX_SIZE", "10000"))  # Емкость очереди событий
+    ANALYTICS_BATCH_SIZE: int = int(os.getenv("ANALYTICS_BATCH_SIZE", "500"))  # Событий в одном INSERT
+    ANALYTICS_FLUSH_INTERVAL: float = float(os.getenv("ANALYTICS_FLUSH_INTERVAL", "1"))  # Максимальная задержка записи (секунды)
+    ANALYTICS_ENQUEUE_TIMEOUT: float = float(os.getenv("ANALYTICS_ENQUEUE_TIMEOUT", "0.5"))  # Ожидание места в очереди до ответа 503
+    ANALYTICS_BULK_MAX_EVENTS: int = int(os.getenv("ANALYTICS_BULK_MAX_EVENTS", "10000"))  # Событий в одном запросе /events/bulk
+    ANALYTICS_BULK_MAX_ITEM_BYTES: int = int(os.getenv("ANALYTICS_BULK_MAX_ITEM_BYTES", str(64 * 1024)))  # Размер одного события
+    BOT_ANALYTICS_REDIS_COUNTERS: bool = os.getenv("BOT_ANALYTICS_REDIS_COUNTERS", "false").lower() == "true"  # Счетчики ботов в Redis с периодическим сбросом
+    BOT_ANALYTICS_FLUSH_INTERVAL: float = float(os.getenv("BOT_ANALYTICS_FLUSH_INTERVAL", "5"))  # Период сброса счетчиков в bot_analytics (секунды)
+    ANALYTICS_SUMMARY_CACHE_TTL: int = int(os.getenv("ANALYTICS_SUMMARY_CACHE_TTL", "60"))  # Кэширование сводки аналитики (секунды)
+    ANALYTICS_UNIQUES_RETENTION_DAYS: int = int(os.getenv("ANALYTICS_UNIQUES_RETENTION_DAYS", "90"))  # Хранение дневных HyperLogLog уникальных пользователей
+    POPULAR_BOTS_RETENTION_DAYS: int = int(os.getenv("POPULAR_BOTS_RETENTION_DAYS", "90"))  # Хранение дневных рейтингов ботов в Redis
+    POPULAR_BOTS_WINDOW_DAYS: int = int(os.getenv("POPULAR_BOTS_WINDOW_DAYS", "30"))  # Окно оценки популярности ботов (дни)
+    POPULAR_BOTS_HALF_LIFE_DAYS: float = float(os.getenv("POPULAR_BOTS_HALF_LIFE_DAYS", "7"))  # Период полураспада вклада событий в популярность
+    POPULAR_BOTS_WINDOW_TTL: int = int(os.getenv("POPULAR_BOTS_WINDOW_TTL", "60"))  # Кэширование рейтинга за окно (секунды)
+    ANALYTICS_RETENTION_MONTHS: int = int(os.getenv("ANALYTICS_RETENTION_MONTHS", "12"))  # Срок хранения сырых событий (месяцы, 0 - без удаления)
+    ANALYTICS_PARTITIONS_AHEAD: int = int(os.getenv("ANALYTICS_PARTITIONS_AHEAD", "3"))  # Секции analytics, создаваемые заранее (месяцы)
+    ANALYTICS_ARCHIVE_DIR: str = os.getenv("ANALYTICS_ARCHIVE_DIR", "")  # Каталог архива удаляемых секций (пусто - секции не удаляются)
+    ANALYTICS_DROP_WITHOUT_ARCHIVE: bool = os.getenv("ANALYTICS_DROP_WITHOUT_ARCHIVE", "false").lower() == "true"  # Удалять устаревшие секции без архива
+    ANALYTICS_ARCHIVE_FORMAT: str = os.getenv("ANALYTICS_ARCHIVE_FORMAT", "parquet")  # Формат архива: parquet или csv
+    ANALYTICS_EXPORT_DIR: str = os.getenv("ANALYTICS_EXPORT_DIR", "data/analytics")  # Каталог выгрузки аналитики в Parquet
+    ANALYTICS_EXPORT_BATCH_SIZE: int = int(os.getenv("ANALYTICS_EXPORT_BATCH_SIZE", "10000"))  # Строк в пакете чтения при выгрузке
+    ANALYTICS_QUERY_THREADS: int = int(os.getenv("ANALYTICS_QUERY_THREADS", "2"))  # Потоков DuckDB на отчет
+    ANALYTICS_QUERY_MEMORY_LIMIT: str = os.getenv("ANALYTICS_QUERY_MEMORY_LIMIT", "1GB")  # Память DuckDB на отчет
+    ANALYTICS_QUERY_CONCURRENCY: int = int(os.getenv("ANALYTICS_QUERY_CONCURRENCY", "2"))  # Одновременных отчетов в процессе
     
     class Config:
         case_sensitive = True
@@ -1,151 +1,272 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import load_only, selectinload
 from . import models, schemas
-from typing import List, Optional
+from .services.scoring_engine import get_scoring_engine
+from .services.search_index import get_search_index
+from .services.name_suggest import get_name_suggest_index
+from .pagination import paginate
+from typing import List, Optional, Tuple
 from datetime import datetime
 
+# Допустимые порядки сортировки списков (имя параметра sort -> столбец)
+USER_SORTS = {"id": models.User.id, "created_at": models.User.created_at, "username": models.User.username}
+CATEGORY_SORTS = {"id": models.Category.id, "name": models.Category.name, "created_at": models.Category.created_at}
+BOT_SORTS = {
+    "id": models.Bot.id,
+    "name": models.Bot.name,
+    "price": models.Bot.price,
+    "rating": models.Bot.rating,
+    "created_at": models.Bot.created_at
+}
+# Столбцы бота, которые можно запросить параметром fields
+BOT_FIELDS = set(schemas.Bot.model_fields)
+PURCHASE_SORTS = {"id": models.Purchase.id, "created_at": models.Purchase.created_at, "price": models.Purchase.price}
+BUG_REPORT_SORTS = {"id": models.BugReport.id, "created_at": models.BugReport.created_at}
+CHANGELOG_SORTS = {"id": models.Changelog.id, "created_at": models.Changelog.created_at}
+
 # User CRUD
-def get_user(db: Session, user_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.id == user_id).first()
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.get(models.User, user_id)
 
-def get_user_by_telegram_id(db: Session, telegram_id: int) -> Optional[models.User]:
-    return db.query(models.User).filter(models.User.telegram_id == telegram_id).first()
+async def get_user_by_telegram_id(db: AsyncSession, telegram_id: int) -> Optional[models.User]:
+    result = await db.execute(select(models.User).where(models.User.telegram_id == telegram_id))
+    return result.scalars().first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 100) -> List[models.User]:
-    return db.query(models.User).offset(skip).limit(limit).all()
+async def get_users(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id"
+) -> Tuple[List[models.User], Optional[str]]:
+    return await paginate(db, select(models.User), models.User, USER_SORTS, sort, cursor, limit)
 
-def create_user(db: Session, user: schemas.UserCreate) -> models.User:
+async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User:
     db_user = models.User(**user.model_dump())
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user: schemas.UserUpdate) -> Optional[models.User]:
-    db_user = get_user(db, user_id)
+async def update_user(db: AsyncSession, user_id: int, user: schemas.UserUpdate) -> Optional[models.User]:
+    db_user = await get_user(db, user_id)
     if db_user:
         for key, value in user.model_dump().items():
             setattr(db_user, key, value)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
     return db_user
 
-def delete_user(db: Session, user_id: int) -> bool:
-    db_user = get_user(db, user_id)
+async def delete_user(db: AsyncSession, user_id: int) -> bool:
+    db_user = await get_user(db, user_id)
     if db_user:
-        db.delete(db_user)
-        db.commit()
+        await db.delete(db_user)
+        await db.commit()
         return True
     return False
 
 # Category CRUD
-def get_category(db: Session, category_id: int) -> Optional[models.Category]:
-    return db.query(models.Category).filter(models.Category.id == category_id).first()
+async def get_category(db: AsyncSession, category_id: int) -> Optional[models.Category]:
+    return await db.get(models.Category, category_id)
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[models.Category]:
-    return db.query(models.Category).offset(skip).limit(limit).all()
+async def get_categories(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id"
+) -> Tuple[List[models.Category], Optional[str]]:
+    return await paginate(db, select(models.Category), models.Category, CATEGORY_SORTS, sort, cursor, limit)
 
-def create_category(db: Session, category: schemas.CategoryCreate) -> models.Category:
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate) -> models.Category:
     db_category = models.Category(**category.model_dump())
     db.add(db_category)
-    db.commit()
-    db.refresh(db_category)
+    await db.commit()
+    await db.refresh(db_category)
+    get_name_suggest_index().upsert_category(db_category.id, db_category.name, db_category.is_active)
     return db_category
 
-def update_category(db: Session, category_id: int, category: schemas.CategoryUpdate) -> Optional[models.Category]:
-    db_category = get_category(db, category_id)
+async def update_category(db: AsyncSession, category_id: int, category: schemas.CategoryUpdate) -> Optional[models.Category]:
+    db_category = await get_category(db, category_id)
     if db_category:
         for key, value in category.model_dump().items():
             setattr(db_category, key, value)
-        db.commit()
-        db.refresh(db_category)
+        await db.commit()
+        await db.refresh(db_category)
+        get_name_suggest_index().upsert_category(db_category.id, db_category.name, db_category.is_active)
     return db_category
 
-def delete_category(db: Session, category_id: int) -> bool:
-    db_category = get_category(db, category_id)
+async def delete_category(db: AsyncSession, category_id: int) -> bool:
+    # Боты категории нужны ORM для обнуления category_id: загружаем их одним запросом
+    db_category = await db.get(models.Category, category_id, options=[selectinload(models.Category.bots)])
     if db_category:
-        db.delete(db_category)
-        db.commit()
+        await db.delete(db_category)
+        await db.commit()
+        get_name_suggest_index().remove_category(category_id)
         return True
     return False
 
 # Bot CRUD
-def get_bot(db: Session, bot_id: int) -> Optional[models.Bot]:
-    return db.query(models.Bot).filter(models.Bot.id == bot_id).first()
+async def get_bot(db: AsyncSession, bot_id: int) -> Optional[models.Bot]:
+    return await db.get(models.Bot, bot_id)
+
+async def get_bots(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id",
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    is_active: Optional[bool] = None,
+    min_rating: Optional[float] = None,
+    fields: Optional[List[str]] = None
+) -> Tuple[List[models.Bot], Optional[str]]:
+    """Страница каталога с фильтрами; fields - загружаемые столбцы (остальные не читаются)"""
+    query = select(models.Bot)
+    if category_id is not None:
+        query = query.where(models.Bot.category_id == category_id)
+    if min_price is not None:
+        query = query.where(models.Bot.price >= min_price)
+    if max_price is not None:
+        query = query.where(models.Bot.price <= max_price)
+    if is_active is not None:
+        query = query.where(models.Bot.is_active == is_active)
+    if min_rating is not None:
+        query = query.where(models.Bot.rating >= min_rating)
+
+    if fields:
+        unknown = set(fields) - BOT_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        # id и столбец сортировки нужны для курсора следующей страницы
+        columns = set(fields) | {"id", sort.lstrip("-")}
+        query = query.options(load_only(*[getattr(models.Bot, name) for name in columns if name in BOT_FIELDS]))
+
+    return await paginate(db, query, models.Bot, BOT_SORTS, sort, cursor, limit)
+
+async def search_bots(
+    db: AsyncSession,
+    query: str,
+    limit: int = 20,
+    category_id: Optional[int] = None
+) -> List[Tuple[models.Bot, float]]:
+    """Полнотекстовый поиск активных ботов: [(бот, оценка)] по убыванию релевантности"""
+    index = get_search_index()
+    await index.ensure_fresh(db)
+    hits = index.search(query, limit=limit, category_id=category_id)
+    if not hits:
+        return []
+    result = await db.execute(select(models.Bot).where(models.Bot.id.in_([bot_id for bot_id, _ in hits])))
+    bots = {bot.id: bot for bot in result.scalars()}
+    # Бот мог быть удален после последней загрузки индекса
+    return [(bots[bot_id], score) for bot_id, score in hits if bot_id in bots]
 
-def get_bots(db: Session, skip: int = 0, limit: int = 100) -> List[models.Bot]:
-    return db.query(models.Bot).offset(skip).limit(limit).all()
+async def suggest_names(db: AsyncSession, query: str, limit: int = 10) -> List[dict]:
+    """Подсказки по названиям ботов и категорий (из памяти, с учетом опечаток)"""
+    index = get_name_suggest_index()
+    await index.ensure_fresh(db)
+    return index.suggest(query, limit=limit)
 
-def create_bot(db: Session, bot: schemas.BotCreate) -> models.Bot:
+async def create_bot(db: AsyncSession, bot: schemas.BotCreate) -> models.Bot:
     db_bot = models.Bot(**bot.model_dump())
     db.add(db_bot)
-    db.commit()
-    db.refresh(db_bot)
+    await db.commit()
+    await db.refresh(db_bot)
+    get_scoring_engine().upsert_bot(db_bot.id, db_bot.category_id, db_bot.rating)
+    get_search_index().upsert_bot(db_bot.id, db_bot.name, db_bot.description, db_bot.category_id, db_bot.is_active)
+    get_name_suggest_index().upsert_bot(db_bot.id, db_bot.name, db_bot.category_id, db_bot.is_active)
     return db_bot
 
-def update_bot(db: Session, bot_id: int, bot: schemas.BotUpdate) -> Optional[models.Bot]:
-    db_bot = get_bot(db, bot_id)
+async def update_bot(db: AsyncSession, bot_id: int, bot: schemas.BotUpdate) -> Optional[models.Bot]:
+    db_bot = await get_bot(db, bot_id)
     if db_bot:
         for key, value in bot.model_dump().items():
             setattr(db_bot, key, value)
-        db.commit()
-        db.refresh(db_bot)
+        await db.commit()
+        await db.refresh(db_bot)
+        get_scoring_engine().upsert_bot(db_bot.id, db_bot.category_id, db_bot.rating)
+        get_search_index().upsert_bot(db_bot.id, db_bot.name, db_bot.description, db_bot.category_id, db_bot.is_active)
+        get_name_suggest_index().upsert_bot(db_bot.id, db_bot.name, db_bot.category_id, db_bot.is_active)
     return db_bot
 
-def delete_bot(db: Session, bot_id: int) -> bool:
-    db_bot = get_bot(db, bot_id)
+async def delete_bot(db: AsyncSession, bot_id: int) -> bool:
+    # Покупки и changelog бота нужны ORM для обнуления bot_id: по одному запросу на связь
+    db_bot = await db.get(
+        models.Bot,
+        bot_id,
+        options=[selectinload(models.Bot.purchases), selectinload(models.Bot.changelog)]
+    )
     if db_bot:
-        db.delete(db_bot)
-        db.commit()
+        await db.delete(db_bot)
+        await db.commit()
+        get_scoring_engine().remove_bot(bot_id)
+        get_search_index().remove_bot(bot_id)
+        get_name_suggest_index().remove_bot(bot_id)
         return True
     return False
 
 # Purchase CRUD
-def get_purchase(db: Session, purchase_id: int) -> Optional[models.Purchase]:
-    return db.query(models.Purchase).filter(models.Purchase.id == purchase_id).first()
+async def get_purchase(db: AsyncSession, purchase_id: int) -> Optional[models.Purchase]:
+    return await db.get(models.Purchase, purchase_id)
 
-def get_purchases(db: Session, skip: int = 0, limit: int = 100) -> List[models.Purchase]:
-    return db.query(models.Purchase).offset(skip).limit(limit).all()
+async def get_purchases(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id"
+) -> Tuple[List[models.Purchase], Optional[str]]:
+    return await paginate(db, select(models.Purchase), models.Purchase, PURCHASE_SORTS, sort, cursor, limit)
 
-def create_purchase(db: Session, purchase: schemas.PurchaseCreate) -> models.Purchase:
+async def create_purchase(db: AsyncSession, purchase: schemas.PurchaseCreate) -> models.Purchase:
     db_purchase = models.Purchase(**purchase.model_dump())
     db.add(db_purchase)
-    db.commit()
-    db.refresh(db_purchase)
+    await db.commit()
+    await db.refresh(db_purchase)
     return db_purchase
 
 # BugReport CRUD
-def get_bug_report(db: Session, bug_report_id: int) -> Optional[models.BugReport]:
-    return db.query(models.BugReport).filter(models.BugReport.id == bug_report_id).first()
+async def get_bug_report(db: AsyncSession, bug_report_id: int) -> Optional[models.BugReport]:
+    return await db.get(models.BugReport, bug_report_id)
 
-def get_bug_reports(db: Session, skip: int = 0, limit: int = 100) -> List[models.BugReport]:
-    return db.query(models.BugReport).offset(skip).limit(limit).all()
+async def get_bug_reports(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id"
+) -> Tuple[List[models.BugReport], Optional[str]]:
+    return await paginate(db, select(models.BugReport), models.BugReport, BUG_REPORT_SORTS, sort, cursor, limit)
 
-def create_bug_report(db: Session, bug_report: schemas.BugReportCreate) -> models.BugReport:
+async def create_bug_report(db: AsyncSession, bug_report: schemas.BugReportCreate) -> models.BugReport:
     db_bug_report = models.BugReport(**bug_report.model_dump())
     db.add(db_bug_report)
-    db.commit()
-    db.refresh(db_bug_report)
+    await db.commit()
+    await db.refresh(db_bug_report)
     return db_bug_report
 
-def update_bug_report(db: Session, bug_report_id: int, bug_report: schemas.BugReportUpdate) -> Optional[models.BugReport]:
-    db_bug_report = get_bug_report(db, bug_report_id)
+async def update_bug_report(db: AsyncSession, bug_report_id: int, bug_report: schemas.BugReportUpdate) -> Optional[models.BugReport]:
+    db_bug_report = await get_bug_report(db, bug_report_id)
     if db_bug_report:
         for key, value in bug_report.model_dump().items():
             setattr(db_bug_report, key, value)
-        db.commit()
-        db.refresh(db_bug_report)
+        await db.commit()
+        await db.refresh(db_bug_report)
     return db_bug_report
 
 # Changelog CRUD
-def get_changelog(db: Session, changelog_id: int) -> Optional[models.Changelog]:
-    return db.query(models.Changelog).filter(models.Changelog.id == changelog_id).first()
+async def get_changelog(db: AsyncSession, changelog_id: int) -> Optional[models.Changelog]:
+    return await db.get(models.Changelog, changelog_id)
 
-def get_changelogs(db: Session, skip: int = 0, limit: int = 100) -> List[models.Changelog]:
-    return db.query(models.Changelog).offset(skip).limit(limit).all()
+async def get_changelogs(
+    db: AsyncSession,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    sort: str = "id"
+) -> Tuple[List[models.Changelog], Optional[str]]:
+    return await paginate(db, select(models.Changelog), models.Changelog, CHANGELOG_SORTS, sort, cursor, limit)
 
-def create_changelog(db: Session, changelog: schemas.ChangelogCreate) -> models.Changelog:
+async def create_changelog(db: AsyncSession, changelog: schemas.ChangelogCreate) -> models.Changelog:
     db_changelog = models.Changelog(**changelog.model_dump())
     db.add(db_changelog)
-    db.commit()
-    db.refresh(db_changelog)
-    return db_changelog 
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_changelog)
+    return db_changelog
\ No newline at end of file
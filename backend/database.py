@@ -1,8 +1,13 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from typing import AsyncGenerator
 import os
 from dotenv import load_dotenv
+from .config import settings
+from .db_routing import ReplicaPool, RoutingSession
+from .query_stats import instrument_engine
 
 # Загрузка переменных окружения
 load_dotenv()
@@ -10,7 +15,10 @@ load_dotenv()
 # Создание URL для подключения к базе данных
 SQLALCHEMY_DATABASE_URL = f"mysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}"
 
-# Создание движка базы данных
+# URL для асинхронного драйвера (aiomysql)
+SQLALCHEMY_ASYNC_DATABASE_URL = f"mysql+aiomysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{os.getenv('MYSQL_HOST')}/{os.getenv('MYSQL_DATABASE')}"
+
+# Создание движка базы данных (миграции, init_db, фоновые задачи)
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     pool_pre_ping=True,
@@ -19,16 +27,77 @@ engine = create_engine(
     max_overflow=10
 )
 
+# Асинхронный движок для обработки запросов API
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+    pool_size=int(os.getenv("DB_POOL_SIZE", "20")),
+    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "30"))
+)
+
+# Реплики для чтения (DB_REPLICA_HOSTS): та же база и учетная запись на других хостах
+replica_pool = ReplicaPool([
+    create_async_engine(
+        f"mysql+aiomysql://{os.getenv('MYSQL_USER')}:{os.getenv('MYSQL_PASSWORD')}@{host.strip()}/{os.getenv('MYSQL_DATABASE')}",
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        pool_size=settings.DB_REPLICA_POOL_SIZE,
+        max_overflow=settings.DB_REPLICA_MAX_OVERFLOW
+    )
+    for host in settings.DB_REPLICA_HOSTS.split(",") if host.strip()
+])
+
+# Учет числа и времени SQL-запросов, журнал медленных запросов
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+for replica in replica_pool.engines:
+    instrument_engine(replica.sync_engine)
+
 # Создание сессии
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Создание асинхронной сессии.
+# expire_on_commit=False: после commit объекты остаются доступными для
+# сериализации без повторного запроса (ленивая загрузка в async недоступна)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    info={"replica_pool": replica_pool}
+)
+
+# Сессия для чтения: SELECT идут на реплики, запись и все запросы после нее - в основную базу.
+# Для данных, которые пользователь мог только что изменить, нужна AsyncSessionLocal
+# (реплика может отставать).
+ReadSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False,
+    info={"replica_pool": replica_pool, "read_replica": True}
+)
+
 # Создание базового класса для моделей
 Base = declarative_base()
 
 # Функция для получения сессии базы данных
-def get_db():
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Сессия для эндпоинтов только для чтения (каталог, отчеты)
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    async with ReadSessionLocal() as db:
+        yield db
+
+# Синхронная сессия для скриптов и фоновых задач вне event loop
+def get_sync_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
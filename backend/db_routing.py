@@ -0,0 +1,145 @@
+from typing import List, Optional, Union
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+import asyncio
+import logging
+import time
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class ReplicaPool:
+    """Реплики MySQL для чтения с проверкой доступности.
+
+    Реплика выбирается по кругу среди доступных. Недоступной она
+    становится при обрыве соединения во время запроса или при неудачной
+    периодической проверке (SELECT 1 и, если задан max_lag, отставание
+    репликации). Пока фоновая проверка не подтвердит восстановление,
+    реплика пропускается check_interval секунд, после чего снова
+    пробуется; если доступных реплик нет, чтение идет в основную базу.
+    """
+
+    def __init__(
+        self,
+        engines: List[AsyncEngine],
+        check_interval: Optional[float] = None,
+        max_lag: Optional[int] = None
+    ):
+        self.engines = engines
+        self.check_interval = (
+            settings.DB_REPLICA_HEALTH_CHECK_INTERVAL
+            if check_interval is None else check_interval
+        )
+        self.max_lag = settings.DB_REPLICA_MAX_LAG if max_lag is None else max_lag
+        # Время (monotonic), с которого реплика считается недоступной
+        self._down_since: List[Optional[float]] = [None] * len(engines)
+        self._next = 0
+        self._task: Optional[asyncio.Task] = None
+        for index, engine in enumerate(engines):
+            event.listen(engine.sync_engine, "handle_error", self._error_handler(index))
+
+    def __len__(self) -> int:
+        return len(self.engines)
+
+    def _error_handler(self, index: int):
+        def handle_error(context) -> None:
+            if context.is_disconnect:
+                self.mark_down(index, context.original_exception)
+        return handle_error
+
+    def is_available(self, index: int) -> bool:
+        down_since = self._down_since[index]
+        return down_since is None or time.monotonic() - down_since >= self.check_interval
+
+    def choose(self) -> Optional[AsyncEngine]:
+        """Следующая доступная реплика (None - читать из основной базы)"""
+        available = [engine for index, engine in enumerate(self.engines) if self.is_available(index)]
+        if not available:
+            return None
+        self._next = (self._next + 1) % len(available)
+        return available[self._next]
+
+    def mark_down(self, index: int, reason: object = None) -> None:
+        if self._down_since[index] is None:
+            logger.warning(f"Read replica {self.engines[index].url.host} is unavailable: {reason}")
+        self._down_since[index] = time.monotonic()
+
+    def mark_up(self, index: int) -> None:
+        if self._down_since[index] is not None:
+            logger.info(f"Read replica {self.engines[index].url.host} is available again")
+        self._down_since[index] = None
+
+    async def check(self) -> None:
+        """Проверка всех реплик"""
+        for index, engine in enumerate(self.engines):
+            try:
+                async with engine.connect() as connection:
+                    await connection.execute(text("SELECT 1"))
+                    if self.max_lag:
+                        lag = await self._replication_lag(connection)
+                        if lag is None or lag > self.max_lag:
+                            self.mark_down(index, f"replication lag {lag} s")
+                            continue
+                self.mark_up(index)
+            except Exception as e:
+                self.mark_down(index, e)
+
+    async def _replication_lag(self, connection) -> Optional[int]:
+        # NULL - репликация остановлена
+        row = (await connection.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+        if row is None:
+            return None
+        lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        return None if lag is None else int(lag)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_interval)
+            await self.check()
+
+    def start(self) -> None:
+        """Запуск периодической проверки реплик"""
+        if self._task is None and self.engines:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка проверки и закрытие соединений с репликами"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+
+def _is_read(clause) -> bool:
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+class RoutingSession(Session):
+    """Сессия, отправляющая чтение на реплики.
+
+    Реплики используются только сессиями с info["read_replica"] (get_read_db,
+    ReadSessionLocal). В них SELECT без FOR UPDATE идет на реплику из
+    info["replica_pool"], а запись, flush и прочие запросы - в основную
+    базу. После первой записи сессия закрепляется за основной базой до
+    конца, чтобы читать свои изменения (read-your-writes).
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        pool = self.info.get("replica_pool")
+        if pool and self.info.get("read_replica") and not self.info.get("use_primary"):
+            if not self._flushing and _is_read(clause):
+                replica = pool.choose()
+                if replica is not None:
+                    return replica.sync_engine
+            else:
+                self.info["use_primary"] = True
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+def use_primary(db: Union[AsyncSession, Session]) -> None:
+    """Все дальнейшие запросы сессии - в основную базу (чтение перед записью)"""
+    db.info["use_primary"] = True
@@ -1,17 +1,17 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from typing import Generator
-from . import crud, utils, exceptions
-from .database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncGenerator
+from . import crud, models, utils, exceptions
+from .database import get_db, AsyncSessionLocal
 from .config import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
 
-def get_current_user(
-    db: Session = Depends(get_db),
+async def get_current_user(
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> crud.User:
+) -> models.User:
     """Получение текущего пользователя"""
     payload = utils.verify_token(token)
     if payload is None:
@@ -21,35 +21,32 @@ def get_current_user(
     if user_id is None:
         raise exceptions.InvalidToken()
     
-    user = crud.get_user(db, user_id=user_id)
+    user = await crud.get_user(db, user_id=user_id)
     if user is None:
         raise exceptions.UserNotFound(user_id)
     
     return user
 
 def get_current_active_user(
-    current_user: crud.User = Depends(get_current_user)
-) -> crud.User:
+    current_user: models.User = Depends(get_current_user)
+) -> models.User:
     """Получение текущего активного пользователя"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 def get_current_admin_user(
-    current_user: crud.User = Depends(get_current_user)
-) -> crud.User:
+    current_user: models.User = Depends(get_current_user)
+) -> models.User:
     """Получение текущего администратора"""
     if current_user.role != "admin":
         raise exceptions.PermissionDenied()
     return current_user
 
-def get_db_session() -> Generator[Session, None, None]:
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
     """Получение сессии базы данных"""
-    db = get_db()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 def get_redis_client():
     """Получение клиента Redis"""
@@ -0,0 +1,163 @@
+import codecs
+import json
+import re
+from typing import Any, AsyncIterator, Optional
+
+class JSONStreamError(ValueError):
+    """Тело запроса не является корректным JSON-массивом или NDJSON"""
+
+class JSONStreamTooLarge(JSONStreamError):
+    """Элемент или тело запроса превышают допустимый размер"""
+
+_WHITESPACE = " \t\n\r"
+# Символы, меняющие вложенность, вне строки и внутри строки
+_STRUCTURE = re.compile(r'[{}\[\]"]')
+_STRING_END = re.compile(r'["\\]')
+
+def _loads_line(line: bytes, number: int, max_item_size: int) -> Any:
+    if len(line) > max_item_size:
+        raise JSONStreamTooLarge(f"Line {number} exceeds {max_item_size} bytes")
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        raise JSONStreamError(f"Invalid JSON on line {number}: {str(e)}")
+
+async def iter_ndjson(chunks: AsyncIterator[bytes], max_item_size: int) -> AsyncIterator[Any]:
+    """Разбор NDJSON по мере поступления данных: в памяти только незавершенная строка"""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        lines = (buffer + chunk).split(b"\n")
+        buffer = lines.pop()
+        for line in lines:
+            number += 1
+            if line.strip():
+                yield _loads_line(line, number, max_item_size)
+        if len(buffer) > max_item_size:
+            raise JSONStreamTooLarge(f"Line {number + 1} exceeds {max_item_size} bytes")
+    if buffer.strip():
+        yield _loads_line(buffer, number + 1, max_item_size)
+
+class _ObjectScanner:
+    """Поиск конца JSON-объекта по скобкам с учетом строк.
+
+    Состояние сохраняется между фрагментами, поэтому уже просмотренная
+    часть незавершенного элемента повторно не сканируется.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.offset = 0
+        self.depth = 0
+        self.in_string = False
+
+    def find_end(self, buffer: str, start: int) -> Optional[int]:
+        """Позиция после закрывающей скобки объекта или None, если он получен не целиком"""
+        i = start + self.offset
+        while True:
+            match = (_STRING_END if self.in_string else _STRUCTURE).search(buffer, i)
+            if match is None:
+                self.offset = len(buffer) - start
+                return None
+            i = match.start()
+            char = buffer[i]
+            if char == "\\":
+                if i + 1 == len(buffer):
+                    # Экранируемый символ еще не получен
+                    self.offset = i - start
+                    return None
+                i += 2
+                continue
+            if char == '"':
+                self.in_string = not self.in_string
+            elif char in "{[":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.reset()
+                    return i + 1
+            i += 1
+
+async def iter_json_array(chunks: AsyncIterator[bytes], max_item_size: int) -> AsyncIterator[Any]:
+    """Разбор JSON-массива по элементам по мере поступления данных.
+
+    Элемент разбирается, как только получен целиком; в памяти хранится только
+    незавершенный элемент. Элементы массива должны быть объектами: конец
+    объекта находится по закрывающей скобке, поэтому обрезанный элемент
+    отличается от некорректного.
+    """
+    scanner = _ObjectScanner()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    pos = 0
+    # start - ждем "[", first - первый элемент или "]", item - элемент, separator - "," или "]", end
+    state = "start"
+    index = 0
+
+    async def feed(final: bool) -> AsyncIterator[Any]:
+        nonlocal buffer, pos, state, index
+        while True:
+            while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == len(buffer):
+                return
+
+            char = buffer[pos]
+            if state == "start":
+                if char != "[":
+                    raise JSONStreamError("Expected JSON array")
+                pos += 1
+                state = "first"
+            elif state in ("first", "separator") and char == "]":
+                pos += 1
+                state = "end"
+            elif state == "separator":
+                if char != ",":
+                    raise JSONStreamError(f"Expected ',' or ']' after item {index - 1}")
+                pos += 1
+                state = "item"
+            elif state in ("first", "item"):
+                if char != "{":
+                    raise JSONStreamError(f"Item {index} is not an object")
+                end = scanner.find_end(buffer, pos)
+                if end is None:
+                    if final:
+                        raise JSONStreamError(f"Unexpected end of item {index}")
+                    if len(buffer) - pos > max_item_size:
+                        raise JSONStreamTooLarge(f"Item {index} exceeds {max_item_size} bytes")
+                    # Элемент получен не целиком - ждем следующий фрагмент
+                    return
+                if end - pos > max_item_size:
+                    raise JSONStreamTooLarge(f"Item {index} exceeds {max_item_size} bytes")
+                try:
+                    value = json.loads(buffer[pos:end])
+                except ValueError as e:
+                    raise JSONStreamError(f"Invalid JSON in item {index}: {str(e)}")
+                pos = end
+                state = "separator"
+                index += 1
+                yield value
+            else:
+                raise JSONStreamError("Unexpected data after JSON array")
+
+    def decode(chunk: bytes, final: bool = False) -> str:
+        try:
+            return text_decoder.decode(chunk, final=final)
+        except UnicodeDecodeError as e:
+            raise JSONStreamError(f"Invalid UTF-8: {str(e)}")
+
+    async for chunk in chunks:
+        buffer = buffer[pos:] + decode(chunk)
+        pos = 0
+        async for value in feed(final=False):
+            yield value
+
+    buffer = buffer[pos:] + decode(b"", final=True)
+    pos = 0
+    async for value in feed(final=True):
+        yield value
+    if state != "end":
+        raise JSONStreamError("Unexpected end of JSON array")
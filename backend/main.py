@@ -10,6 +10,22 @@ try:
     from fastapi.middleware.cors import CORSMiddleware
     from fastapi.staticfiles import StaticFiles
     import routers
+    from services.cache_service import (
+        close_connection_pool,
+        start_invalidation_listener,
+        stop_invalidation_listener
+    )
+    from services.preference_accumulator import get_preference_accumulator
+    from services.analytics_ingest import get_analytics_ingestor
+    from services.bot_analytics_counters import get_bot_analytics_counters
+    from config import settings
+    from n_plus_one import NPlusOneMiddleware
+    from query_stats import QueryStatsMiddleware
+    from database import replica_pool
+    from services.recommendation_precompute import (
+        start_precompute_scheduler,
+        stop_precompute_scheduler
+    )
 
     # Настройка логгера
     log_dir = os.getenv("LOG_DIR", "logs")
@@ -45,6 +61,13 @@ try:
         allow_headers=["*"],
     )
 
+    # Поиск N+1 запросов (по умолчанию только в разработке)
+    if settings.N_PLUS_ONE_DETECTION:
+        app.add_middleware(NPlusOneMiddleware)
+
+    # Число и время SQL-запросов каждого HTTP-запроса (Server-Timing, метрики по эндпоинтам)
+    app.add_middleware(QueryStatsMiddleware)
+
     # Монтирование статических файлов
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
@@ -61,6 +84,35 @@ try:
         logger.info("Health check endpoint called")
         return {"status": "healthy"}
 
+    @app.on_event("startup")
+    async def startup():
+        # Подписываемся на инвалидации локального кэша от других воркеров
+        await start_invalidation_listener()
+        # Пакетный расчет рекомендаций по расписанию (если включен)
+        await start_precompute_scheduler()
+        # Периодическая запись накопленных предпочтений пользователей
+        get_preference_accumulator().start()
+        # Пакетная запись событий аналитики
+        get_analytics_ingestor().start()
+        if settings.BOT_ANALYTICS_REDIS_COUNTERS:
+            get_bot_analytics_counters().start()
+        # Проверка доступности реплик для чтения
+        replica_pool.start()
+
+    @app.on_event("shutdown")
+    async def shutdown():
+        # Дописываем принятые события аналитики
+        await get_analytics_ingestor().stop()
+        if settings.BOT_ANALYTICS_REDIS_COUNTERS:
+            await get_bot_analytics_counters().stop()
+        await stop_precompute_scheduler()
+        # Дописываем накопленные предпочтения до закрытия соединений
+        await get_preference_accumulator().stop()
+        await stop_invalidation_listener()
+        await replica_pool.stop()
+        # Закрываем общий пул соединений с Redis
+        await close_connection_pool()
+
     if __name__ == "__main__":
         import uvicorn
         uvicorn.run(
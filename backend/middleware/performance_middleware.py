@@ -3,14 +3,12 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
 from datetime import datetime
 import time
-from ..database import get_db
+from ..database import AsyncSessionLocal
 from ..services.performance_metrics import PerformanceMetricsService
 
 class PerformanceMiddleware(BaseHTTPMiddleware):
     def __init__(self, app: ASGIApp):
         super().__init__(app)
-        self.db = next(get_db())
-        self.metrics_service = PerformanceMetricsService(self.db)
 
     async def dispatch(self, request: Request, call_next):
         start_time = time.time()
@@ -20,12 +18,7 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             duration = time.time() - start_time
             
             # Собираем метрики API
-            await self.metrics_service.collect_api_metrics(
-                endpoint=str(request.url.path),
-                method=request.method,
-                duration=duration,
-                status_code=response.status_code
-            )
+            await self._collect_api_metrics(request, duration, response.status_code)
             
             return response
             
@@ -33,11 +26,17 @@ class PerformanceMiddleware(BaseHTTPMiddleware):
             duration = time.time() - start_time
             
             # Собираем метрики для ошибок
-            await self.metrics_service.collect_api_metrics(
+            await self._collect_api_metrics(request, duration, 500)
+            
+            raise e
+
+    async def _collect_api_metrics(self, request: Request, duration: float, status_code: int) -> None:
+        """Запись метрик API в отдельной асинхронной сессии"""
+        async with AsyncSessionLocal() as db:
+            metrics_service = PerformanceMetricsService(db)
+            await metrics_service.collect_api_metrics(
                 endpoint=str(request.url.path),
                 method=request.method,
                 duration=duration,
-                status_code=500
-            )
-            
-            raise e 
\ No newline at end of file
+                status_code=status_code
+            )
\ No newline at end of file
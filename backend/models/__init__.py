@@ -2,7 +2,7 @@ from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Foreig
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
-from .database import Base
+from ..database import Base
 
 class UserRole(str, enum.Enum):
     ADMIN = "admin"
@@ -14,12 +14,12 @@ class User(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     telegram_id = Column(Integer, unique=True, index=True)
-    username = Column(String(255), nullable=True)
+    username = Column(String(255), nullable=True, index=True)
     first_name = Column(String(255), nullable=True)
     last_name = Column(String(255), nullable=True)
     role = Column(Enum(UserRole), default=UserRole.USER)
     balance = Column(Float, default=0.0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Связи
@@ -32,10 +32,11 @@ class Bot(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), index=True)
     description = Column(Text)
-    price = Column(Float)
+    price = Column(Float, index=True)
+    rating = Column(Float, nullable=True, index=True)  # Средний рейтинг по отзывам
     category_id = Column(Integer, ForeignKey("categories.id"))
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Связи
@@ -51,7 +52,7 @@ class Category(Base):
     description = Column(Text)
     discount = Column(Float, default=0.0)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Связи
@@ -63,9 +64,9 @@ class Purchase(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"))
     bot_id = Column(Integer, ForeignKey("bots.id"))
-    price = Column(Float)
+    price = Column(Float, index=True)
     status = Column(String(50))
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Связи
     user = relationship("User", back_populates="purchases")
@@ -80,7 +81,7 @@ class BugReport(Base):
     title = Column(String(255))
     description = Column(Text)
     status = Column(String(50), default="new")
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Связи
@@ -94,7 +95,7 @@ class Changelog(Base):
     bot_id = Column(Integer, ForeignKey("bots.id"))
     version = Column(String(50))
     changes = Column(Text)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
 
     # Связи
     bot = relationship("Bot", back_populates="changelog") 
\ No newline at end of file
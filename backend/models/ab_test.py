@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON, Boolean
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON, Boolean, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -51,7 +51,7 @@ class ABTestResult(Base):
 
     # Связи
     test = relationship("ABTest", back_populates="results")
-    user = relationship("User", back_populates="ab_test_results")
+    user = relationship("User")
 
     def __repr__(self):
         return f"<ABTestResult {self.id} - Test {self.test_id}>" 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, Float, JSON, UniqueConstraint, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -16,36 +16,76 @@ class AnalyticsEventType(enum.Enum):
     REVIEW = "review"
 
 class Analytics(Base):
+    """Сырые события. В MySQL таблица секционирована по месяцам created_at
+    (см. services/analytics_partitions.py): ключ секционирования входит в
+    первичный ключ, а внешний ключ на users в базе не создается."""
     __tablename__ = "analytics"
+    __table_args__ = (
+        Index("ix_analytics_user_created", "user_id", "created_at"),
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     event_type = Column(String(50), nullable=False)
     event_data = Column(JSON, nullable=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    metadata = Column(JSON, nullable=True)
+    created_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
+    metadata_ = Column("metadata", JSON, nullable=True)  # "metadata" зарезервировано в Declarative
 
     # Связи
-    user = relationship("User", back_populates="analytics_events")
+    user = relationship("User")
 
     def __repr__(self):
         return f"<Analytics {self.id} - {self.event_type}>"
 
 class BotAnalytics(Base):
     __tablename__ = "bot_analytics"
+    __table_args__ = (
+        # Одна строка на бота за день: ключ атомарного INSERT ... ON DUPLICATE KEY UPDATE
+        UniqueConstraint("bot_id", "day", name="uq_bot_analytics_bot_day"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     bot_id = Column(Integer, ForeignKey("bots.id"), nullable=False)
-    date = Column(DateTime, nullable=False)
+    day = Column(Date, nullable=False, index=True)
+    date = Column(DateTime, nullable=False)  # Начало дня (day), для фильтров по периоду
     views = Column(Integer, default=0)
     purchases = Column(Integer, default=0)
     revenue = Column(Float, default=0.0)
     avg_rating = Column(Float, nullable=True)
     reviews_count = Column(Integer, default=0)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSON, nullable=True)
 
     # Связи
-    bot = relationship("Bot", back_populates="analytics")
+    bot = relationship("Bot")
+
+    def __repr__(self):
+        return f"<BotAnalytics {self.id} - Bot {self.bot_id}>"
+
+class AnalyticsDailyTotals(Base):
+    """Итоги по всем ботам за день (поддерживаются вместе с bot_analytics)"""
+    __tablename__ = "analytics_daily_totals"
+
+    day = Column(Date, primary_key=True)
+    views = Column(Integer, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+    reviews_count = Column(Integer, nullable=False, default=0)
+    # Для среднего рейтинга: сумма и число дневных оценок ботов
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<AnalyticsDailyTotals {self.day}>"
+
+class CategoryAnalyticsDaily(Base):
+    """Итоги по категории за день"""
+    __tablename__ = "category_analytics_daily"
+
+    category_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    views = Column(Integer, nullable=False, default=0)
+    purchases = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
 
     def __repr__(self):
-        return f"<BotAnalytics {self.id} - Bot {self.bot_id}>" 
\ No newline at end of file
+        return f"<CategoryAnalyticsDaily {self.category_id} - {self.day}>"
@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, ForeignKey, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from ..database import Base
 
 class CategorySubscription(Base):
     __tablename__ = "category_subscriptions"
@@ -14,8 +14,8 @@ class CategorySubscription(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Связи
-    user = relationship("User", back_populates="category_subscriptions")
-    category = relationship("Category", back_populates="subscriptions")
+    user = relationship("User")
+    category = relationship("Category")
 
     def __repr__(self):
         return f"<CategorySubscription(user_id={self.user_id}, category_id={self.category_id})>" 
\ No newline at end of file
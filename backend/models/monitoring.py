@@ -11,7 +11,7 @@ class Metric(Base):
     value = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     labels = Column(JSON, nullable=True)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSON, nullable=True)
 
 class Alert(Base):
     __tablename__ = "alerts"
@@ -24,7 +24,9 @@ class Alert(Base):
     status = Column(String(20), nullable=False)  # 'active', 'resolved'
     created_at = Column(DateTime, default=datetime.utcnow)
     resolved_at = Column(DateTime, nullable=True)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSON, nullable=True)
+
+    history = relationship("AlertHistory", back_populates="alert")
 
 class AlertHistory(Base):
     __tablename__ = "alert_history"
@@ -33,6 +35,6 @@ class AlertHistory(Base):
     alert_id = Column(Integer, ForeignKey("alerts.id"), nullable=False)
     metric_value = Column(Float, nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
-    metadata = Column(JSON, nullable=True)
+    metadata_ = Column("metadata", JSON, nullable=True)
 
     alert = relationship("Alert", back_populates="history") 
\ No newline at end of file
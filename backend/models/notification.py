@@ -28,10 +28,10 @@ class Notification(Base):
     is_read = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     read_at = Column(DateTime(timezone=True), nullable=True)
-    metadata = Column(Text, nullable=True)  # JSON строка с дополнительными данными
+    metadata_ = Column("metadata", Text, nullable=True)  # JSON строка с дополнительными данными
 
     # Связи
-    user = relationship("User", back_populates="notifications")
+    user = relationship("User")
 
     def __repr__(self):
         return f"<Notification {self.id} - {self.type.value}>" 
\ No newline at end of file
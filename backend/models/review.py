@@ -1,7 +1,7 @@
 from sqlalchemy import Column, Integer, ForeignKey, Text, Float, DateTime, Boolean
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from ..database import Base
 
 class Review(Base):
     __tablename__ = "reviews"
@@ -17,8 +17,8 @@ class Review(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Связи
-    user = relationship("User", back_populates="reviews")
-    bot = relationship("Bot", back_populates="reviews")
+    user = relationship("User")
+    bot = relationship("Bot")
 
     def __repr__(self):
         return f"<Review(user_id={self.user_id}, bot_id={self.bot_id}, rating={self.rating})>" 
\ No newline at end of file
@@ -1,10 +1,14 @@
-from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, ForeignKey, Float, DateTime, JSON, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime
-from .base import Base
+from ..database import Base
 
 class UserPreference(Base):
     __tablename__ = "user_preferences"
+    __table_args__ = (
+        # Ключ пакетной записи INSERT ... ON DUPLICATE KEY UPDATE
+        UniqueConstraint("user_id", "category_id", name="uq_user_preferences_user_category"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -12,11 +16,11 @@ class UserPreference(Base):
     preference_score = Column(Float, default=0.0)  # Оценка предпочтения (0-1)
     interaction_count = Column(Integer, default=0)  # Количество взаимодействий
     last_interaction = Column(DateTime, default=datetime.utcnow)
-    metadata = Column(JSON, default={})  # Дополнительные метаданные
+    metadata_ = Column("metadata", JSON, default={})  # Дополнительные метаданные
 
     # Связи
-    user = relationship("User", back_populates="preferences")
-    category = relationship("Category", back_populates="preferences")
+    user = relationship("User")
+    category = relationship("Category")
 
     def __repr__(self):
         return f"<UserPreference(user_id={self.user_id}, category_id={self.category_id}, score={self.preference_score})>" 
\ No newline at end of file
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, DateTime, ForeignKey, JSON
+from datetime import datetime
+from ..database import Base
+
+class UserRecommendation(Base):
+    """Предварительно рассчитанные рекомендации пользователя"""
+    __tablename__ = "user_recommendations"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    bot_ids = Column(JSON, nullable=False)  # Идентификаторы ботов по убыванию оценки
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f"<UserRecommendation(user_id={self.user_id}, bots={len(self.bot_ids or [])})>"
@@ -0,0 +1,81 @@
+from typing import Dict, Optional
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter
+import logging
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+class NPlusOneError(Exception):
+    """Связь загружается лениво по одному объекту слишком много раз за запрос"""
+
+# Ленивые загрузки текущего запроса: "Модель.связь" -> число запросов (None - не отслеживается)
+_lazy_loads: ContextVar[Optional[Counter]] = ContextVar("lazy_loads", default=None)
+
+def _on_orm_execute(state: ORMExecuteState) -> None:
+    # lazy_loaded_from задан только для ленивой загрузки связи одного объекта;
+    # selectinload/joinedload сюда не попадают. Для insert/update/delete/text()
+    # обращение к нему - InvalidRequestError, поэтому сначала is_select
+    if not state.is_select or state.lazy_loaded_from is None:
+        return
+    counts = _lazy_loads.get()
+    if counts is None:
+        return
+
+    relationship = str(state.loader_strategy_path.prop)
+    counts[relationship] += 1
+    if counts[relationship] == settings.N_PLUS_ONE_THRESHOLD + 1:
+        message = (
+            f"N+1 queries: {relationship} lazy loaded more than "
+            f"{settings.N_PLUS_ONE_THRESHOLD} times in one request; "
+            f"add selectinload/joinedload to the query"
+        )
+        if settings.N_PLUS_ONE_RAISE:
+            raise NPlusOneError(message)
+        logger.warning(message)
+
+def install_n_plus_one_detector() -> None:
+    """Подключение счетчика ленивых загрузок ко всем сессиям (в том числе AsyncSession)"""
+    if not event.contains(Session, "do_orm_execute", _on_orm_execute):
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+
+def uninstall_n_plus_one_detector() -> None:
+    """Отключение счетчика ленивых загрузок"""
+    if event.contains(Session, "do_orm_execute", _on_orm_execute):
+        event.remove(Session, "do_orm_execute", _on_orm_execute)
+
+@contextmanager
+def track_lazy_loads():
+    """Подсчет ленивых загрузок связей внутри блока; возвращает счетчик"""
+    counts: Counter = Counter()
+    token = _lazy_loads.set(counts)
+    try:
+        yield counts
+    finally:
+        _lazy_loads.reset(token)
+
+class NPlusOneMiddleware(BaseHTTPMiddleware):
+    """Поиск N+1 запросов: ленивые загрузки связей считаются отдельно для каждого запроса.
+
+    Больше N_PLUS_ONE_THRESHOLD ленивых загрузок одной связи пишутся в лог
+    предупреждением, а при N_PLUS_ONE_RAISE приводят к NPlusOneError
+    (для разработки и тестов).
+    """
+
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+        install_n_plus_one_detector()
+
+    async def dispatch(self, request: Request, call_next):
+        # call_next выполняет обработчик в копии контекста: счетчик общий, так как это один объект
+        with track_lazy_loads() as counts:
+            response = await call_next(request)
+        if counts:
+            logger.debug(f"Lazy loads in {request.method} {request.url.path}: {dict(counts)}")
+        return response
@@ -0,0 +1,98 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+class CursorError(ValueError):
+    """Некорректный курсор или порядок сортировки"""
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+def encode_cursor(sort: str, value: Any, row_id: int) -> str:
+    """Курсор следующей страницы: порядок сортировки и ключ последней строки"""
+    payload = json.dumps([sort, _encode_value(value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, int]:
+    """Ключ (значение сортировки, id) из курсора, выданного для того же порядка"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, row_id = json.loads(payload)
+        value = _decode_value(value)
+    except (ValueError, TypeError):
+        raise CursorError("Invalid cursor")
+    if cursor_sort != sort or not isinstance(row_id, int):
+        raise CursorError("Cursor does not match sort order")
+    return value, row_id
+
+async def paginate(
+    db: AsyncSession,
+    query: Select,
+    model: Any,
+    sorts: Dict[str, Any],
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = 100
+) -> Tuple[List[Any], Optional[str]]:
+    """Страница по ключу (столбец сортировки, id) вместо OFFSET.
+
+    sort - имя из sorts, с "-" для убывания. Следующая страница читается
+    условием "после ключа последней строки", поэтому ее стоимость не
+    зависит от номера страницы: ORDER BY столбец, id идет по индексу
+    столбца (InnoDB хранит в нем и первичный ключ). NULL упорядочены как
+    в MySQL: первыми при возрастании, последними при убывании.
+    Возвращает строки и курсор следующей страницы (None - страниц больше нет).
+    """
+    descending = sort.startswith("-")
+    name = sort.lstrip("-")
+    if name not in sorts:
+        raise CursorError(f"Unsupported sort: {name}")
+    column = sorts[name]
+    id_column = model.id
+
+    if column is id_column:
+        order_by = [id_column.desc() if descending else id_column.asc()]
+    else:
+        order_by = [
+            column.desc() if descending else column.asc(),
+            id_column.desc() if descending else id_column.asc()
+        ]
+
+    if cursor is not None:
+        value, row_id = decode_cursor(cursor, sort)
+        after_id = id_column < row_id if descending else id_column > row_id
+        if column is id_column:
+            query = query.where(after_id)
+        elif value is None:
+            # NULL идут первыми при возрастании и последними при убывании
+            if descending:
+                query = query.where(and_(column.is_(None), after_id))
+            else:
+                query = query.where(or_(and_(column.is_(None), after_id), column.isnot(None)))
+        else:
+            after_value = column < value if descending else column > value
+            condition = or_(after_value, and_(column == value, after_id))
+            if descending:
+                condition = or_(condition, column.is_(None))
+            query = query.where(condition)
+
+    # Лишняя строка показывает, есть ли следующая страница
+    result = await db.execute(query.order_by(*order_by).limit(limit + 1))
+    rows = list(result.scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, column.key), last.id)
@@ -0,0 +1,172 @@
+from typing import Dict, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+import logging
+import re
+import time
+from fastapi import Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*", re.DOTALL)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\?|(?<!:):\w+")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_ROWS = re.compile(r"(\(\?\+?\))(?:\s*,\s*\(\?\+?\))+")
+_SPACE = re.compile(r"\s+")
+
+def fingerprint(statement: str) -> str:
+    """Нормализованный SQL: литералы и параметры заменены на ?, списки свернуты.
+
+    Запросы, отличающиеся только значениями, дают один отпечаток,
+    например "SELECT ... WHERE bots.id IN (?+)".
+    """
+    statement = _COMMENT.sub(" ", statement)
+    statement = _STRING.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PARAM.sub("?", statement)
+    statement = _LIST.sub("(?+)", statement)
+    statement = _ROWS.sub(r"\1, ...", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+@dataclass
+class QueryStats:
+    """SQL-запросы одного HTTP-запроса"""
+    statements: int = 0
+    duration: float = 0.0
+    slowest_duration: float = 0.0
+    slowest_statement: Optional[str] = None
+
+    def record(self, statement: str, duration: float) -> None:
+        self.statements += 1
+        self.duration += duration
+        if duration > self.slowest_duration:
+            self.slowest_duration = duration
+            self.slowest_statement = statement
+
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing (время в миллисекундах)"""
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="{self.statements} queries", '
+            f"db-slowest;dur={self.slowest_duration * 1000:.1f}"
+        )
+
+# Статистика текущего HTTP-запроса (None - запросы не отслеживаются)
+_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    duration = time.perf_counter() - conn.info["query_start_time"].pop()
+    stats = _query_stats.get()
+    if stats is not None:
+        stats.record(statement, duration)
+
+    threshold = settings.SQL_SLOW_QUERY_THRESHOLD_MS
+    if threshold and duration * 1000 >= threshold:
+        logger.warning(f"Slow query {duration * 1000:.1f} ms: {fingerprint(statement)}")
+
+def _handle_error(exception_context) -> None:
+    # Запрос с ошибкой не доходит до after_cursor_execute: снимаем его время начала
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_time"):
+        connection.info["query_start_time"].pop()
+
+def instrument_engine(engine: Engine) -> None:
+    """Учет времени SQL-запросов движка (для AsyncEngine передается sync_engine)"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+@contextmanager
+def track_queries():
+    """Учет SQL-запросов внутри блока; возвращает QueryStats"""
+    stats = QueryStats()
+    token = _query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _query_stats.reset(token)
+
+class QueryMetrics:
+    """Показатели SQL по эндпоинтам, накопленные между сборами метрик.
+
+    PerformanceMetricsService забирает их (drain) и записывает с метками
+    endpoint и method.
+    """
+
+    def __init__(self):
+        self._endpoints: Dict[Tuple[str, str], Dict[str, float]] = {}
+
+    def record(self, method: str, endpoint: str, stats: QueryStats) -> None:
+        totals = self._endpoints.get((method, endpoint))
+        if totals is None:
+            totals = self._endpoints[(method, endpoint)] = {
+                "requests": 0,
+                "statements": 0,
+                "duration": 0.0,
+                "max_statements": 0,
+                "slowest": 0.0
+            }
+        totals["requests"] += 1
+        totals["statements"] += stats.statements
+        totals["duration"] += stats.duration
+        totals["max_statements"] = max(totals["max_statements"], stats.statements)
+        totals["slowest"] = max(totals["slowest"], stats.slowest_duration)
+
+    def drain(self) -> Dict[Tuple[str, str], Dict[str, float]]:
+        """Накопленные показатели {(method, endpoint): {...}} со сбросом"""
+        endpoints, self._endpoints = self._endpoints, {}
+        return endpoints
+
+# Общий для процесса экземпляр
+_query_metrics: Optional[QueryMetrics] = None
+
+def get_query_metrics() -> QueryMetrics:
+    """Получение общих показателей SQL по эндпоинтам"""
+    global _query_metrics
+    if _query_metrics is None:
+        _query_metrics = QueryMetrics()
+    return _query_metrics
+
+class QueryStatsMiddleware(BaseHTTPMiddleware):
+    """Число SQL-запросов, их общее время и самый медленный запрос для каждого HTTP-запроса.
+
+    Результат отдается в заголовке Server-Timing (SQL_SERVER_TIMING) и
+    накапливается в QueryMetrics по шаблону пути эндпоинта. Если общее
+    время SQL превышает SQL_SLOW_REQUEST_THRESHOLD_MS, в лог пишется
+    самый медленный запрос.
+    """
+
+    def __init__(self, app: ASGIApp):
+        super().__init__(app)
+
+    async def dispatch(self, request: Request, call_next):
+        # call_next выполняет обработчик в копии контекста: статистика общая, так как это один объект
+        with track_queries() as stats:
+            response = await call_next(request)
+
+        # Шаблон пути ("/api/bots/{bot_id}"), а не сам путь: иначе меток будет без счета
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", None) or "unmatched"
+        get_query_metrics().record(request.method, endpoint, stats)
+
+        threshold = settings.SQL_SLOW_REQUEST_THRESHOLD_MS
+        if threshold and stats.duration * 1000 >= threshold:
+            logger.warning(
+                f"Slow SQL in {request.method} {endpoint}: {stats.statements} queries, "
+                f"{stats.duration * 1000:.1f} ms; slowest {stats.slowest_duration * 1000:.1f} ms: "
+                f"{fingerprint(stats.slowest_statement or '')}"
+            )
+        if settings.SQL_SERVER_TIMING:
+            response.headers.append("Server-Timing", stats.server_timing())
+        return response
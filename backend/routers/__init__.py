@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from . import users, categories, bots, purchases, bug_reports, changelog
+from backend.api import analytics
 
 router = APIRouter()
 
@@ -8,4 +9,5 @@ router.include_router(categories.router)
 router.include_router(bots.router)
 router.include_router(purchases.router)
 router.include_router(bug_reports.router)
-router.include_router(changelog.router) 
\ No newline at end of file
+router.include_router(changelog.router)
+router.include_router(analytics.router) 
\ No newline at end of file
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 from backend import crud, schemas
-from backend.database import get_db
+from backend.database import get_db, get_read_db
+from backend.services.analytics_service import record_bot_event_background
 
 router = APIRouter(
     prefix="/bots",
@@ -11,41 +12,102 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Bot)
-def create_bot(bot: schemas.BotCreate, db: Session = Depends(get_db)):
+async def create_bot(bot: schemas.BotCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование категории
-    db_category = crud.get_category(db, category_id=bot.category_id)
+    db_category = await crud.get_category(db, category_id=bot.category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
-    return crud.create_bot(db=db, bot=bot)
+    return await crud.create_bot(db=db, bot=bot)
 
-@router.get("/", response_model=List[schemas.Bot])
-def read_bots(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    bots = crud.get_bots(db, skip=skip, limit=limit)
-    return bots
+@router.get("/", response_model=schemas.Page[schemas.BotFields], response_model_exclude_unset=True)
+async def read_bots(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id",
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    is_active: Optional[bool] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    fields: Optional[str] = Query(None, description="Поля через запятую, например id,name,price"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Постраничный вывод по курсору: next_cursor передается в cursor следующего запроса
+    field_names = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    try:
+        bots, next_cursor = await crud.get_bots(
+            db,
+            cursor=cursor,
+            limit=limit,
+            sort=sort,
+            category_id=category_id,
+            min_price=min_price,
+            max_price=max_price,
+            is_active=is_active,
+            min_rating=min_rating,
+            fields=field_names
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if field_names:
+        # Читаем только загруженные столбцы: обращение к остальным вызвало бы запрос
+        items = [
+            schemas.BotFields(**{name: getattr(bot, name) for name in {"id", *field_names}})
+            for bot in bots
+        ]
+    else:
+        items = [schemas.BotFields.model_validate(bot) for bot in bots]
+    return schemas.Page(items=items, next_cursor=next_cursor)
+
+@router.get("/search", response_model=List[schemas.BotSearchHit])
+async def search_bots(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    category_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Поиск по названию и описанию; последнее слово запроса может быть недописанным
+    hits = await crud.search_bots(db, q, limit=limit, category_id=category_id)
+    return [
+        schemas.BotSearchHit(**schemas.Bot.model_validate(bot).model_dump(), score=score)
+        for bot, score in hits
+    ]
+
+@router.get("/suggest", response_model=List[schemas.NameSuggestion])
+async def suggest_names(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Автодополнение по началу названий ботов и категорий, допускает опечатки
+    return await crud.suggest_names(db, q, limit=limit)
 
 @router.get("/{bot_id}", response_model=schemas.Bot)
-def read_bot(bot_id: int, db: Session = Depends(get_db)):
-    db_bot = crud.get_bot(db, bot_id=bot_id)
+async def read_bot(bot_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_read_db)):
+    db_bot = await crud.get_bot(db, bot_id=bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
+    # Просмотр учитывается после ответа
+    background_tasks.add_task(record_bot_event_background, bot_id, "view")
     return db_bot
 
 @router.put("/{bot_id}", response_model=schemas.Bot)
-def update_bot(bot_id: int, bot: schemas.BotUpdate, db: Session = Depends(get_db)):
+async def update_bot(bot_id: int, bot: schemas.BotUpdate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование категории, если она указана
     if bot.category_id:
-        db_category = crud.get_category(db, category_id=bot.category_id)
+        db_category = await crud.get_category(db, category_id=bot.category_id)
         if db_category is None:
             raise HTTPException(status_code=404, detail="Category not found")
     
-    db_bot = crud.update_bot(db, bot_id=bot_id, bot=bot)
+    db_bot = await crud.update_bot(db, bot_id=bot_id, bot=bot)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     return db_bot
 
 @router.delete("/{bot_id}")
-def delete_bot(bot_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_bot(db, bot_id=bot_id)
+async def delete_bot(bot_id: int, db: AsyncSession = Depends(get_db)):
+    success = await crud.delete_bot(db, bot_id=bot_id)
     if not success:
         raise HTTPException(status_code=404, detail="Bot not found")
     return {"message": "Bot deleted successfully"} 
\ No newline at end of file
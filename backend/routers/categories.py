@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from backend import crud, schemas
-from backend.database import get_db
+from backend.database import get_db, get_read_db
+from backend.pagination import CursorError
 
 router = APIRouter(
     prefix="/categories",
@@ -11,31 +12,40 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Category)
-def create_category(category: schemas.CategoryCreate, db: Session = Depends(get_db)):
-    return crud.create_category(db=db, category=category)
+async def create_category(category: schemas.CategoryCreate, db: AsyncSession = Depends(get_db)):
+    return await crud.create_category(db=db, category=category)
 
-@router.get("/", response_model=List[schemas.Category])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    categories = crud.get_categories(db, skip=skip, limit=limit)
-    return categories
+@router.get("/", response_model=schemas.Page[schemas.Category])
+async def read_categories(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Постраничный вывод по курсору: next_cursor передается в cursor следующего запроса
+    try:
+        categories, next_cursor = await crud.get_categories(db, cursor=cursor, limit=limit, sort=sort)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.Page(items=categories, next_cursor=next_cursor)
 
 @router.get("/{category_id}", response_model=schemas.Category)
-def read_category(category_id: int, db: Session = Depends(get_db)):
-    db_category = crud.get_category(db, category_id=category_id)
+async def read_category(category_id: int, db: AsyncSession = Depends(get_read_db)):
+    db_category = await crud.get_category(db, category_id=category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
 @router.put("/{category_id}", response_model=schemas.Category)
-def update_category(category_id: int, category: schemas.CategoryUpdate, db: Session = Depends(get_db)):
-    db_category = crud.update_category(db, category_id=category_id, category=category)
+async def update_category(category_id: int, category: schemas.CategoryUpdate, db: AsyncSession = Depends(get_db)):
+    db_category = await crud.update_category(db, category_id=category_id, category=category)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
 
 @router.delete("/{category_id}")
-def delete_category(category_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_category(db, category_id=category_id)
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
+    success = await crud.delete_category(db, category_id=category_id)
     if not success:
         raise HTTPException(status_code=404, detail="Category not found")
     return {"message": "Category deleted successfully"} 
\ No newline at end of file
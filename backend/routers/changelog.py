@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from .. import crud, schemas
-from ..database import get_db
+from ..database import get_db, get_read_db
+from ..pagination import CursorError
 
 router = APIRouter(
     prefix="/changelog",
@@ -11,22 +12,31 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Changelog)
-def create_changelog(changelog: schemas.ChangelogCreate, db: Session = Depends(get_db)):
+async def create_changelog(changelog: schemas.ChangelogCreate, db: AsyncSession = Depends(get_db)):
     # Проверяем существование бота
-    db_bot = crud.get_bot(db, bot_id=changelog.bot_id)
+    db_bot = await crud.get_bot(db, bot_id=changelog.bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
-    return crud.create_changelog(db=db, changelog=changelog)
+    return await crud.create_changelog(db=db, changelog=changelog)
 
-@router.get("/", response_model=List[schemas.Changelog])
-def read_changelogs(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    changelogs = crud.get_changelogs(db, skip=skip, limit=limit)
-    return changelogs
+@router.get("/", response_model=schemas.Page[schemas.Changelog])
+async def read_changelogs(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_read_db)
+):
+    # Постраничный вывод по курсору: next_cursor передается в cursor следующего запроса
+    try:
+        changelogs, next_cursor = await crud.get_changelogs(db, cursor=cursor, limit=limit, sort=sort)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.Page(items=changelogs, next_cursor=next_cursor)
 
 @router.get("/{changelog_id}", response_model=schemas.Changelog)
-def read_changelog(changelog_id: int, db: Session = Depends(get_db)):
-    db_changelog = crud.get_changelog(db, changelog_id=changelog_id)
+async def read_changelog(changelog_id: int, db: AsyncSession = Depends(get_read_db)):
+    db_changelog = await crud.get_changelog(db, changelog_id=changelog_id)
     if db_changelog is None:
         raise HTTPException(status_code=404, detail="Changelog not found")
     return db_changelog 
\ No newline at end of file
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from .. import crud, schemas
 from ..database import get_db
+from ..pagination import CursorError
+from ..services.analytics_service import record_bot_event_background
 
 router = APIRouter(
     prefix="/purchases",
@@ -11,14 +13,18 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Purchase)
-def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_db)):
+async def create_purchase(
+    purchase: schemas.PurchaseCreate,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db)
+):
     # Проверяем существование пользователя
-    db_user = crud.get_user(db, user_id=purchase.user_id)
+    db_user = await crud.get_user(db, user_id=purchase.user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     
     # Проверяем существование бота
-    db_bot = crud.get_bot(db, bot_id=purchase.bot_id)
+    db_bot = await crud.get_bot(db, bot_id=purchase.bot_id)
     if db_bot is None:
         raise HTTPException(status_code=404, detail="Bot not found")
     
@@ -27,23 +33,36 @@ def create_purchase(purchase: schemas.PurchaseCreate, db: Session = Depends(get_
         raise HTTPException(status_code=400, detail="Insufficient balance")
     
     # Создаем покупку
-    db_purchase = crud.create_purchase(db=db, purchase=purchase)
+    db_purchase = await crud.create_purchase(db=db, purchase=purchase)
     
     # Обновляем баланс пользователя
     db_user.balance -= purchase.price
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
+    # Покупка учитывается в статистике бота после ответа
+    background_tasks.add_task(
+        record_bot_event_background, purchase.bot_id, "purchase", purchase.price, purchase.user_id
+    )
     return db_purchase
 
-@router.get("/", response_model=List[schemas.Purchase])
-def read_purchases(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    purchases = crud.get_purchases(db, skip=skip, limit=limit)
-    return purchases
+@router.get("/", response_model=schemas.Page[schemas.Purchase])
+async def read_purchases(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_db)
+):
+    # Постраничный вывод по курсору: next_cursor передается в cursor следующего запроса
+    try:
+        purchases, next_cursor = await crud.get_purchases(db, cursor=cursor, limit=limit, sort=sort)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.Page(items=purchases, next_cursor=next_cursor)
 
 @router.get("/{purchase_id}", response_model=schemas.Purchase)
-def read_purchase(purchase_id: int, db: Session = Depends(get_db)):
-    db_purchase = crud.get_purchase(db, purchase_id=purchase_id)
+async def read_purchase(purchase_id: int, db: AsyncSession = Depends(get_db)):
+    db_purchase = await crud.get_purchase(db, purchase_id=purchase_id)
     if db_purchase is None:
         raise HTTPException(status_code=404, detail="Purchase not found")
     return db_purchase 
\ No newline at end of file
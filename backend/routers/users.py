@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
 from backend import crud, schemas
 from backend.database import get_db
+from backend.pagination import CursorError
 
 router = APIRouter(
     prefix="/users",
@@ -11,41 +12,50 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.User)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_telegram_id(db, telegram_id=user.telegram_id)
+async def create_user(user: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user_by_telegram_id(db, telegram_id=user.telegram_id)
     if db_user:
         raise HTTPException(status_code=400, detail="User already registered")
-    return crud.create_user(db=db, user=user)
+    return await crud.create_user(db=db, user=user)
 
-@router.get("/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = crud.get_users(db, skip=skip, limit=limit)
-    return users
+@router.get("/", response_model=schemas.Page[schemas.User])
+async def read_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = "id",
+    db: AsyncSession = Depends(get_db)
+):
+    # Постраничный вывод по курсору: next_cursor передается в cursor следующего запроса
+    try:
+        users, next_cursor = await crud.get_users(db, cursor=cursor, limit=limit, sort=sort)
+    except CursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return schemas.Page(items=users, next_cursor=next_cursor)
 
 @router.get("/{user_id}", response_model=schemas.User)
-def read_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user(db, user_id=user_id)
+async def read_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.get("/telegram/{telegram_id}", response_model=schemas.User)
-def read_user_by_telegram_id(telegram_id: int, db: Session = Depends(get_db)):
-    db_user = crud.get_user_by_telegram_id(db, telegram_id=telegram_id)
+async def read_user_by_telegram_id(telegram_id: int, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.get_user_by_telegram_id(db, telegram_id=telegram_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.put("/{user_id}", response_model=schemas.User)
-def update_user(user_id: int, user: schemas.UserUpdate, db: Session = Depends(get_db)):
-    db_user = crud.update_user(db, user_id=user_id, user=user)
+async def update_user(user_id: int, user: schemas.UserUpdate, db: AsyncSession = Depends(get_db)):
+    db_user = await crud.update_user(db, user_id=user_id, user=user)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 @router.delete("/{user_id}")
-def delete_user(user_id: int, db: Session = Depends(get_db)):
-    success = crud.delete_user(db, user_id=user_id)
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+    success = await crud.delete_user(db, user_id=user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     return {"message": "User deleted successfully"} 
\ No newline at end of file
@@ -1,8 +1,15 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Generic, Literal, TypeVar
 from datetime import datetime
 from enum import Enum
 
+T = TypeVar("T")
+
+class Page(BaseModel, Generic[T]):
+    """Страница списка; next_cursor передается в cursor для следующей страницы"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+
 class UserRole(str, Enum):
     ADMIN = "admin"
     CLIENT = "client"
@@ -65,12 +72,39 @@ class BotUpdate(BotBase):
 
 class Bot(BotBase):
     id: int
+    rating: Optional[float] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
 
+class BotSearchHit(Bot):
+    """Бот в результатах поиска с оценкой релевантности"""
+    score: float
+
+class NameSuggestion(BaseModel):
+    """Подсказка автодополнения: бот или категория"""
+    type: Literal["bot", "category"]
+    id: int
+    name: str
+    category_id: Optional[int] = None
+
+class BotFields(BaseModel):
+    """Бот с частью полей (параметр fields); незапрошенные поля не выводятся"""
+    id: int
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    category_id: Optional[int] = None
+    is_active: Optional[bool] = None
+    rating: Optional[float] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 class PurchaseBase(BaseModel):
     user_id: int
     bot_id: int
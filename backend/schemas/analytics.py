@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from datetime import datetime
+from pydantic import AliasChoices, BaseModel, Field
+from typing import Optional, Dict, Any, List
+from datetime import datetime, date
 from ..models.analytics import AnalyticsEventType
 
 class AnalyticsEventBase(BaseModel):
@@ -50,4 +50,49 @@ class BotAnalyticsInDB(BotAnalyticsBase):
         from_attributes = True
 
 class BotAnalyticsResponse(BotAnalyticsInDB):
-    pass 
\ No newline at end of file
+    # Приблизительное число уникальных зрителей за день (None - вне срока хранения)
+    unique_viewers: Optional[int] = None
+
+class AnalyticsCreate(BaseModel):
+    user_id: Optional[int] = None
+    event_type: str
+    event_data: Dict[str, Any] = Field(default_factory=dict)
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
+
+class AnalyticsResponse(AnalyticsCreate):
+    id: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class AnalyticsAccepted(BaseModel):
+    # События приняты в очередь и будут записаны пакетом
+    accepted: int
+
+class AnalyticsBulkResult(BaseModel):
+    accepted: int
+    rejected: int = 0
+    # Ошибки проверки первых отклоненных событий: {"index": ..., "error": ...}
+    errors: List[Dict[str, Any]] = Field(default_factory=list)
+
+class AnalyticsSummary(BaseModel):
+    total_views: int = 0
+    total_purchases: int = 0
+    total_revenue: float = 0.0
+    avg_rating: Optional[float] = None
+    total_reviews: int = 0
+    unique_visitors: Optional[int] = None
+    top_categories: Dict[str, int] = Field(default_factory=dict)
+    top_bots: Dict[str, int] = Field(default_factory=dict)
+
+class AnalyticsQueryRequest(BaseModel):
+    report: str
+    start_date: date
+    end_date: date
+    limit: int = Field(100, ge=1, le=10000)
+
+class AnalyticsQueryResult(BaseModel):
+    report: str
+    columns: List[str]
+    rows: List[List[Any]]
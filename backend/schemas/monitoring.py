@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
 from enum import Enum
@@ -22,7 +22,7 @@ class MetricBase(BaseModel):
     name: str = Field(..., max_length=100)
     value: float
     labels: Optional[Dict[str, Any]] = None
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class MetricCreate(MetricBase):
     pass
@@ -42,14 +42,14 @@ class AlertBase(BaseModel):
     condition: MetricCondition
     threshold: float
     severity: AlertSeverity
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class AlertCreate(AlertBase):
     pass
 
 class AlertUpdate(BaseModel):
     status: Optional[AlertStatus] = None
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class AlertInDB(AlertBase):
     id: int
@@ -66,7 +66,7 @@ class AlertResponse(AlertInDB):
 class AlertHistoryBase(BaseModel):
     alert_id: int
     metric_value: float
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class AlertHistoryCreate(AlertHistoryBase):
     pass
@@ -1,22 +1,14 @@
-from enum import Enum
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, AliasChoices
 from typing import Optional, Dict, Any
 from datetime import datetime
 from ..models.notification import NotificationType, NotificationChannel
 
-class NotificationType(str, Enum):
-    NEW_BOT = "new_bot"
-    DISCOUNT = "discount"
-    PAYMENT = "payment"
-    SUPPORT = "support"
-    REVIEW = "review"
-
 class NotificationBase(BaseModel):
     type: NotificationType
     channel: NotificationChannel
     title: str = Field(..., max_length=255)
     message: str
-    metadata: Optional[str] = None
+    metadata: Optional[str] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class NotificationCreate(NotificationBase):
     user_id: int
@@ -1,18 +1,18 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
 
 class UserPreferenceBase(BaseModel):
     category_id: int
     preference_score: float = Field(..., ge=0.0, le=1.0)
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class UserPreferenceCreate(UserPreferenceBase):
     pass
 
 class UserPreferenceUpdate(BaseModel):
     preference_score: Optional[float] = Field(None, ge=0.0, le=1.0)
-    metadata: Optional[Dict[str, Any]] = None
+    metadata: Optional[Dict[str, Any]] = Field(None, validation_alias=AliasChoices("metadata_", "metadata"))
 
 class UserPreferenceInDB(UserPreferenceBase):
     id: int
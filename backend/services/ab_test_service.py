@@ -1,6 +1,6 @@
 from typing import List, Optional, Dict, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from datetime import datetime
 import numpy as np
 from scipy import stats
@@ -8,7 +8,7 @@ from ..models.ab_test import ABTest, ABTestResult, ABTestStatus
 from ..schemas.ab_test import ABTestCreate, ABTestUpdate, ABTestResultCreate, ABTestStatistics
 
 class ABTestService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def create_test(self, test: ABTestCreate) -> ABTest:
@@ -23,8 +23,8 @@ class ABTestService:
             status=ABTestStatus.DRAFT
         )
         self.db.add(db_test)
-        self.db.commit()
-        self.db.refresh(db_test)
+        await self.db.commit()
+        await self.db.refresh(db_test)
         return db_test
 
     async def update_test(
@@ -33,39 +33,39 @@ class ABTestService:
         test_update: ABTestUpdate
     ) -> Optional[ABTest]:
         """Обновление A/B теста"""
-        test = self.db.query(ABTest).filter(ABTest.id == test_id).first()
+        test = await self.db.get(ABTest, test_id)
         if not test:
             return None
 
         for field, value in test_update.dict(exclude_unset=True).items():
             setattr(test, field, value)
 
-        self.db.commit()
-        self.db.refresh(test)
+        await self.db.commit()
+        await self.db.refresh(test)
         return test
 
     async def start_test(self, test_id: int) -> Optional[ABTest]:
         """Запуск A/B теста"""
-        test = self.db.query(ABTest).filter(ABTest.id == test_id).first()
+        test = await self.db.get(ABTest, test_id)
         if not test or test.status != ABTestStatus.DRAFT:
             return None
 
         test.status = ABTestStatus.ACTIVE
         test.start_date = datetime.now()
-        self.db.commit()
-        self.db.refresh(test)
+        await self.db.commit()
+        await self.db.refresh(test)
         return test
 
     async def stop_test(self, test_id: int) -> Optional[ABTest]:
         """Остановка A/B теста"""
-        test = self.db.query(ABTest).filter(ABTest.id == test_id).first()
+        test = await self.db.get(ABTest, test_id)
         if not test or test.status != ABTestStatus.ACTIVE:
             return None
 
         test.status = ABTestStatus.COMPLETED
         test.end_date = datetime.now()
-        self.db.commit()
-        self.db.refresh(test)
+        await self.db.commit()
+        await self.db.refresh(test)
         return test
 
     async def assign_variant(
@@ -74,10 +74,13 @@ class ABTestService:
         user_id: Optional[int] = None
     ) -> Optional[str]:
         """Назначение варианта теста пользователю"""
-        test = self.db.query(ABTest).filter(
-            ABTest.id == test_id,
-            ABTest.status == ABTestStatus.ACTIVE
-        ).first()
+        result = await self.db.execute(
+            select(ABTest).where(
+                ABTest.id == test_id,
+                ABTest.status == ABTestStatus.ACTIVE
+            )
+        )
+        test = result.scalars().first()
 
         if not test:
             return None
@@ -87,14 +90,17 @@ class ABTestService:
             return None
 
         # Получаем текущее распределение по вариантам
-        variant_counts = self.db.query(
-            ABTestResult.variant,
-            func.count(ABTestResult.id).label("count")
-        ).filter(
-            ABTestResult.test_id == test_id
-        ).group_by(
-            ABTestResult.variant
-        ).all()
+        result = await self.db.execute(
+            select(
+                ABTestResult.variant,
+                func.count(ABTestResult.id).label("count")
+            ).where(
+                ABTestResult.test_id == test_id
+            ).group_by(
+                ABTestResult.variant
+            )
+        )
+        variant_counts = result.all()
 
         # Создаем словарь с количеством участников по вариантам
         variant_distribution = {variant: 0 for variant in test.variants.keys()}
@@ -126,8 +132,8 @@ class ABTestService:
             metrics_data=result.metrics_data
         )
         self.db.add(db_result)
-        self.db.commit()
-        self.db.refresh(db_result)
+        await self.db.commit()
+        await self.db.refresh(db_result)
         return db_result
 
     async def get_test_statistics(
@@ -136,13 +142,14 @@ class ABTestService:
         confidence_level: float = 0.95
     ) -> Dict[str, ABTestStatistics]:
         """Получение статистики по A/B тесту"""
-        test = self.db.query(ABTest).filter(ABTest.id == test_id).first()
+        test = await self.db.get(ABTest, test_id)
         if not test:
             return {}
 
-        results = self.db.query(ABTestResult).filter(
-            ABTestResult.test_id == test_id
-        ).all()
+        result = await self.db.execute(
+            select(ABTestResult).where(ABTestResult.test_id == test_id)
+        )
+        results = result.scalars().all()
 
         statistics = {}
         for variant in test.variants.keys():
@@ -0,0 +1,214 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date, datetime, time
+import argparse
+import asyncio
+import logging
+import os
+from ..database import AsyncSessionLocal
+from ..config import settings
+from .analytics_partitions import _json_text, add_months, month_start
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - необязательная зависимость
+    pyarrow = None
+
+# Выгружаемые таблицы: столбец времени (для разбиения по месяцам) и столбцы с типами.
+# Тип "json" записывается строкой.
+EXPORT_TABLES: Dict[str, Dict[str, Any]] = {
+    "analytics": {
+        "time_column": "created_at",
+        "columns": [
+            ("id", "int64"),
+            ("user_id", "int64"),
+            ("event_type", "string"),
+            ("event_data", "json"),
+            ("metadata", "json"),
+            ("created_at", "timestamp")
+        ]
+    },
+    "bot_analytics": {
+        "time_column": "day",
+        "columns": [
+            ("id", "int64"),
+            ("bot_id", "int64"),
+            ("day", "date"),
+            ("views", "int64"),
+            ("purchases", "int64"),
+            ("revenue", "float64"),
+            ("avg_rating", "float64"),
+            ("reviews_count", "int64")
+        ]
+    }
+}
+
+def _arrow_type(name: str) -> Any:
+    return {
+        "int64": pyarrow.int64(),
+        "float64": pyarrow.float64(),
+        "string": pyarrow.string(),
+        "json": pyarrow.string(),
+        "timestamp": pyarrow.timestamp("us"),
+        "date": pyarrow.date32()
+    }[name]
+
+def month_path(directory: str, table: str, month: date) -> str:
+    """Файл месяца в раскладке Hive: <каталог>/<таблица>/month=YYYY-MM/data.parquet"""
+    return os.path.join(directory, table, f"month={month.year:04d}-{month.month:02d}", "data.parquet")
+
+class ParquetMonthWriter:
+    """Запись строк одной таблицы за месяц в Parquet пакетами (zstd).
+
+    Файл пишется под временным именем и заменяет прежний в close(),
+    поэтому читатели видят либо старую, либо новую выгрузку месяца.
+    """
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]]):
+        if pyarrow is None:
+            raise RuntimeError("pyarrow is required for Parquet export")
+        self.path = path
+        self.rows = 0
+        self._json_columns = [i for i, (_, kind) in enumerate(columns) if kind == "json"]
+        self._schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in columns])
+        self._tmp_path = f"{path}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._writer = pyarrow.parquet.ParquetWriter(self._tmp_path, self._schema, compression="zstd")
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Запись пакета строк в порядке столбцов таблицы"""
+        if not rows:
+            return
+        columns = [list(column) for column in zip(*rows)]
+        for i in self._json_columns:
+            columns[i] = [_json_text(value) for value in columns[i]]
+        self._writer.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+            schema=self._schema
+        ))
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Завершение записи и публикация файла"""
+        self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Прерывание записи с удалением временного файла"""
+        try:
+            self._writer.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+class AnalyticsExportService:
+    """Выгрузка analytics и bot_analytics в Parquet, разбитый по месяцам.
+
+    Каждый месяц читается отдельным запросом по диапазону времени (в
+    секционированной analytics это одна секция) через серверный курсор,
+    поэтому в памяти находится только текущий пакет строк. Повторная
+    выгрузка месяца заменяет его файл; прошлые месяцы не меняются, и для
+    регулярного обновления достаточно выгружать последние месяцы.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def export(
+        self,
+        directory: Optional[str] = None,
+        tables: Optional[List[str]] = None,
+        since: Optional[date] = None,
+        batch_size: Optional[int] = None,
+        today: Optional[date] = None
+    ) -> Dict[str, Dict[str, int]]:
+        """Выгрузка таблиц с месяца since (по умолчанию - с первой записи).
+
+        Возвращает {таблица: {"YYYY-MM": строк}}.
+        """
+        directory = directory or settings.ANALYTICS_EXPORT_DIR
+        batch_size = batch_size or settings.ANALYTICS_EXPORT_BATCH_SIZE
+        today = today or datetime.utcnow().date()
+
+        stats: Dict[str, Dict[str, int]] = {}
+        for table in tables or list(EXPORT_TABLES):
+            spec = EXPORT_TABLES[table]
+            first = since
+            if first is None:
+                first = await self.db.scalar(text(f"SELECT MIN({spec['time_column']}) FROM {table}"))
+                if first is None:
+                    stats[table] = {}
+                    continue
+            month = month_start(first)
+            last = month_start(today)
+
+            stats[table] = {}
+            while month <= last:
+                rows = await self._export_month(directory, table, spec, month, batch_size)
+                stats[table][f"{month.year:04d}-{month.month:02d}"] = rows
+                month = add_months(month, 1)
+
+        logger.info(f"Analytics exported to {directory}: {stats}")
+        return stats
+
+    async def _export_month(
+        self,
+        directory: str,
+        table: str,
+        spec: Dict[str, Any],
+        month: date,
+        batch_size: int
+    ) -> int:
+        columns = spec["columns"]
+        time_column = spec["time_column"]
+        start, end = month, add_months(month, 1)
+        if dict(columns)[time_column] == "timestamp":
+            start, end = datetime.combine(start, time.min), datetime.combine(end, time.min)
+
+        path = month_path(directory, table, month)
+        writer = ParquetMonthWriter(path, columns)
+        try:
+            result = await self.db.stream(text(
+                f"SELECT {', '.join(name for name, _ in columns)} FROM {table} "
+                f"WHERE {time_column} >= :start AND {time_column} < :end"
+            ).bindparams(start=start, end=end).execution_options(yield_per=batch_size))
+            async for partition in result.partitions():
+                writer.write(partition)
+        except BaseException:
+            writer.abort()
+            raise
+
+        if writer.rows:
+            writer.close()
+        else:
+            # Пустой месяц: файла быть не должно (в том числе от прежней выгрузки)
+            writer.abort()
+            if os.path.exists(path):
+                os.remove(path)
+        return writer.rows
+
+async def _main(args: argparse.Namespace) -> None:
+    since = None
+    if args.months is not None:
+        since = add_months(month_start(datetime.utcnow().date()), -(args.months - 1))
+    async with AsyncSessionLocal() as db:
+        stats = await AnalyticsExportService(db).export(
+            directory=args.directory,
+            tables=args.tables,
+            since=since
+        )
+    for table, months in stats.items():
+        print(f"{table}: {sum(months.values())} rows in {len(months)} months")
+
+if __name__ == "__main__":
+    # Ежедневное обновление последних месяцев: python -m backend.services.analytics_export --months 2
+    parser = argparse.ArgumentParser(description="Выгрузка аналитики в Parquet")
+    parser.add_argument("--directory", default=None, help="Каталог выгрузки")
+    parser.add_argument("--tables", nargs="+", choices=list(EXPORT_TABLES), default=None, help="Таблицы")
+    parser.add_argument("--months", type=int, default=None, help="Выгрузить только последние N месяцев")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,220 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import insert
+from datetime import datetime
+import asyncio
+import logging
+import time
+from ..models.analytics import Analytics
+from ..schemas.analytics import AnalyticsCreate
+from ..database import AsyncSessionLocal
+from ..config import settings
+from .unique_visitors import get_unique_visitor_counter
+
+logger = logging.getLogger(__name__)
+
+class IngestQueueFull(Exception):
+    """Очередь событий переполнена (нужно повторить запрос позже)"""
+
+class AnalyticsIngestor:
+    """Буферизованная запись событий аналитики.
+
+    Обработчик запроса только кладет событие в ограниченную очередь;
+    фоновая задача забирает события пакетами (по размеру или по времени)
+    и записывает каждый пакет одним INSERT с несколькими строками. При
+    переполнении очереди enqueue ждет не дольше enqueue_timeout, после
+    чего отказывает - так нагрузка не копится в памяти процесса.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        enqueue_timeout: Optional[float] = None
+    ):
+        self.max_queue_size = (
+            settings.ANALYTICS_QUEUE_MAX_SIZE
+            if max_queue_size is None else max_queue_size
+        )
+        self.batch_size = (
+            settings.ANALYTICS_BATCH_SIZE
+            if batch_size is None else batch_size
+        )
+        self.flush_interval = (
+            settings.ANALYTICS_FLUSH_INTERVAL
+            if flush_interval is None else flush_interval
+        )
+        self.enqueue_timeout = (
+            settings.ANALYTICS_ENQUEUE_TIMEOUT
+            if enqueue_timeout is None else enqueue_timeout
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._accepting = True
+        # Метрики
+        self.enqueued = 0
+        self.rejected = 0
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_flush_latency = 0.0
+        self.total_flush_latency = 0.0
+
+    @property
+    def queue(self) -> asyncio.Queue:
+        # Очередь создается в работающем event loop
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        return self._queue
+
+    async def enqueue(self, event: AnalyticsCreate) -> None:
+        """Постановка события в очередь записи"""
+        await self.enqueue_many([event])
+
+    async def enqueue_many(self, events: List[AnalyticsCreate]) -> None:
+        """Постановка нескольких событий в очередь записи"""
+        if not self._accepting:
+            self.rejected += len(events)
+            raise IngestQueueFull("Analytics ingestion is shutting down")
+
+        received_at = datetime.utcnow()
+        for i, event in enumerate(events):
+            row = self._to_row(event, received_at)
+            try:
+                self.queue.put_nowait(row)
+            except asyncio.QueueFull:
+                # Обратное давление: ждем освобождения места ограниченное время
+                try:
+                    await asyncio.wait_for(self.queue.put(row), timeout=self.enqueue_timeout)
+                except asyncio.TimeoutError:
+                    self.rejected += len(events) - i
+                    raise IngestQueueFull("Analytics queue is full")
+            self.enqueued += 1
+
+    def _to_row(self, event: AnalyticsCreate, received_at: datetime) -> Dict[str, Any]:
+        return {
+            "user_id": event.user_id,
+            "event_type": event.event_type,
+            "event_data": event.event_data,
+            "metadata_": event.metadata,
+            "created_at": received_at
+        }
+
+    async def _collect_batch(self) -> List[Dict[str, Any]]:
+        """Ожидание первого события и добор пакета до batch_size или flush_interval.
+
+        None в очереди - сигнал остановки: пакет записывается, не дожидаясь интервала.
+        """
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                row = await self.queue.get()
+                deadline = time.monotonic() + self.flush_interval
+            else:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    row = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+            if row is None:
+                self.queue.task_done()
+                break
+            batch.append(row)
+        return batch
+
+    async def _write(self, batch: List[Dict[str, Any]]) -> None:
+        """Запись пакета одним INSERT"""
+        started = time.monotonic()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(insert(Analytics), batch)
+                await db.commit()
+        except asyncio.CancelledError:
+            # Остановка по таймауту: пакет не записан
+            self.failed += len(batch)
+            raise
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Analytics batch of {len(batch)} events failed: {str(e)}")
+        else:
+            self.written += len(batch)
+            await get_unique_visitor_counter().add_events(batch)
+        finally:
+            self.last_flush_latency = time.monotonic() - started
+            self.total_flush_latency += self.last_flush_latency
+            self.batches += 1
+            for _ in batch:
+                self.queue.task_done()
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            if batch:
+                await self._write(batch)
+            if not self._accepting and self.queue.empty():
+                return
+
+    def start(self) -> None:
+        """Запуск фоновой записи"""
+        self._accepting = True
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30.0) -> None:
+        """Остановка: прием событий прекращается, очередь дописывается"""
+        self._accepting = False
+        if self._task is not None:
+            # Будим фоновую задачу: она дописывает текущий пакет и остаток очереди
+            try:
+                self.queue.put_nowait(None)
+            except asyncio.QueueFull:
+                pass
+            done, _ = await asyncio.wait({self._task}, timeout=timeout)
+            if not done:
+                logger.error(f"Analytics queue was not drained in {timeout}s: {self.queue.qsize()} events left")
+                # Задача не должна читать очередь одновременно с дописыванием ниже
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Фоновая запись не запускалась или не успела: дописываем сами
+        while not self.queue.empty():
+            batch = []
+            while len(batch) < self.batch_size and not self.queue.empty():
+                row = self.queue.get_nowait()
+                if row is None:
+                    self.queue.task_done()
+                else:
+                    batch.append(row)
+            if batch:
+                await self._write(batch)
+
+    def stats(self) -> Dict[str, Any]:
+        """Метрики очереди и записи"""
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue_size": self.max_queue_size,
+            "enqueued": self.enqueued,
+            "rejected": self.rejected,
+            "written": self.written,
+            "failed": self.failed,
+            "batches": self.batches,
+            "last_flush_latency": self.last_flush_latency,
+            "avg_flush_latency": self.total_flush_latency / self.batches if self.batches else 0.0
+        }
+
+# Общий для процесса экземпляр
+_analytics_ingestor: Optional[AnalyticsIngestor] = None
+
+def get_analytics_ingestor() -> AnalyticsIngestor:
+    """Получение общей очереди записи событий аналитики"""
+    global _analytics_ingestor
+    if _analytics_ingestor is None:
+        _analytics_ingestor = AnalyticsIngestor()
+    return _analytics_ingestor
@@ -0,0 +1,289 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from datetime import date, datetime
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import os
+import re
+from ..database import AsyncSessionLocal
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - необязательная зависимость
+    pyarrow = None
+
+# Секция для строк за пределами созданных месяцев (должна оставаться пустой)
+FUTURE_PARTITION = "p_future"
+
+_PARTITION_NAME = re.compile(r"^p(\d{4})(\d{2})$")
+
+# Столбцы архива в порядке записи
+ARCHIVE_COLUMNS = ("id", "user_id", "event_type", "event_data", "metadata", "created_at")
+
+# Строк в одном пакете чтения/записи архива
+ARCHIVE_BATCH_SIZE = 10000
+
+def month_start(value: date) -> date:
+    """Первый день месяца"""
+    return date(value.year, value.month, 1)
+
+def add_months(value: date, months: int) -> date:
+    """Первый день месяца, отстоящего от value на months"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(month: date) -> str:
+    """Имя секции месяца: p202610"""
+    return f"p{month.year:04d}{month.month:02d}"
+
+def partition_month(name: str) -> Optional[date]:
+    """Месяц секции по имени (None для служебных секций)"""
+    match = _PARTITION_NAME.match(name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def partition_clause(month: date) -> str:
+    """Описание секции месяца для PARTITION BY RANGE (TO_DAYS(created_at))"""
+    return (
+        f"PARTITION {partition_name(month)} "
+        f"VALUES LESS THAN (TO_DAYS('{add_months(month, 1).isoformat()}'))"
+    )
+
+def expired_partitions(names: Iterable[str], retention_months: int, today: date) -> List[str]:
+    """Секции, все строки которых старше срока хранения"""
+    if retention_months <= 0:
+        return []
+    cutoff = add_months(month_start(today), -retention_months)
+    return [
+        name for name in names
+        if partition_month(name) is not None and partition_month(name) < cutoff
+    ]
+
+def _json_text(value: Any) -> Optional[str]:
+    # MySQL отдает JSON строкой, но значение может прийти и разобранным
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+class ArchiveWriter:
+    """Запись строк analytics в Parquet (zstd) или CSV (gzip) пакетами.
+
+    Файл пишется под временным именем и переименовывается в close(),
+    поэтому неполный архив не принимается за готовый.
+    """
+
+    def __init__(self, path: str, fmt: str):
+        if fmt not in ("parquet", "csv"):
+            raise ValueError(f"Unknown archive format: {fmt}")
+        if fmt == "parquet" and pyarrow is None:
+            raise RuntimeError("pyarrow is required for Parquet archives")
+        self.path = path
+        self.fmt = fmt
+        self.rows = 0
+        self._tmp_path = f"{path}.tmp"
+        self._file = None
+        self._writer = None
+        if fmt == "parquet":
+            self._schema = pyarrow.schema([
+                ("id", pyarrow.int64()),
+                ("user_id", pyarrow.int64()),
+                ("event_type", pyarrow.string()),
+                ("event_data", pyarrow.string()),
+                ("metadata", pyarrow.string()),
+                ("created_at", pyarrow.timestamp("us"))
+            ])
+            self._writer = pyarrow.parquet.ParquetWriter(self._tmp_path, self._schema, compression="zstd")
+        else:
+            self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(ARCHIVE_COLUMNS)
+
+    def write(self, rows: Sequence[Sequence[Any]]) -> None:
+        """Запись пакета строк в порядке ARCHIVE_COLUMNS"""
+        if not rows:
+            return
+        rows = [
+            (row[0], row[1], row[2], _json_text(row[3]), _json_text(row[4]), row[5])
+            for row in rows
+        ]
+        if self.fmt == "parquet":
+            columns = list(zip(*rows))
+            self._writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(columns, self._schema)],
+                schema=self._schema
+            ))
+        else:
+            self._writer.writerows(
+                (*row[:5], row[5].isoformat() if row[5] is not None else None)
+                for row in rows
+            )
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        """Завершение записи и публикация файла"""
+        if self.fmt == "parquet":
+            self._writer.close()
+        else:
+            self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self) -> None:
+        """Прерывание записи с удалением временного файла"""
+        try:
+            if self.fmt == "parquet":
+                self._writer.close()
+            else:
+                self._file.close()
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+class AnalyticsPartitionManager:
+    """Обслуживание месячных секций таблицы analytics (MySQL).
+
+    Секции создаются заранее разбиением пустой секции p_future, а секции
+    старше срока хранения (после выгрузки в архив) удаляются целиком через
+    DROP PARTITION - без построчного DELETE и роста журнала. Без каталога
+    архива секции удаляются только при явном drop_without_archive.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def list_partitions(self) -> List[str]:
+        """Имена секций analytics по порядку"""
+        result = await self.db.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'analytics' "
+            "AND PARTITION_NAME IS NOT NULL "
+            "ORDER BY PARTITION_ORDINAL_POSITION"
+        ))
+        return [name for name, in result.all()]
+
+    async def ensure_partitions(self, months_ahead: int, today: Optional[date] = None) -> List[str]:
+        """Создание секций до months_ahead месяцев вперед; возвращает новые секции"""
+        today = today or datetime.utcnow().date()
+        names = await self.list_partitions()
+        if FUTURE_PARTITION not in names:
+            raise RuntimeError("Table analytics is not partitioned")
+
+        months = [partition_month(name) for name in names if partition_month(name) is not None]
+        first = add_months(max(months), 1) if months else month_start(today)
+        last = add_months(month_start(today), months_ahead)
+        new_months = []
+        month = first
+        while month <= last:
+            new_months.append(month)
+            month = add_months(month, 1)
+        if not new_months:
+            return []
+
+        clauses = [partition_clause(month) for month in new_months]
+        clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN MAXVALUE")
+        await self.db.execute(text(
+            f"ALTER TABLE analytics REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(clauses)})"
+        ))
+        return [partition_name(month) for month in new_months]
+
+    async def archive_partition(self, name: str, directory: str, fmt: str) -> str:
+        """Выгрузка секции в файл архива; возвращает путь к файлу"""
+        month = partition_month(name)
+        if month is None:
+            raise ValueError(f"Not a monthly partition: {name}")
+        extension = "parquet" if fmt == "parquet" else "csv.gz"
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"analytics_{month.year:04d}_{month.month:02d}.{extension}")
+
+        writer = ArchiveWriter(path, fmt)
+        try:
+            result = await self.db.stream(text(
+                f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM analytics PARTITION ({name}) ORDER BY created_at"
+            ).execution_options(yield_per=ARCHIVE_BATCH_SIZE))
+            async for partition in result.partitions():
+                writer.write(partition)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.close()
+        logger.info(f"Partition {name} archived to {path}: {writer.rows} rows")
+        return path
+
+    async def drop_partition(self, name: str) -> None:
+        """Удаление секции вместе со всеми строками"""
+        if partition_month(name) is None:
+            raise ValueError(f"Not a monthly partition: {name}")
+        await self.db.execute(text(f"ALTER TABLE analytics DROP PARTITION {name}"))
+
+    async def run(
+        self,
+        retention_months: Optional[int] = None,
+        months_ahead: Optional[int] = None,
+        archive_dir: Optional[str] = None,
+        archive_format: Optional[str] = None,
+        drop_without_archive: Optional[bool] = None,
+        today: Optional[date] = None
+    ) -> Dict[str, List[str]]:
+        """Создание будущих секций и удаление (с архивом) устаревших"""
+        retention_months = settings.ANALYTICS_RETENTION_MONTHS if retention_months is None else retention_months
+        months_ahead = settings.ANALYTICS_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+        archive_dir = settings.ANALYTICS_ARCHIVE_DIR if archive_dir is None else archive_dir
+        archive_format = archive_format or settings.ANALYTICS_ARCHIVE_FORMAT
+        drop_without_archive = (
+            settings.ANALYTICS_DROP_WITHOUT_ARCHIVE
+            if drop_without_archive is None else drop_without_archive
+        )
+        today = today or datetime.utcnow().date()
+
+        created = await self.ensure_partitions(months_ahead, today)
+        expired = expired_partitions(await self.list_partitions(), retention_months, today)
+        dropped, archives, kept = [], [], []
+        if expired and not archive_dir and not drop_without_archive:
+            # Без архива данные были бы потеряны безвозвратно
+            logger.warning(
+                f"Expired analytics partitions kept, no archive directory configured: {expired}"
+            )
+            kept, expired = expired, []
+        for name in expired:
+            if archive_dir:
+                archives.append(await self.archive_partition(name, archive_dir, archive_format))
+            await self.drop_partition(name)
+            dropped.append(name)
+
+        stats = {"created": created, "dropped": dropped, "archives": archives, "kept": kept}
+        logger.info(f"Analytics partitions maintained: {stats}")
+        return stats
+
+async def _main(args: argparse.Namespace) -> None:
+    async with AsyncSessionLocal() as db:
+        stats = await AnalyticsPartitionManager(db).run(
+            retention_months=args.retention_months,
+            months_ahead=args.months_ahead,
+            archive_dir=args.archive_dir,
+            archive_format=args.format,
+            drop_without_archive=args.no_archive
+        )
+    print(
+        f"Created: {stats['created']}, dropped: {stats['dropped']}, "
+        f"archives: {stats['archives']}, kept: {stats['kept']}"
+    )
+
+if __name__ == "__main__":
+    # Запуск раз в сутки (cron): python -m backend.services.analytics_partitions --archive-dir /data/archive
+    parser = argparse.ArgumentParser(description="Обслуживание секций таблицы analytics")
+    parser.add_argument("--retention-months", type=int, default=None, help="Срок хранения (месяцы, 0 - без удаления)")
+    parser.add_argument("--months-ahead", type=int, default=None, help="Секции, создаваемые заранее (месяцы)")
+    parser.add_argument("--archive-dir", default=None, help="Каталог архива (пусто - устаревшие секции не удаляются)")
+    parser.add_argument("--no-archive", action="store_true", default=None, help="Удалять устаревшие секции без архива")
+    parser.add_argument("--format", choices=("parquet", "csv"), default=None, help="Формат архива")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,140 @@
+from typing import Any, Dict, List, Optional
+from datetime import date, timedelta
+import asyncio
+import glob
+import os
+import re
+from ..config import settings
+from .analytics_export import EXPORT_TABLES
+
+try:
+    import duckdb
+except ImportError:  # pragma: no cover - необязательная зависимость
+    duckdb = None
+
+class AnalyticsQueryError(Exception):
+    """Отчет не может быть построен (неизвестный отчет или нет выгрузки)"""
+
+# Отчеты для администраторов: SQL над выгрузкой (представления analytics, bot_analytics).
+# Параметры: $start, $end (end не включается), $start_month, $end_month, $limit.
+# Условие по month отсекает файлы месяцев вне периода без их чтения.
+REPORTS: Dict[str, str] = {
+    "events_by_day": """
+        SELECT CAST(created_at AS DATE) AS day, event_type, COUNT(*) AS events
+        FROM analytics
+        WHERE month BETWEEN $start_month AND $end_month
+          AND created_at >= $start AND created_at < $end
+        GROUP BY day, event_type
+        ORDER BY day, event_type
+    """,
+    "active_users_by_day": """
+        SELECT CAST(created_at AS DATE) AS day, COUNT(DISTINCT user_id) AS users
+        FROM analytics
+        WHERE month BETWEEN $start_month AND $end_month
+          AND created_at >= $start AND created_at < $end
+          AND user_id IS NOT NULL
+        GROUP BY day
+        ORDER BY day
+    """,
+    "top_bots": """
+        SELECT bot_id, SUM(views) AS views, SUM(purchases) AS purchases, SUM(revenue) AS revenue,
+               SUM(purchases) / NULLIF(SUM(views), 0) AS conversion
+        FROM bot_analytics
+        WHERE month BETWEEN $start_month AND $end_month
+          AND day >= $start AND day < $end
+        GROUP BY bot_id
+        ORDER BY revenue DESC, views DESC
+        LIMIT $limit
+    """,
+    "revenue_by_month": """
+        SELECT month, SUM(views) AS views, SUM(purchases) AS purchases, SUM(revenue) AS revenue
+        FROM bot_analytics
+        WHERE month BETWEEN $start_month AND $end_month
+          AND day >= $start AND day < $end
+        GROUP BY month
+        ORDER BY month
+    """
+}
+
+class AnalyticsQueryEngine:
+    """Отчеты по выгрузке аналитики во встроенном DuckDB.
+
+    Запросы читают Parquet-файлы AnalyticsExportService и не обращаются к
+    MySQL. Каждый отчет выполняется в отдельном потоке в собственном
+    соединении DuckDB с ограничением потоков и памяти; число одновременных
+    отчетов ограничено, чтобы они не отнимали ресурсы у API.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.directory = directory or settings.ANALYTICS_EXPORT_DIR
+        self.threads = threads or settings.ANALYTICS_QUERY_THREADS
+        self.memory_limit = memory_limit or settings.ANALYTICS_QUERY_MEMORY_LIMIT
+        self.concurrency = concurrency or settings.ANALYTICS_QUERY_CONCURRENCY
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run_report(
+        self,
+        report: str,
+        start_date: date,
+        end_date: date,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Построение отчета за период [start_date, end_date]"""
+        if report not in REPORTS:
+            raise AnalyticsQueryError(f"Unknown report: {report}")
+        if duckdb is None:
+            raise AnalyticsQueryError("duckdb is required for analytics reports")
+        if start_date > end_date:
+            raise AnalyticsQueryError("start_date must not be after end_date")
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            columns, rows = await asyncio.to_thread(self._execute, REPORTS[report], {
+                "start": start_date,
+                # Конец периода включается: сравниваем с началом следующего дня
+                "end": end_date + timedelta(days=1),
+                "start_month": f"{start_date.year:04d}-{start_date.month:02d}",
+                "end_month": f"{end_date.year:04d}-{end_date.month:02d}",
+                "limit": limit
+            })
+        return {"report": report, "columns": columns, "rows": rows}
+
+    def _execute(self, sql: str, params: Dict[str, Any]) -> Any:
+        connection = duckdb.connect(config={"threads": self.threads, "memory_limit": self.memory_limit})
+        try:
+            for table in EXPORT_TABLES:
+                files = os.path.join(self.directory, table, "month=*", "*.parquet")
+                if not glob.glob(files):
+                    continue
+                quoted = files.replace("'", "''")
+                connection.execute(
+                    f"CREATE VIEW {table} AS SELECT * FROM read_parquet('{quoted}', "
+                    f"hive_partitioning = true, hive_types = {{'month': VARCHAR}})"
+                )
+            try:
+                # DuckDB не принимает параметры, которых нет в запросе
+                used = set(re.findall(r"\$(\w+)", sql))
+                cursor = connection.execute(sql, {name: value for name, value in params.items() if name in used})
+            except duckdb.CatalogException as e:
+                raise AnalyticsQueryError(f"No exported data for report: {str(e)}")
+            columns = [column[0] for column in cursor.description]
+            return columns, [list(row) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+# Общий для процесса экземпляр
+_analytics_query_engine: Optional[AnalyticsQueryEngine] = None
+
+def get_analytics_query_engine() -> AnalyticsQueryEngine:
+    """Получение общего исполнителя отчетов по выгрузке"""
+    global _analytics_query_engine
+    if _analytics_query_engine is None:
+        _analytics_query_engine = AnalyticsQueryEngine()
+    return _analytics_query_engine
@@ -1,14 +1,32 @@
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from datetime import datetime, timedelta
-from ..models.analytics import Analytics, BotAnalytics, AnalyticsEventType
-from ..schemas.analytics import AnalyticsEventCreate, BotAnalyticsCreate, BotAnalyticsUpdate, AnalyticsCreate, AnalyticsSummary
-from ..models.bot import Bot
-from ..models.category import Category
+from typing import List, Optional, Dict, Any, AsyncIterator, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, desc, insert, delete
+from sqlalchemy.dialects import mysql
+from pydantic import ValidationError
+from datetime import datetime, timedelta, date, time
+import argparse
+import asyncio
+import logging
+from ..models.analytics import Analytics, BotAnalytics, AnalyticsEventType, AnalyticsDailyTotals, CategoryAnalyticsDaily
+from ..schemas.analytics import AnalyticsEventCreate, BotAnalyticsCreate, BotAnalyticsUpdate, BotAnalyticsResponse, AnalyticsCreate, AnalyticsSummary, AnalyticsBulkResult
+from ..models import Bot, Category
+from ..json_stream import JSONStreamError, JSONStreamTooLarge
+from ..database import AsyncSessionLocal, ReadSessionLocal
+from ..config import settings
+from .cache_service import CacheService
+from .unique_visitors import get_unique_visitor_counter
+from .popular_bots import get_popular_bots_tracker, window_bounds
+
+logger = logging.getLogger(__name__)
+
+# Ошибок проверки в ответе на пакетную запись
+MAX_REPORTED_ERRORS = 20
+
+# Счетчики, которые складываются при пакетном обновлении
+COUNTER_FIELDS = ("views", "purchases", "revenue")
 
 class AnalyticsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def track_event(self, event: AnalyticsCreate) -> Analytics:
@@ -16,101 +34,347 @@ class AnalyticsService:
             user_id=event.user_id,
             event_type=event.event_type,
             event_data=event.event_data,
-            metadata=event.metadata
+            metadata_=event.metadata
         )
         self.db.add(db_event)
-        self.db.commit()
-        self.db.refresh(db_event)
+        await self.db.commit()
+        await self.db.refresh(db_event)
         return db_event
 
-    async def update_bot_analytics(self, bot_id: int, event_type: str, amount: float = 0.0) -> BotAnalytics:
-        today = datetime.utcnow().date()
-        bot_analytics = self.db.query(BotAnalytics).filter(
-            BotAnalytics.bot_id == bot_id,
-            func.date(BotAnalytics.date) == today
-        ).first()
-
-        if not bot_analytics:
-            bot_analytics = BotAnalytics(
-                bot_id=bot_id,
-                date=datetime.utcnow(),
-                views=0,
-                purchases=0,
-                revenue=0.0
-            )
-            self.db.add(bot_analytics)
+    async def track_events_bulk(
+        self,
+        items: AsyncIterator[Any],
+        chunk_size: Optional[int] = None,
+        max_events: Optional[int] = None
+    ) -> AnalyticsBulkResult:
+        """Пакетная запись событий из потока.
+
+        События проверяются по мере поступления и копятся в памяти; каждые
+        chunk_size строк записываются одним INSERT в своей транзакции. Пока
+        читается тело запроса, соединение с базой не занято, поэтому
+        медленный клиент не держит соединение из пула. Некорректные события
+        пропускаются и попадают в отчет; при ошибке разбора потока уже
+        записанные пакеты остаются, а число записанных событий добавляется
+        к сообщению ошибки.
+        """
+        chunk_size = chunk_size or settings.ANALYTICS_BATCH_SIZE
+        max_events = max_events or settings.ANALYTICS_BULK_MAX_EVENTS
+        result = AnalyticsBulkResult(accepted=0)
+        received_at = datetime.utcnow()
+        rows = []
+        index = 0
+        try:
+            async for item in items:
+                if index >= max_events:
+                    raise JSONStreamTooLarge(f"More than {max_events} events in one request")
+                try:
+                    event = AnalyticsCreate.model_validate(item)
+                except ValidationError as e:
+                    result.rejected += 1
+                    if len(result.errors) < MAX_REPORTED_ERRORS:
+                        result.errors.append({"index": index, "error": e.errors(include_url=False)})
+                else:
+                    rows.append({
+                        "user_id": event.user_id,
+                        "event_type": event.event_type,
+                        "event_data": event.event_data,
+                        "metadata_": event.metadata,
+                        "created_at": received_at
+                    })
+                index += 1
+
+                if len(rows) >= chunk_size:
+                    await self._write_events(rows, result)
+                    rows = []
+        except JSONStreamError as e:
+            if result.accepted:
+                raise type(e)(f"{str(e)} ({result.accepted} events already written)") from e
+            raise
+
+        if rows:
+            await self._write_events(rows, result)
+        return result
+
+    async def _write_events(self, rows: List[Dict[str, Any]], result: AnalyticsBulkResult) -> None:
+        """Запись пакета событий в отдельной транзакции"""
+        try:
+            await self.db.execute(insert(Analytics), rows)
+            await self.db.commit()
+        except Exception:
+            await self.db.rollback()
+            raise
+        result.accepted += len(rows)
+        await get_unique_visitor_counter().add_events(rows)
 
+    async def update_bot_analytics(
+        self,
+        bot_id: int,
+        event_type: str,
+        amount: float = 0.0,
+        user_id: Optional[int] = None
+    ) -> BotAnalytics:
+        today = datetime.utcnow().date()
+        counters = {"views": 0, "purchases": 0, "revenue": 0.0}
         if event_type == "view":
-            bot_analytics.views += 1
+            counters["views"] = 1
         elif event_type == "purchase":
-            bot_analytics.purchases += 1
-            bot_analytics.revenue += amount
+            counters["purchases"] = 1
+            counters["revenue"] = amount
+
+        await self.increment_bot_analytics({(bot_id, today): counters})
+        if event_type == "view" and user_id is not None:
+            await get_unique_visitor_counter().add(today, user_id, bot_id)
+
+        result = await self.db.execute(
+            select(BotAnalytics).where(
+                BotAnalytics.bot_id == bot_id,
+                BotAnalytics.day == today
+            ).execution_options(populate_existing=True)
+        )
+        return result.scalars().one()
+
+    async def record_bot_event(
+        self,
+        bot_id: int,
+        event_type: str,
+        amount: float = 0.0,
+        user_id: Optional[int] = None
+    ) -> None:
+        """Учет просмотра или покупки бота: через счетчики Redis или сразу в базе.
+
+        Просмотр с user_id учитывается и в уникальных зрителях бота.
+        """
+        if event_type == "view" and user_id is not None:
+            await get_unique_visitor_counter().add(datetime.utcnow().date(), user_id, bot_id)
+        if settings.BOT_ANALYTICS_REDIS_COUNTERS:
+            # Импорт здесь: счетчики используют этот сервис для записи
+            from .bot_analytics_counters import get_bot_analytics_counters
+            await get_bot_analytics_counters().record(bot_id, event_type, amount)
+        else:
+            await self.increment_bot_analytics({
+                (bot_id, datetime.utcnow().date()): {
+                    "views": 1 if event_type == "view" else 0,
+                    "purchases": 1 if event_type == "purchase" else 0,
+                    "revenue": amount if event_type == "purchase" else 0.0
+                }
+            })
+
+    async def increment_bot_analytics(self, counters: Dict[Tuple[int, date], Dict[str, float]]) -> None:
+        """Атомарное увеличение дневных счетчиков ботов.
 
-        self.db.commit()
-        self.db.refresh(bot_analytics)
-        return bot_analytics
+        counters: {(bot_id, day): {"views": n, "purchases": n, "revenue": x}}.
+        Все строки записываются одним INSERT ... ON DUPLICATE KEY UPDATE,
+        приращения складываются на стороне базы, поэтому параллельные
+        обновления не теряются. В той же транзакции обновляются дневные
+        итоги и итоги по категориям для сводки.
+        """
+        if not counters:
+            return
 
-    async def get_bot_analytics(self, bot_id: int, start_date: datetime, end_date: datetime) -> List[BotAnalytics]:
-        return self.db.query(BotAnalytics).filter(
-            BotAnalytics.bot_id == bot_id,
-            BotAnalytics.date >= start_date,
-            BotAnalytics.date <= end_date
-        ).all()
+        bot_rows = []
+        day_totals: Dict[date, Dict[str, float]] = {}
+        category_totals: Dict[Tuple[int, date], Dict[str, float]] = {}
+
+        result = await self.db.execute(
+            select(Bot.id, Bot.category_id).where(Bot.id.in_({bot_id for bot_id, _ in counters}))
+        )
+        bot_categories = dict(result.all())
+
+        for (bot_id, day), values in counters.items():
+            increments = {
+                "views": int(values.get("views", 0)),
+                "purchases": int(values.get("purchases", 0)),
+                "revenue": float(values.get("revenue", 0.0))
+            }
+            bot_rows.append({
+                "bot_id": bot_id,
+                "day": day,
+                "date": datetime.combine(day, time.min),
+                **increments
+            })
+            targets = [day_totals.setdefault(day, dict.fromkeys(COUNTER_FIELDS, 0))]
+            category_id = bot_categories.get(bot_id)
+            if category_id is not None:
+                targets.append(category_totals.setdefault((category_id, day), dict.fromkeys(COUNTER_FIELDS, 0)))
+            for target in targets:
+                for field in COUNTER_FIELDS:
+                    target[field] += increments[field]
+
+        await self._upsert_increments(BotAnalytics, bot_rows)
+        await self._upsert_increments(AnalyticsDailyTotals, [
+            {"day": day, **values} for day, values in day_totals.items()
+        ])
+        await self._upsert_increments(CategoryAnalyticsDaily, [
+            {"category_id": category_id, "day": day, **values}
+            for (category_id, day), values in category_totals.items()
+        ])
+        await self.db.commit()
+
+        # Скользящие рейтинги популярных ботов обновляются теми же приращениями
+        try:
+            await get_popular_bots_tracker().record(
+                (row["bot_id"], bot_categories.get(row["bot_id"]), row["day"], row)
+                for row in bot_rows
+            )
+        except Exception as e:
+            logger.error(f"Popular bots update failed: {str(e)}")
+
+    async def _upsert_increments(self, model: Any, rows: List[Dict[str, Any]]) -> None:
+        """INSERT ... ON DUPLICATE KEY UPDATE, прибавляющий счетчики к существующей строке"""
+        if not rows:
+            return
+        statement = mysql.insert(model).values(rows)
+        await self.db.execute(statement.on_duplicate_key_update({
+            field: getattr(model, field) + getattr(statement.inserted, field)
+            for field in COUNTER_FIELDS
+        }))
+
+    async def rebuild_summary_rollups(self, start_day: date, end_day: date) -> None:
+        """Пересчет итогов сводки за период по bot_analytics (начальное заполнение, рейтинги).
+
+        Запуск из командной строки: python -m backend.services.analytics_service.
+        """
+        await self.db.execute(
+            delete(AnalyticsDailyTotals).where(AnalyticsDailyTotals.day.between(start_day, end_day))
+        )
+        await self.db.execute(
+            delete(CategoryAnalyticsDaily).where(CategoryAnalyticsDaily.day.between(start_day, end_day))
+        )
+        await self.db.execute(insert(AnalyticsDailyTotals).from_select(
+            ["day", "views", "purchases", "revenue", "reviews_count", "rating_sum", "rating_count"],
+            select(
+                BotAnalytics.day,
+                func.coalesce(func.sum(BotAnalytics.views), 0),
+                func.coalesce(func.sum(BotAnalytics.purchases), 0),
+                func.coalesce(func.sum(BotAnalytics.revenue), 0.0),
+                func.coalesce(func.sum(BotAnalytics.reviews_count), 0),
+                func.coalesce(func.sum(BotAnalytics.avg_rating), 0.0),
+                func.count(BotAnalytics.avg_rating)
+            ).where(
+                BotAnalytics.day.between(start_day, end_day)
+            ).group_by(BotAnalytics.day)
+        ))
+        await self.db.execute(insert(CategoryAnalyticsDaily).from_select(
+            ["category_id", "day", "views", "purchases", "revenue"],
+            select(
+                Bot.category_id,
+                BotAnalytics.day,
+                func.coalesce(func.sum(BotAnalytics.views), 0),
+                func.coalesce(func.sum(BotAnalytics.purchases), 0),
+                func.coalesce(func.sum(BotAnalytics.revenue), 0.0)
+            ).join(
+                Bot, Bot.id == BotAnalytics.bot_id
+            ).where(
+                BotAnalytics.day.between(start_day, end_day),
+                Bot.category_id.isnot(None)
+            ).group_by(Bot.category_id, BotAnalytics.day)
+        ))
+        await self.db.commit()
+
+    async def get_bot_analytics(self, bot_id: int, start_date: datetime, end_date: datetime) -> List[BotAnalyticsResponse]:
+        """Дневная статистика бота с уникальными зрителями (HyperLogLog)"""
+        result = await self.db.execute(
+            select(BotAnalytics).where(
+                BotAnalytics.bot_id == bot_id,
+                BotAnalytics.date >= start_date,
+                BotAnalytics.date <= end_date
+            )
+        )
+        rows = result.scalars().all()
+        unique_viewers = await get_unique_visitor_counter().count_bot_viewers_by_day(
+            bot_id, [row.day for row in rows]
+        )
+        return [
+            BotAnalyticsResponse.model_validate(row).model_copy(update={"unique_viewers": unique_viewers[row.day]})
+            for row in rows
+        ]
 
     async def get_analytics_summary(self, days: int = 30) -> AnalyticsSummary:
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
+        """Сводка за последние days дней (из дневных итогов, с кратким кэшированием)"""
+        cache = CacheService()
+
+        async def compute() -> AnalyticsSummary:
+            # Пересчет может идти в фоне после ответа, поэтому в собственной сессии (на реплике)
+            async with ReadSessionLocal() as db:
+                return await AnalyticsService(db)._compute_analytics_summary(days)
+
+        return await cache.get_or_compute(
+            cache.get_key("analytics_summary", days),
+            compute,
+            ttl=settings.ANALYTICS_SUMMARY_CACHE_TTL
+        )
+
+    async def _compute_analytics_summary(self, days: int = 30) -> AnalyticsSummary:
+        """Сводка по итоговым таблицам: объем чтения зависит от периода, а не от истории"""
+        start_day, end_day = window_bounds(days)
 
         # Получаем общую статистику
-        total_stats = self.db.query(
-            func.sum(BotAnalytics.views).label('total_views'),
-            func.sum(BotAnalytics.purchases).label('total_purchases'),
-            func.sum(BotAnalytics.revenue).label('total_revenue'),
-            func.avg(BotAnalytics.avg_rating).label('avg_rating'),
-            func.sum(BotAnalytics.reviews_count).label('total_reviews')
-        ).filter(
-            BotAnalytics.date >= start_date,
-            BotAnalytics.date <= end_date
-        ).first()
+        result = await self.db.execute(
+            select(
+                func.sum(AnalyticsDailyTotals.views).label('total_views'),
+                func.sum(AnalyticsDailyTotals.purchases).label('total_purchases'),
+                func.sum(AnalyticsDailyTotals.revenue).label('total_revenue'),
+                func.sum(AnalyticsDailyTotals.rating_sum).label('rating_sum'),
+                func.sum(AnalyticsDailyTotals.rating_count).label('rating_count'),
+                func.sum(AnalyticsDailyTotals.reviews_count).label('total_reviews')
+            ).where(
+                AnalyticsDailyTotals.day.between(start_day, end_day)
+            )
+        )
+        total_stats = result.first()
 
         # Получаем топ категорий
-        top_categories = self.db.query(
-            Category.name,
-            func.sum(BotAnalytics.views).label('views')
-        ).join(
-            Bot, Bot.category_id == Category.id
-        ).join(
-            BotAnalytics, BotAnalytics.bot_id == Bot.id
-        ).filter(
-            BotAnalytics.date >= start_date,
-            BotAnalytics.date <= end_date
-        ).group_by(
-            Category.name
-        ).order_by(
-            func.sum(BotAnalytics.views).desc()
-        ).limit(5).all()
-
-        # Получаем топ ботов
-        top_bots = self.db.query(
-            Bot.name,
-            func.sum(BotAnalytics.views).label('views')
-        ).join(
-            BotAnalytics, BotAnalytics.bot_id == Bot.id
-        ).filter(
-            BotAnalytics.date >= start_date,
-            BotAnalytics.date <= end_date
+        category_views = func.sum(CategoryAnalyticsDaily.views).label('views')
+        result = await self.db.execute(
+            select(
+                Category.name,
+                category_views
+            ).join(
+                CategoryAnalyticsDaily, CategoryAnalyticsDaily.category_id == Category.id
+            ).where(
+                CategoryAnalyticsDaily.day.between(start_day, end_day)
+            ).group_by(
+                Category.id, Category.name
+            ).order_by(
+                category_views.desc()
+            ).limit(5)
+        )
+        top_categories = result.all()
+
+        # Получаем топ ботов (по ключу bot_id, day - только строки периода)
+        bot_views = func.sum(BotAnalytics.views).label('views')
+        top_bot_ids = select(
+            BotAnalytics.bot_id,
+            bot_views
+        ).where(
+            BotAnalytics.day.between(start_day, end_day)
         ).group_by(
-            Bot.name
+            BotAnalytics.bot_id
         ).order_by(
-            func.sum(BotAnalytics.views).desc()
-        ).limit(5).all()
+            bot_views.desc()
+        ).limit(5).subquery()
+        result = await self.db.execute(
+            select(
+                Bot.name,
+                top_bot_ids.c.views
+            ).join(
+                top_bot_ids, top_bot_ids.c.bot_id == Bot.id
+            ).order_by(
+                top_bot_ids.c.views.desc()
+            )
+        )
+        top_bots = result.all()
+
+        # Уникальные пользователи за период: объединение дневных HyperLogLog
+        unique_visitors = await get_unique_visitor_counter().count_visitors(start_day, end_day)
 
         return AnalyticsSummary(
             total_views=total_stats.total_views or 0,
             total_purchases=total_stats.total_purchases or 0,
             total_revenue=total_stats.total_revenue or 0.0,
-            avg_rating=float(total_stats.avg_rating) if total_stats.avg_rating else None,
+            avg_rating=float(total_stats.rating_sum / total_stats.rating_count) if total_stats.rating_count else None,
             total_reviews=total_stats.total_reviews or 0,
+            unique_visitors=unique_visitors,
             top_categories={cat.name: int(cat.views) for cat in top_categories},
             top_bots={bot.name: int(bot.views) for bot in top_bots}
         )
@@ -120,21 +384,50 @@ class AnalyticsService:
         limit: int = 10,
         days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Получение списка популярных ботов"""
-        start_date = datetime.now() - timedelta(days=days)
-        
-        popular_bots = self.db.query(
-            BotAnalytics.bot_id,
-            func.sum(BotAnalytics.views).label("total_views"),
-            func.sum(BotAnalytics.purchases).label("total_purchases"),
-            func.sum(BotAnalytics.revenue).label("total_revenue")
-        ).filter(
-            BotAnalytics.date >= start_date
-        ).group_by(
-            BotAnalytics.bot_id
-        ).order_by(
-            desc("total_views")
-        ).limit(limit).all()
+        """Получение списка популярных ботов (по просмотрам за последние days дней).
+
+        Читает рейтинги Redis; если окна там нет, считает по bot_analytics.
+        """
+        tracker = get_popular_bots_tracker()
+        if days > tracker.retention_days:
+            # Дневные рейтинги за такой период уже не хранятся
+            return await self._get_popular_bots_from_db(limit, days)
+
+        top = await tracker.top("views", limit, days)
+        if not top:
+            # Рейтинги в Redis пусты (после развертывания или очистки Redis)
+            return await self._get_popular_bots_from_db(limit, days)
+        bot_ids = [bot_id for bot_id, _ in top]
+        purchases = await tracker.scores("purchases", bot_ids, days)
+        revenue = await tracker.scores("revenue", bot_ids, days)
+        return [
+            {
+                "bot_id": bot_id,
+                "total_views": int(views),
+                "total_purchases": int(purchases[bot_id]),
+                "total_revenue": revenue[bot_id]
+            }
+            for bot_id, views in top
+        ]
+
+    async def _get_popular_bots_from_db(self, limit: int, days: int) -> List[Dict[str, Any]]:
+        start_day, end_day = window_bounds(days)
+
+        result = await self.db.execute(
+            select(
+                BotAnalytics.bot_id,
+                func.sum(BotAnalytics.views).label("total_views"),
+                func.sum(BotAnalytics.purchases).label("total_purchases"),
+                func.sum(BotAnalytics.revenue).label("total_revenue")
+            ).where(
+                BotAnalytics.day.between(start_day, end_day)
+            ).group_by(
+                BotAnalytics.bot_id
+            ).order_by(
+                desc("total_views")
+            ).limit(limit)
+        )
+        popular_bots = result.all()
 
         return [
             {
@@ -151,20 +444,55 @@ class AnalyticsService:
         user_id: int,
         days: int = 30
     ) -> Dict[str, Any]:
-        """Получение активности пользователя"""
-        start_date = datetime.now() - timedelta(days=days)
+        """Получение активности пользователя (условие по created_at отсекает старые секции)"""
+        start_date = datetime.utcnow() - timedelta(days=days)
         
-        activity = self.db.query(
-            Analytics.event_type,
-            func.count(Analytics.id).label("count")
-        ).filter(
-            Analytics.user_id == user_id,
-            Analytics.created_at >= start_date
-        ).group_by(
-            Analytics.event_type
-        ).all()
+        result = await self.db.execute(
+            select(
+                Analytics.event_type,
+                func.count(Analytics.id).label("count")
+            ).where(
+                Analytics.user_id == user_id,
+                Analytics.created_at >= start_date
+            ).group_by(
+                Analytics.event_type
+            )
+        )
+        activity = result.all()
 
         return {
-            event_type.value: count
+            event_type: count
             for event_type, count in activity
-        } 
\ No newline at end of file
+        } 
+
+async def record_bot_event_background(
+    bot_id: int,
+    event_type: str,
+    amount: float = 0.0,
+    user_id: Optional[int] = None
+) -> None:
+    """Учет просмотра или покупки бота после ответа (BackgroundTasks).
+
+    Запись идет в собственной сессии основной базы; ошибка учета не влияет
+    на запрос и только логируется.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await AnalyticsService(db).record_bot_event(bot_id, event_type, amount, user_id)
+    except Exception as e:
+        logger.error(f"Bot {event_type} tracking failed for bot {bot_id}: {str(e)}")
+
+async def _main(args: argparse.Namespace) -> None:
+    end_day = args.end or datetime.utcnow().date()
+    async with AsyncSessionLocal() as db:
+        await AnalyticsService(db).rebuild_summary_rollups(args.start, end_day)
+    print(f"Summary rollups rebuilt: {args.start} - {end_day}")
+
+if __name__ == "__main__":
+    # После развертывания итоговых таблиц или правки bot_analytics:
+    # python -m backend.services.analytics_service --start 2024-01-01
+    parser = argparse.ArgumentParser(description="Пересчет итогов сводки аналитики по bot_analytics")
+    parser.add_argument("--start", type=date.fromisoformat, required=True, help="Первый день (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, default=None, help="Последний день (по умолчанию сегодня)")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -0,0 +1,112 @@
+from typing import Dict, Optional, Tuple
+from datetime import date, datetime
+import asyncio
+import logging
+from ..database import AsyncSessionLocal
+from ..config import settings
+from .cache_service import CacheService
+from .analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+# Хэш приращений: поле "<день>:<bot_id>:<счетчик>"
+COUNTERS_KEY = "bot_analytics:counters"
+
+# Атомарное чтение и очистка хэша: приращения, пришедшие после, попадут в следующий сброс
+_TAKE_COUNTERS_SCRIPT = """
+local data = redis.call("hgetall", KEYS[1])
+redis.call("del", KEYS[1])
+return data
+"""
+
+class BotAnalyticsCounters:
+    """Дневные счетчики ботов в Redis с периодическим сбросом в bot_analytics.
+
+    Просмотры и покупки увеличиваются HINCRBY/HINCRBYFLOAT (без обращения к
+    базе), а фоновая задача раз в flush_interval секунд забирает накопленные
+    приращения со всех воркеров и записывает их одним атомарным upsert.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None):
+        self.flush_interval = (
+            settings.BOT_ANALYTICS_FLUSH_INTERVAL
+            if flush_interval is None else flush_interval
+        )
+        self.cache = CacheService()
+        self._task: Optional[asyncio.Task] = None
+
+    async def record(self, bot_id: int, event_type: str, amount: float = 0.0) -> None:
+        """Учет просмотра или покупки бота"""
+        prefix = f"{datetime.utcnow().date().isoformat()}:{bot_id}"
+        if event_type == "view":
+            await self.cache.redis.hincrby(COUNTERS_KEY, f"{prefix}:views", 1)
+        elif event_type == "purchase":
+            async with self.cache.redis.pipeline(transaction=False) as pipe:
+                pipe.hincrby(COUNTERS_KEY, f"{prefix}:purchases", 1)
+                pipe.hincrbyfloat(COUNTERS_KEY, f"{prefix}:revenue", amount)
+                await pipe.execute()
+
+    async def flush(self) -> int:
+        """Запись накопленных приращений в базу; возвращает число строк"""
+        data = await self.cache.redis.eval(_TAKE_COUNTERS_SCRIPT, 1, COUNTERS_KEY)
+        counters: Dict[Tuple[int, date], Dict[str, float]] = {}
+        for field, value in zip(data[::2], data[1::2]):
+            day, bot_id, name = field.decode("utf-8").split(":")
+            key = (int(bot_id), date.fromisoformat(day))
+            counters.setdefault(key, {})[name] = float(value)
+        if not counters:
+            return 0
+
+        try:
+            async with AsyncSessionLocal() as db:
+                await AnalyticsService(db).increment_bot_analytics(counters)
+        except Exception:
+            # Возвращаем приращения в Redis, чтобы не потерять их
+            async with self.cache.redis.pipeline(transaction=False) as pipe:
+                for (bot_id, day), values in counters.items():
+                    for name, value in values.items():
+                        field = f"{day.isoformat()}:{bot_id}:{name}"
+                        if name == "revenue":
+                            pipe.hincrbyfloat(COUNTERS_KEY, field, value)
+                        else:
+                            pipe.hincrby(COUNTERS_KEY, field, int(value))
+                await pipe.execute()
+            raise
+        return len(counters)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Bot analytics flush failed: {str(e)}")
+
+    def start(self) -> None:
+        """Запуск периодического сброса"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка сброса с записью оставшихся приращений"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Bot analytics flush on shutdown failed: {str(e)}")
+
+# Общий для процесса экземпляр
+_bot_analytics_counters: Optional[BotAnalyticsCounters] = None
+
+def get_bot_analytics_counters() -> BotAnalyticsCounters:
+    """Получение общих счетчиков аналитики ботов"""
+    global _bot_analytics_counters
+    if _bot_analytics_counters is None:
+        _bot_analytics_counters = BotAnalyticsCounters()
+    return _bot_analytics_counters
@@ -0,0 +1,254 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+import importlib
+import json
+import logging
+import struct
+from pydantic import BaseModel
+from ..config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - необязательная зависимость
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - необязательная зависимость
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - необязательная зависимость
+    zstandard = None
+
+# Заголовок значения: MAGIC + тег формата + флаги.
+# Нулевой байт в начале не встречается в JSON/тексте старого формата.
+MAGIC = b"\x00\xc5"
+HEADER_SIZE = len(MAGIC) + 2
+
+TAG_MSGPACK = b"m"
+TAG_JSON = b"j"
+TAG_PYDANTIC = b"p"
+TAG_ENTRY = b"e"
+TAG_BYTES = b"b"
+
+FLAG_ZSTD = 0x01
+
+# Мягкий срок жизни и время вычисления CacheEntry
+_ENTRY_STRUCT = struct.Struct(">dd")
+
+class CacheCodecError(ValueError):
+    """Значение из кэша не может быть декодировано"""
+
+def _json_dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=str).encode("utf-8")
+
+def _json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def _msgpack_default(value: Any) -> Any:
+    # Даты и прочие скалярные типы сохраняются в ISO/строковом виде
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+class CacheCodec:
+    """Сериализация значений кэша с заголовком формата.
+
+    Простые данные кодируются msgpack (или JSON, если msgpack не установлен),
+    ORM-объекты - через зарегистрированные Pydantic-схемы, поэтому в кэш не
+    попадает состояние сессии SQLAlchemy. Крупные значения сжимаются zstd.
+    Целые числа хранятся как есть, чтобы с ними работали INCR/DECR.
+    """
+
+    def __init__(
+        self,
+        compression_threshold: Optional[int] = None,
+        compression_level: int = 3
+    ):
+        self.compression_threshold = (
+            settings.CACHE_COMPRESSION_THRESHOLD
+            if compression_threshold is None else compression_threshold
+        )
+        self.compression_level = compression_level
+        # ORM-класс -> Pydantic-схема
+        self._schemas: Dict[type, Type[BaseModel]] = {}
+        # Полное имя схемы -> схема (для декодирования)
+        self._schemas_by_name: Dict[str, Type[BaseModel]] = {}
+
+    def register_schema(self, model: type, schema: Type[BaseModel]) -> None:
+        """Регистрация Pydantic-схемы для кэширования объектов ORM-класса"""
+        self._schemas[model] = schema
+        self.register_pydantic(schema)
+
+    def register_pydantic(self, schema: Type[BaseModel]) -> None:
+        """Регистрация Pydantic-схемы, экземпляры которой можно декодировать"""
+        self._schemas_by_name[f"{schema.__module__}.{schema.__qualname__}"] = schema
+
+    def encode(self, value: Any) -> bytes:
+        """Кодирование значения для записи в Redis"""
+        # Счетчики храним в формате Redis, чтобы работали INCR/DECR
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value).encode("utf-8")
+
+        tag, payload = self._encode_payload(value)
+        flags = 0
+        if (
+            zstandard is not None
+            and self.compression_threshold
+            and len(payload) > self.compression_threshold
+        ):
+            payload = zstandard.ZstdCompressor(level=self.compression_level).compress(payload)
+            flags |= FLAG_ZSTD
+
+        return MAGIC + tag + bytes([flags]) + payload
+
+    def decode(self, data: bytes) -> Any:
+        """Декодирование значения, прочитанного из Redis"""
+        if not data.startswith(MAGIC):
+            return self._decode_legacy(data)
+
+        tag = data[len(MAGIC):len(MAGIC) + 1]
+        flags = data[len(MAGIC) + 1]
+        payload = data[HEADER_SIZE:]
+
+        if flags & FLAG_ZSTD:
+            if zstandard is None:
+                raise CacheCodecError("zstandard is required to decode compressed cache value")
+            payload = zstandard.ZstdDecompressor().decompress(payload)
+
+        return self._decode_payload(tag, payload)
+
+    def _encode_payload(self, value: Any) -> Tuple[bytes, bytes]:
+        # Импорт здесь: cache_service зависит от кодека
+        from .cache_service import CacheEntry
+
+        if isinstance(value, CacheEntry):
+            return TAG_ENTRY, _ENTRY_STRUCT.pack(value.soft_expires_at, value.delta) + self.encode(value.value)
+
+        if isinstance(value, bytes):
+            return TAG_BYTES, value
+
+        schema, many = self._find_schema(value)
+        if schema is not None:
+            items = value if many else [value]
+            data = [
+                item.model_dump(mode="json") if isinstance(item, BaseModel)
+                else schema.model_validate(item).model_dump(mode="json")
+                for item in items
+            ]
+            return TAG_PYDANTIC, self._dumps_plain({
+                "schema": f"{schema.__module__}.{schema.__qualname__}",
+                "many": many,
+                "items": data
+            })
+
+        if msgpack is not None:
+            return TAG_MSGPACK, msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+        return TAG_JSON, _json_dumps(value)
+
+    def _decode_payload(self, tag: bytes, payload: bytes) -> Any:
+        from .cache_service import CacheEntry
+
+        if tag == TAG_ENTRY:
+            soft_expires_at, delta = _ENTRY_STRUCT.unpack_from(payload)
+            value = self.decode(payload[_ENTRY_STRUCT.size:])
+            return CacheEntry(value=value, soft_expires_at=soft_expires_at, delta=delta)
+        if tag == TAG_BYTES:
+            return payload
+        if tag == TAG_MSGPACK:
+            if msgpack is None:
+                raise CacheCodecError("msgpack is required to decode cache value")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if tag == TAG_JSON:
+            return _json_loads(payload)
+        if tag == TAG_PYDANTIC:
+            data = self._loads_plain(payload)
+            schema = self._schema_by_name(data["schema"])
+            items = [schema.model_validate(item) for item in data["items"]]
+            return items if data["many"] else items[0]
+
+        raise CacheCodecError(f"Unknown cache value tag: {tag!r}")
+
+    def _schema_by_name(self, name: str) -> Type[BaseModel]:
+        """Схема по полному имени из значения кэша.
+
+        Значение мог записать другой процесс, в котором схема уже
+        зарегистрирована, а в этом еще нет: тогда она импортируется по имени.
+        Импорт разрешен только из пакета schemas.
+        """
+        schema = self._schemas_by_name.get(name)
+        if schema is not None:
+            return schema
+
+        from .. import schemas
+
+        module_name, _, qualname = name.rpartition(".")
+        if module_name == schemas.__name__ or module_name.startswith(schemas.__name__ + "."):
+            try:
+                schema = getattr(importlib.import_module(module_name), qualname, None)
+            except ImportError:
+                schema = None
+            if isinstance(schema, type) and issubclass(schema, BaseModel):
+                self.register_pydantic(schema)
+                return schema
+        raise CacheCodecError(f"Unknown cache schema: {name}")
+
+    def _find_schema(self, value: Any) -> Tuple[Optional[Type[BaseModel]], bool]:
+        """Поиск схемы для ORM-объекта, Pydantic-модели или их непустого списка"""
+        many = isinstance(value, (list, tuple))
+        items = value if many else [value]
+        if not items:
+            return None, many
+
+        first = items[0]
+        if isinstance(first, BaseModel):
+            schema = type(first)
+            self.register_pydantic(schema)
+        else:
+            schema = self._schemas.get(type(first))
+
+        if schema is None or not all(isinstance(item, type(first)) for item in items):
+            return None, many
+        return schema, many
+
+    def _dumps_plain(self, value: Any) -> bytes:
+        if msgpack is not None:
+            return msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+        return _json_dumps(value)
+
+    def _loads_plain(self, payload: bytes) -> Any:
+        if msgpack is not None:
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        return _json_loads(payload)
+
+    def _decode_legacy(self, data: bytes) -> Any:
+        """Значения без заголовка: счетчики и записи старого формата"""
+        if data.startswith(b"\x80"):
+            # Старые pickle-значения не распаковываем: считаем их промахом
+            raise CacheCodecError("Pickled cache values are no longer supported")
+        try:
+            return _json_loads(data)
+        except ValueError:
+            return data.decode("utf-8")
+
+# Кодек по умолчанию с зарегистрированными схемами моделей
+default_codec = CacheCodec()
+
+def _register_default_schemas() -> None:
+    from .. import models, schemas
+
+    default_codec.register_schema(models.User, schemas.User)
+    default_codec.register_schema(models.Category, schemas.Category)
+    default_codec.register_schema(models.Bot, schemas.Bot)
+    default_codec.register_schema(models.Purchase, schemas.Purchase)
+    default_codec.register_schema(models.BugReport, schemas.BugReport)
+    default_codec.register_schema(models.Changelog, schemas.Changelog)
+
+_register_default_schemas()
@@ -1,77 +1,557 @@
-from typing import Any, Optional, Union
-import json
-import pickle
-from redis import Redis
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple, Union
+from dataclasses import dataclass
+import asyncio
+import logging
+import math
+import random
+import time
+import uuid
+from redis.asyncio import Redis, ConnectionPool
 from ..config import settings
+from .local_cache import LocalCache
+from .cache_codec import CacheCodec, CacheCodecError, default_codec
+
+logger = logging.getLogger(__name__)
+
+# Канал Redis pub/sub для рассылки инвалидаций локального кэша между воркерами
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Общий для процесса пул соединений с Redis
+_connection_pool: Optional[ConnectionPool] = None
+
+def get_connection_pool() -> ConnectionPool:
+    """Получение общего пула соединений с Redis (создается при первом обращении)"""
+    global _connection_pool
+    if _connection_pool is None:
+        _connection_pool = ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS
+        )
+    return _connection_pool
+
+async def close_connection_pool() -> None:
+    """Закрытие общего пула соединений (при остановке приложения)"""
+    global _connection_pool
+    if _connection_pool is not None:
+        await _connection_pool.disconnect()
+        _connection_pool = None
+
+# Локальный (L1) кэш процесса и идентификатор воркера для отсева собственных сообщений
+_local_cache: Optional[LocalCache] = None
+_instance_id = uuid.uuid4().hex
+_invalidation_task: Optional[asyncio.Task] = None
+
+# Вычисления, выполняющиеся в этом процессе (single-flight по ключу)
+_inflight: Dict[str, asyncio.Task] = {}
+
+# Атомарное снятие блокировки: удаляем ключ, только если он все еще наш
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+else
+    return 0
+end
+"""
+
+# Удаление ключей по тегам и рассылка инвалидации L1 одним запросом.
+# KEYS - наборы тегов, ARGV[1] - канал, ARGV[2] - идентификатор воркера
+# (пустой, если L1 отключен и рассылка не нужна)
+_INVALIDATE_TAGS_SCRIPT = """
+local keys = {}
+for _, tag_key in ipairs(KEYS) do
+    for _, key in ipairs(redis.call("smembers", tag_key)) do
+        table.insert(keys, key)
+    end
+end
+for i = 1, #keys, 1000 do
+    redis.call("unlink", unpack(keys, i, math.min(i + 999, #keys)))
+end
+redis.call("unlink", unpack(KEYS))
+if ARGV[2] ~= "" and #keys > 0 then
+    redis.call("publish", ARGV[1], ARGV[2] .. ":" .. table.concat(keys, "\\n"))
+end
+return keys
+"""
+
+@dataclass
+class CacheEntry:
+    """Значение с мягким сроком жизни для get_or_compute"""
+    value: Any
+    soft_expires_at: float  # После этого момента значение считается устаревшим
+    delta: float  # Время вычисления значения (секунды), для раннего истечения
+
+def get_local_cache() -> Optional[LocalCache]:
+    """Получение локального кэша процесса (None, если L1 отключен)"""
+    global _local_cache
+    if _local_cache is None and settings.CACHE_L1_ENABLED:
+        _local_cache = LocalCache(
+            max_bytes=settings.CACHE_L1_MAX_BYTES,
+            max_items=settings.CACHE_L1_MAX_ITEMS,
+            default_ttl=settings.CACHE_L1_TTL
+        )
+    return _local_cache
+
+async def _listen_invalidations() -> None:
+    """Прием инвалидаций от других воркеров и удаление ключей из L1"""
+    redis = Redis(connection_pool=get_connection_pool())
+    while True:
+        pubsub = redis.pubsub()
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                # Формат сообщения: "<воркер>:<ключ>\n<ключ>..."
+                origin, _, keys = message["data"].decode("utf-8").partition(":")
+                local_cache = get_local_cache()
+                if origin != _instance_id and local_cache is not None:
+                    for key in keys.split("\n"):
+                        local_cache.delete(key)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Пока подписка недоступна, L1 мог пропустить инвалидации
+            logger.error(f"Cache invalidation listener error: {str(e)}")
+            local_cache = get_local_cache()
+            if local_cache is not None:
+                local_cache.clear()
+            await asyncio.sleep(1)
+        finally:
+            await pubsub.reset()
+
+async def start_invalidation_listener() -> None:
+    """Запуск фоновой подписки на инвалидации (при старте приложения)"""
+    global _invalidation_task
+    if settings.CACHE_L1_ENABLED and _invalidation_task is None:
+        _invalidation_task = asyncio.create_task(_listen_invalidations())
+
+async def stop_invalidation_listener() -> None:
+    """Остановка фоновой подписки на инвалидации"""
+    global _invalidation_task
+    if _invalidation_task is not None:
+        _invalidation_task.cancel()
+        try:
+            await _invalidation_task
+        except asyncio.CancelledError:
+            pass
+        _invalidation_task = None
 
 class CacheService:
-    def __init__(self):
-        self.redis = Redis.from_url(settings.REDIS_URL)
+    def __init__(self, codec: Optional[CacheCodec] = None):
+        # Клиент не владеет соединениями: все экземпляры используют общий пул
+        self.redis = Redis(connection_pool=get_connection_pool())
+        self.local_cache = get_local_cache()
+        self.codec = codec or default_codec
 
     async def get(self, key: str) -> Optional[Any]:
         """Получение значения из кэша"""
-        value = self.redis.get(key)
-        if value is None:
+        if self.local_cache is None:
+            raw_value = await self.redis.get(key)
+        else:
+            found, value = self.local_cache.get(key)
+            if found:
+                return value
+            version = self.local_cache.version(key)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.pttl(key)
+                raw_value, pttl = await pipe.execute()
+        if raw_value is None:
             return None
+
         try:
-            return pickle.loads(value)
-        except pickle.UnpicklingError:
-            try:
-                return json.loads(value)
-            except json.JSONDecodeError:
-                return value.decode('utf-8')
+            value = self._decode(raw_value)
+        except CacheCodecError as e:
+            # Значение в неподдерживаемом формате считаем промахом
+            logger.warning(f"Cannot decode cache value for {key}: {str(e)}")
+            return None
+        if self.local_cache is not None:
+            self._set_local(key, value, len(raw_value), pttl, version)
+        return value
+
+    def _decode(self, value: bytes) -> Any:
+        """Декодирование значения, полученного из Redis"""
+        return self.codec.decode(value)
+
+    def _set_local(self, key: str, value: Any, size: int, pttl: int, version: Tuple[int, int]) -> None:
+        """Сохранение прочитанного из Redis значения в L1.
+
+        Запись живет в L1 не дольше, чем ключ в Redis (pttl - оставшееся время
+        в миллисекундах, -1 - без срока), и не сохраняется, если ключ
+        инвалидировали во время чтения.
+        """
+        ttl = pttl / 1000 if pttl >= 0 else None
+        self.local_cache.set(key, value, size=size, ttl=ttl, version=version)
 
     async def set(
         self,
         key: str,
         value: Any,
-        expire: Optional[int] = None
+        expire: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
     ) -> None:
         """Сохранение значения в кэш"""
-        if isinstance(value, (str, int, float, bool)):
-            value = str(value).encode('utf-8')
-        elif isinstance(value, (dict, list)):
-            value = json.dumps(value).encode('utf-8')
-        else:
-            value = pickle.dumps(value)
-
-        self.redis.set(key, value, ex=expire)
+        await self.set_many({key: value}, expire, tags)
 
     async def delete(self, key: str) -> None:
         """Удаление значения из кэша"""
-        self.redis.delete(key)
+        await self.delete_many([key])
 
     async def exists(self, key: str) -> bool:
         """Проверка существования ключа в кэше"""
-        return bool(self.redis.exists(key))
+        return bool(await self.redis.exists(key))
 
     async def increment(self, key: str, amount: int = 1) -> int:
         """Увеличение числового значения в кэше"""
-        return self.redis.incr(key, amount)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.incr(key, amount)
+            self._queue_invalidation(pipe, [key])
+            value, *_ = await pipe.execute()
+        self._invalidate_local([key])
+        return value
 
     async def decrement(self, key: str, amount: int = 1) -> int:
         """Уменьшение числового значения в кэше"""
-        return self.redis.decr(key, amount)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.decr(key, amount)
+            self._queue_invalidation(pipe, [key])
+            value, *_ = await pipe.execute()
+        self._invalidate_local([key])
+        return value
+
+    async def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Получение нескольких значений за один запрос (MGET); отсутствующие ключи пропускаются"""
+        result: Dict[str, Any] = {}
+        missing: List[str] = []
+        for key in dict.fromkeys(keys):
+            if self.local_cache is not None:
+                found, value = self.local_cache.get(key)
+                if found:
+                    result[key] = value
+                    continue
+            missing.append(key)
+
+        if not missing:
+            return result
+
+        if self.local_cache is None:
+            raw_values = await self.redis.mget(missing)
+        else:
+            versions = [self.local_cache.version(key) for key in missing]
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.mget(missing)
+                for key in missing:
+                    pipe.pttl(key)
+                raw_values, *pttls = await pipe.execute()
+
+        for i, (key, raw_value) in enumerate(zip(missing, raw_values)):
+            if raw_value is None:
+                continue
+            try:
+                value = self._decode(raw_value)
+            except CacheCodecError as e:
+                logger.warning(f"Cannot decode cache value for {key}: {str(e)}")
+                continue
+            if self.local_cache is not None:
+                self._set_local(key, value, len(raw_value), pttls[i], versions[i])
+            result[key] = value
+        return result
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Any],
+        expire: Optional[int] = None,
+        tags: Optional[Iterable[str]] = None
+    ) -> None:
+        """Сохранение нескольких значений одним конвейером (pipeline).
+
+        Ключи, помеченные тегами, можно удалить разом через invalidate_tags.
+        """
+        if not mapping:
+            return
+        tags = list(tags or [])
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, self.codec.encode(value), ex=expire)
+            for tag in tags:
+                self._queue_tag(pipe, tag, mapping.keys(), expire)
+            self._queue_invalidation(pipe, mapping.keys())
+            await pipe.execute()
+        self._invalidate_local(mapping.keys())
+
+    async def delete_many(self, keys: Iterable[str]) -> None:
+        """Удаление нескольких ключей одной командой UNLINK"""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.unlink(*keys)
+            self._queue_invalidation(pipe, keys)
+            await pipe.execute()
+        self._invalidate_local(keys)
+
+    async def delete_pattern(self, pattern: str, batch_size: int = 500) -> int:
+        """Удаление ключей по шаблону (SCAN + UNLINK пачками), возвращает число ключей"""
+        deleted = 0
+        batch: List[str] = []
+        async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+            batch.append(key.decode("utf-8") if isinstance(key, bytes) else key)
+            if len(batch) >= batch_size:
+                await self.delete_many(batch)
+                deleted += len(batch)
+                batch = []
+        if batch:
+            await self.delete_many(batch)
+            deleted += len(batch)
+        return deleted
+
+    async def invalidate_tags(self, *tags: str) -> List[str]:
+        """Удаление всех ключей, помеченных тегами, за один запрос к Redis"""
+        if not tags:
+            return []
+        keys = await self.redis.eval(
+            _INVALIDATE_TAGS_SCRIPT,
+            len(tags),
+            *[self._tag_key(tag) for tag in tags],
+            INVALIDATION_CHANNEL,
+            _instance_id if self.local_cache is not None else ""
+        )
+        keys = [key.decode("utf-8") if isinstance(key, bytes) else key for key in keys]
+        if self.local_cache is not None:
+            for key in keys:
+                self.local_cache.delete(key)
+        return keys
+
+    def _tag_key(self, tag: str) -> str:
+        return f"tag:{tag}"
+
+    def _queue_tag(self, pipe: Any, tag: str, keys: Iterable[str], expire: Optional[int]) -> None:
+        """Добавление ключей в набор тега в составе конвейера"""
+        tag_key = self._tag_key(tag)
+        pipe.sadd(tag_key, *keys)
+        # Набор тега живет не меньше помеченных ключей
+        if expire:
+            pipe.expire(tag_key, expire, gt=True)
+            pipe.expire(tag_key, expire, nx=True)
+        else:
+            pipe.persist(tag_key)
+
+    def _queue_invalidation(self, pipe: Any, keys: Iterable[str]) -> None:
+        """Удаление ключей из L1 этого процесса и рассылка инвалидации остальным воркерам
+        в том же конвейере, что и сама запись"""
+        if self.local_cache is None:
+            return
+        keys = list(keys)
+        self._invalidate_local(keys)
+        pipe.publish(INVALIDATION_CHANNEL, f"{_instance_id}:" + "\n".join(keys))
+
+    def _invalidate_local(self, keys: Iterable[str]) -> None:
+        """Удаление ключей из L1 после записи в Redis: чтение, начатое до записи,
+        не вернет в L1 старое значение (см. LocalCache.version)"""
+        if self.local_cache is None:
+            return
+        for key in keys:
+            self.local_cache.delete(key)
+
+    def local_stats(self) -> Optional[Dict[str, Any]]:
+        """Статистика локального кэша (попадания, промахи, размер)"""
+        if self.local_cache is None:
+            return None
+        return self.local_cache.stats()
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+        beta: float = 1.0,
+        tags: Optional[Iterable[str]] = None
+    ) -> Any:
+        """Получение значения из кэша или его вычисление с защитой от stampede.
+
+        Свежее значение возвращается сразу. По мере приближения к мягкому сроку
+        жизни значение с растущей вероятностью обновляется заранее (XFetch).
+        Устаревшее значение отдается еще stale_ttl секунд, пока оно обновляется
+        в фоне. При промахе вычисление выполняется один раз: внутри процесса
+        запросы ждут общую задачу, между воркерами - блокировку в Redis.
+
+        compute может выполняться в фоне после завершения запроса, поэтому он
+        не должен использовать ресурсы запроса (например, его сессию БД).
+        """
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        tags = list(tags or [])
+        entry = await self.get(key)
+
+        if isinstance(entry, CacheEntry):
+            now = time.time()
+            # 1 - random() лежит в (0, 1], поэтому логарифм определен
+            early_expiration = entry.delta * beta * math.log(1.0 - random.random())
+            if now - early_expiration < entry.soft_expires_at:
+                return entry.value
+
+            self._refresh_in_background(key, compute, ttl, stale_ttl, tags)
+            return entry.value
+
+        return await self._compute_single_flight(key, compute, ttl, stale_ttl, tags)
+
+    async def set_entry(
+        self,
+        key: str,
+        value: Any,
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+        delta: float = 0.0,
+        tags: Optional[Iterable[str]] = None
+    ) -> None:
+        """Сохранение значения в формате get_or_compute"""
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        entry = CacheEntry(value=value, soft_expires_at=time.time() + ttl, delta=delta)
+        await self.set(key, entry, ttl + stale_ttl, tags)
+
+    async def set_entries(
+        self,
+        values: Dict[str, Any],
+        ttl: int,
+        stale_ttl: Optional[int] = None,
+        tags: Optional[Dict[str, Iterable[str]]] = None
+    ) -> None:
+        """Сохранение нескольких значений в формате get_or_compute одним конвейером.
+
+        tags - теги по ключам (у каждого ключа могут быть свои).
+        """
+        if not values:
+            return
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        expire = ttl + stale_ttl
+        soft_expires_at = time.time() + ttl
+        tags = tags or {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for key, value in values.items():
+                entry = CacheEntry(value=value, soft_expires_at=soft_expires_at, delta=0.0)
+                pipe.set(key, self.codec.encode(entry), ex=expire)
+                for tag in tags.get(key, ()):
+                    self._queue_tag(pipe, tag, [key], expire)
+            self._queue_invalidation(pipe, values.keys())
+            await pipe.execute()
+        self._invalidate_local(values.keys())
+
+    async def get_value(self, key: str) -> Optional[Any]:
+        """Получение значения без учета мягкого срока жизни"""
+        entry = await self.get(key)
+        if isinstance(entry, CacheEntry):
+            return entry.value
+        return entry
+
+    async def _compute_single_flight(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        tags: List[str]
+    ) -> Any:
+        """Одно вычисление на ключ в процессе; остальные запросы ждут его результат"""
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._compute_with_lock(key, compute, ttl, stale_ttl, tags))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        # shield: отмена одного запроса не должна отменять общее вычисление
+        return await asyncio.shield(task)
+
+    def _refresh_in_background(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        tags: List[str]
+    ) -> None:
+        """Фоновое обновление устаревшего значения"""
+        if key in _inflight:
+            return
+        task = asyncio.create_task(
+            self._compute_with_lock(key, compute, ttl, stale_ttl, tags, wait_for_result=False)
+        )
+        _inflight[key] = task
+
+        def _done(task: asyncio.Task) -> None:
+            _inflight.pop(key, None)
+            if not task.cancelled() and task.exception() is not None:
+                logger.error(f"Background cache refresh failed for {key}: {task.exception()}")
+
+        task.add_done_callback(_done)
+
+    async def _compute_with_lock(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int,
+        stale_ttl: int,
+        tags: List[str],
+        wait_for_result: bool = True
+    ) -> Any:
+        """Вычисление значения под блокировкой Redis, общей для всех воркеров"""
+        lock_key = f"lock:{key}"
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            lock_key, token, nx=True, ex=settings.CACHE_LOCK_TIMEOUT
+        )
+
+        if not acquired:
+            if not wait_for_result:
+                # Значение уже обновляет другой воркер
+                return None
+            # Ждем, пока другой воркер сохранит значение
+            deadline = time.monotonic() + settings.CACHE_LOCK_WAIT_TIMEOUT
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                entry = await self.get(key)
+                if entry is not None:
+                    return entry.value if isinstance(entry, CacheEntry) else entry
+            # Не дождались: считаем сами, чтобы не блокировать запрос бесконечно
+
+        try:
+            started = time.monotonic()
+            value = await compute()
+            delta = time.monotonic() - started
+            await self.set_entry(key, value, ttl, stale_ttl, delta, tags)
+            return value
+        finally:
+            if acquired:
+                await self.redis.eval(_RELEASE_LOCK_SCRIPT, 1, lock_key, token)
 
     def get_key(self, prefix: str, *args) -> str:
         """Генерация ключа кэша"""
         return f"{prefix}:{':'.join(str(arg) for arg in args)}"
 
     # Специфичные методы для нашего приложения
-    async def get_popular_bots(self, category_id: Optional[int] = None) -> Optional[list]:
+    def user_tag(self, user_id: int) -> str:
+        """Тег всех кэшированных данных, зависящих от предпочтений пользователя"""
+        return f"user:{user_id}"
+
+    def popular_bots_key(self, category_id: Optional[int] = None, limit: int = 10) -> str:
+        """Ключ популярных ботов (список на limit ботов)"""
+        return self.get_key("popular_bots", category_id or "all", limit)
+
+    def recommendations_key(self, user_id: int, category_id: Optional[int] = None, limit: int = 10) -> str:
+        """Ключ рекомендаций пользователя (список на limit ботов)"""
+        return self.get_key("recommendations", user_id, category_id or "all", limit)
+
+    async def get_popular_bots(self, category_id: Optional[int] = None, limit: int = 10) -> Optional[list]:
         """Получение популярных ботов из кэша"""
-        key = self.get_key("popular_bots", category_id or "all")
-        return await self.get(key)
+        return await self.get_value(self.popular_bots_key(category_id, limit))
 
     async def set_popular_bots(
         self,
         bots: list,
         category_id: Optional[int] = None,
-        expire: int = 3600
+        expire: int = 3600,
+        limit: int = 10
     ) -> None:
         """Сохранение популярных ботов в кэш"""
-        key = self.get_key("popular_bots", category_id or "all")
-        await self.set(key, bots, expire)
+        await self.set_entry(self.popular_bots_key(category_id, limit), bots, expire)
 
     async def get_user_preferences(self, user_id: int) -> Optional[dict]:
         """Получение предпочтений пользователя из кэша"""
@@ -86,24 +566,46 @@ class CacheService:
     ) -> None:
         """Сохранение предпочтений пользователя в кэш"""
         key = self.get_key("user_preferences", user_id)
-        await self.set(key, preferences, expire)
+        await self.set(key, preferences, expire, tags=[self.user_tag(user_id)])
 
     async def get_recommendations(
         self,
         user_id: int,
-        category_id: Optional[int] = None
+        category_id: Optional[int] = None,
+        limit: int = 10
     ) -> Optional[list]:
         """Получение рекомендаций из кэша"""
-        key = self.get_key("recommendations", user_id, category_id or "all")
-        return await self.get(key)
+        return await self.get_value(self.recommendations_key(user_id, category_id, limit))
 
     async def set_recommendations(
         self,
         user_id: int,
         recommendations: list,
         category_id: Optional[int] = None,
-        expire: int = 1800
+        expire: int = 1800,
+        limit: int = 10
     ) -> None:
         """Сохранение рекомендаций в кэш"""
-        key = self.get_key("recommendations", user_id, category_id or "all")
-        await self.set(key, recommendations, expire) 
\ No newline at end of file
+        key = self.recommendations_key(user_id, category_id, limit)
+        await self.set_entry(key, recommendations, expire, tags=[self.user_tag(user_id)])
+
+    async def set_recommendations_many(
+        self,
+        recommendations: Dict[int, list],
+        expire: int = 1800,
+        limit: int = 10
+    ) -> None:
+        """Сохранение рекомендаций многих пользователей (без фильтра по категории)"""
+        keys = {
+            user_id: self.recommendations_key(user_id, limit=limit)
+            for user_id in recommendations
+        }
+        await self.set_entries(
+            {keys[user_id]: bots for user_id, bots in recommendations.items()},
+            expire,
+            tags={keys[user_id]: [self.user_tag(user_id)] for user_id in recommendations}
+        )
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """Удаление всех кэшированных данных пользователя (предпочтения, рекомендации)"""
+        await self.invalidate_tags(self.user_tag(user_id))
\ No newline at end of file
@@ -0,0 +1,118 @@
+from typing import Any, Dict, Optional, Tuple
+from collections import OrderedDict
+import threading
+import time
+
+# Число счетчиков инвалидаций (ключи распределяются по ним по хэшу)
+VERSION_BUCKETS = 1024
+
+class LocalCache:
+    """Ограниченный по размеру LRU-кэш в памяти процесса (L1 перед Redis).
+
+    Значения хранятся в уже декодированном виде, поэтому попадание не требует
+    ни сетевого запроса, ни десериализации. Вызывающий код не должен изменять
+    полученные объекты: они разделяются между запросами.
+
+    Значение, прочитанное из Redis, сохраняется с меткой version(), взятой до
+    чтения: если ключ за это время инвалидировали, устаревшее значение в кэш
+    не попадет.
+    """
+
+    def __init__(self, max_bytes: int, max_items: int, default_ttl: float):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self.default_ttl = default_ttl
+        self._items: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        # Счетчики инвалидаций по корзинам ключей; clear() меняет эпоху целиком
+        self._versions = [0] * VERSION_BUCKETS
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Получение значения: (найдено, значение)"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self.misses += 1
+                return False, None
+
+            value, size, expires_at = item
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return False, None
+
+            self._items.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def version(self, key: str) -> Tuple[int, int]:
+        """Метка инвалидаций ключа (берется до чтения значения из Redis)"""
+        with self._lock:
+            return self._epoch, self._versions[hash(key) % VERSION_BUCKETS]
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        size: int,
+        ttl: Optional[float] = None,
+        version: Optional[Tuple[int, int]] = None
+    ) -> None:
+        """Сохранение значения с учетом его размера в байтах.
+
+        ttl ограничивается default_ttl. С version значение не сохраняется,
+        если ключ инвалидировали после получения метки.
+        """
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        with self._lock:
+            if version is not None and version != (self._epoch, self._versions[hash(key) % VERSION_BUCKETS]):
+                return
+            if key in self._items:
+                self._remove(key)
+            if ttl <= 0 or size > self.max_bytes:
+                return
+            self._items[key] = (value, size, time.monotonic() + ttl)
+            self._size += size
+
+            # Вытесняем самые старые записи, пока не уложимся в лимиты
+            while self._size > self.max_bytes or len(self._items) > self.max_items:
+                oldest_key = next(iter(self._items))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        """Удаление (инвалидация) значения"""
+        with self._lock:
+            self._versions[hash(key) % VERSION_BUCKETS] += 1
+            if key in self._items:
+                self._remove(key)
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+        with self._lock:
+            self._epoch += 1
+            self._items.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Статистика использования кэша"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "items": len(self._items),
+                "size_bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / total if total else 0.0
+            }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._items.pop(key)
+        self._size -= size
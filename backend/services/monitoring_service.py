@@ -1,5 +1,5 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from ..models.monitoring import Metric, Alert, AlertHistory
@@ -12,7 +12,7 @@ from ..schemas.monitoring import (
 )
 
 class MonitoringService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
     async def record_metric(self, metric: MetricCreate) -> Metric:
@@ -20,11 +20,11 @@ class MonitoringService:
             name=metric.name,
             value=metric.value,
             labels=metric.labels,
-            metadata=metric.metadata
+            metadata_=metric.metadata
         )
         self.db.add(db_metric)
-        self.db.commit()
-        self.db.refresh(db_metric)
+        await self.db.commit()
+        await self.db.refresh(db_metric)
         
         # Проверяем алерты для метрики
         await self._check_alerts(db_metric)
@@ -32,10 +32,13 @@ class MonitoringService:
         return db_metric
 
     async def _check_alerts(self, metric: Metric) -> None:
-        alerts = self.db.query(Alert).filter(
-            Alert.metric_name == metric.name,
-            Alert.status == "active"
-        ).all()
+        result = await self.db.execute(
+            select(Alert).where(
+                Alert.metric_name == metric.name,
+                Alert.status == "active"
+            )
+        )
+        alerts = result.scalars().all()
         
         for alert in alerts:
             should_trigger = False
@@ -52,10 +55,10 @@ class MonitoringService:
                 history = AlertHistory(
                     alert_id=alert.id,
                     metric_value=metric.value,
-                    metadata={"metric_id": metric.id}
+                    metadata_={"metric_id": metric.id}
                 )
                 self.db.add(history)
-                self.db.commit()
+                await self.db.commit()
 
     async def create_alert(self, alert: AlertCreate) -> Alert:
         db_alert = Alert(
@@ -64,15 +67,15 @@ class MonitoringService:
             threshold=alert.threshold,
             severity=alert.severity,
             status="active",
-            metadata=alert.metadata
+            metadata_=alert.metadata
         )
         self.db.add(db_alert)
-        self.db.commit()
-        self.db.refresh(db_alert)
+        await self.db.commit()
+        await self.db.refresh(db_alert)
         return db_alert
 
     async def update_alert(self, alert_id: int, alert_update: AlertUpdate) -> Alert:
-        db_alert = self.db.query(Alert).filter(Alert.id == alert_id).first()
+        db_alert = await self.db.get(Alert, alert_id)
         if not db_alert:
             raise ValueError(f"Alert with id {alert_id} not found")
             
@@ -82,10 +85,10 @@ class MonitoringService:
                 db_alert.resolved_at = datetime.utcnow()
                 
         if alert_update.metadata:
-            db_alert.metadata = alert_update.metadata
+            db_alert.metadata_ = alert_update.metadata
             
-        self.db.commit()
-        self.db.refresh(db_alert)
+        await self.db.commit()
+        await self.db.refresh(db_alert)
         return db_alert
 
     async def get_metrics(
@@ -94,30 +97,32 @@ class MonitoringService:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None
     ) -> List[Metric]:
-        query = self.db.query(Metric)
+        query = select(Metric)
         
         if name:
-            query = query.filter(Metric.name == name)
+            query = query.where(Metric.name == name)
         if start_time:
-            query = query.filter(Metric.timestamp >= start_time)
+            query = query.where(Metric.timestamp >= start_time)
         if end_time:
-            query = query.filter(Metric.timestamp <= end_time)
+            query = query.where(Metric.timestamp <= end_time)
             
-        return query.order_by(Metric.timestamp.desc()).all()
+        result = await self.db.execute(query.order_by(Metric.timestamp.desc()))
+        return result.scalars().all()
 
     async def get_alerts(
         self,
         status: Optional[str] = None,
         severity: Optional[str] = None
     ) -> List[Alert]:
-        query = self.db.query(Alert)
+        query = select(Alert)
         
         if status:
-            query = query.filter(Alert.status == status)
+            query = query.where(Alert.status == status)
         if severity:
-            query = query.filter(Alert.severity == severity)
+            query = query.where(Alert.severity == severity)
             
-        return query.order_by(Alert.created_at.desc()).all()
+        result = await self.db.execute(query.order_by(Alert.created_at.desc()))
+        return result.scalars().all()
 
     async def get_alert_history(
         self,
@@ -125,28 +130,32 @@ class MonitoringService:
         start_time: Optional[datetime] = None,
         end_time: Optional[datetime] = None
     ) -> List[AlertHistory]:
-        query = self.db.query(AlertHistory).filter(AlertHistory.alert_id == alert_id)
+        query = select(AlertHistory).where(AlertHistory.alert_id == alert_id)
         
         if start_time:
-            query = query.filter(AlertHistory.timestamp >= start_time)
+            query = query.where(AlertHistory.timestamp >= start_time)
         if end_time:
-            query = query.filter(AlertHistory.timestamp <= end_time)
+            query = query.where(AlertHistory.timestamp <= end_time)
             
-        return query.order_by(AlertHistory.timestamp.desc()).all()
+        result = await self.db.execute(query.order_by(AlertHistory.timestamp.desc()))
+        return result.scalars().all()
 
     async def get_monitoring_summary(self) -> MonitoringSummary:
         # Общее количество метрик
-        total_metrics = self.db.query(func.count(Metric.id)).scalar()
+        total_metrics = await self.db.scalar(select(func.count(Metric.id)))
         
         # Статистика по алертам
-        alerts = self.db.query(
-            Alert.status,
-            Alert.severity,
-            func.count(Alert.id)
-        ).group_by(
-            Alert.status,
-            Alert.severity
-        ).all()
+        result = await self.db.execute(
+            select(
+                Alert.status,
+                Alert.severity,
+                func.count(Alert.id)
+            ).group_by(
+                Alert.status,
+                Alert.severity
+            )
+        )
+        alerts = result.all()
         
         active_alerts = sum(count for status, _, count in alerts if status == "active")
         critical_alerts = sum(count for _, severity, count in alerts if severity == "critical")
@@ -154,16 +163,16 @@ class MonitoringService:
         info_alerts = sum(count for _, severity, count in alerts if severity == "info")
         
         # Метрики по имени
-        metrics_by_name = dict(self.db.query(
-            Metric.name,
-            func.count(Metric.id)
-        ).group_by(Metric.name).all())
+        result = await self.db.execute(
+            select(Metric.name, func.count(Metric.id)).group_by(Metric.name)
+        )
+        metrics_by_name = dict(result.all())
         
         # Алерты по серьезности
-        alerts_by_severity = dict(self.db.query(
-            Alert.severity,
-            func.count(Alert.id)
-        ).group_by(Alert.severity).all())
+        result = await self.db.execute(
+            select(Alert.severity, func.count(Alert.id)).group_by(Alert.severity)
+        )
+        alerts_by_severity = dict(result.all())
         
         return MonitoringSummary(
             total_metrics=total_metrics,
@@ -0,0 +1,294 @@
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, func
+from collections import deque
+from datetime import datetime
+import asyncio
+import heapq
+import time
+from ..models import Bot, Category
+from ..config import settings
+from ..db_routing import use_primary
+from .search_index import Tokenizer
+
+# Типы подсказок
+BOT = "bot"
+CATEGORY = "category"
+
+# Ключ узла префиксного дерева, под которым хранится слово, заканчивающееся в узле
+_END = ""
+
+# Сколько слов словаря может подставить одно слово запроса
+MAX_WORD_EXPANSIONS = 200
+
+# Сколько названий рассматривается для ранжирования
+MAX_CANDIDATES = 1000
+
+def max_distance(word: str) -> int:
+    """Допустимое число опечаток в слове запроса: короткие слова без опечаток"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 7:
+        return 1
+    return 2
+
+def _next_row(row: List[int], word: str, char: str) -> List[int]:
+    """Строка таблицы расстояния Левенштейна после добавления char к пути"""
+    next_row = [row[0] + 1]
+    for i, word_char in enumerate(word, start=1):
+        next_row.append(min(next_row[i - 1] + 1, row[i] + 1, row[i - 1] + (word_char != char)))
+    return next_row
+
+class NameSuggestIndex:
+    """Подсказки по названиям ботов и категорий с учетом опечаток.
+
+    Слова названий хранятся в префиксном дереве. Слово запроса ищется
+    обходом дерева с построчным расчетом расстояния Левенштейна до пути
+    узла: ветви, где расстояние уже больше допустимого, отсекаются, а
+    узел, путь к которому отличается от слова запроса не больше чем на
+    max_distance правок, дает все слова своего поддерева как дополнения.
+    Название подходит, если каждое слово запроса дополняется до одного из
+    его слов. Данные загружаются и догружаются так же, как SearchIndex,
+    create/update/delete ботов и категорий обновляют индекс сразу, поэтому
+    ответ не требует обращений к MySQL.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: Optional[float] = None,
+        full_reload_interval: Optional[float] = None
+    ):
+        self.refresh_interval = (
+            settings.SUGGEST_INDEX_REFRESH_INTERVAL
+            if refresh_interval is None else refresh_interval
+        )
+        self.full_reload_interval = (
+            settings.SUGGEST_INDEX_FULL_RELOAD_INTERVAL
+            if full_reload_interval is None else full_reload_interval
+        )
+        self.tokenizer = Tokenizer()
+        self._root: Dict[str, dict] = {}
+        # слово -> названия, в которых оно встречается
+        self._postings: Dict[str, Set[Tuple[str, int]]] = {}
+        # (тип, id) -> (название, слова названия, category_id)
+        self._entries: Dict[Tuple[str, int], Tuple[str, Tuple[str, ...], Optional[int]]] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Загрузка названий или догрузка изменений, если данные устарели"""
+        now = time.monotonic()
+        if self._last_full_reload and now - self._last_refresh < self.refresh_interval:
+            return
+
+        async with self._lock:
+            # Из основной базы, как и в SearchIndex: иначе изменения, не дошедшие
+            # до реплики к моменту метки, пропадут до полной перезагрузки
+            use_primary(db)
+            now = time.monotonic()
+            if not self._last_full_reload or now - self._last_full_reload >= self.full_reload_interval:
+                await self.reload(db)
+            elif now - self._last_refresh >= self.refresh_interval:
+                await self.refresh(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Полная перестройка индекса (удаленные записи исчезают только здесь)"""
+        watermark = await db.scalar(select(func.now()))
+        bots = await db.execute(select(Bot.id, Bot.name, Bot.category_id, Bot.is_active))
+        categories = await db.execute(select(Category.id, Category.name, Category.is_active))
+        self._root = {}
+        self._postings = {}
+        self._entries = {}
+        for bot_id, name, category_id, is_active in bots.all():
+            self.upsert_bot(bot_id, name, category_id, is_active)
+        for category_id, name, is_active in categories.all():
+            self.upsert_category(category_id, name, is_active)
+        self._watermark = watermark
+        self._last_full_reload = self._last_refresh = time.monotonic()
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Догрузка ботов и категорий, созданных или измененных после предыдущей загрузки"""
+        watermark = await db.scalar(select(func.now()))
+        bots = await db.execute(
+            select(Bot.id, Bot.name, Bot.category_id, Bot.is_active).where(
+                or_(Bot.created_at >= self._watermark, Bot.updated_at >= self._watermark)
+            )
+        )
+        categories = await db.execute(
+            select(Category.id, Category.name, Category.is_active).where(
+                or_(Category.created_at >= self._watermark, Category.updated_at >= self._watermark)
+            )
+        )
+        for bot_id, name, category_id, is_active in bots.all():
+            self.upsert_bot(bot_id, name, category_id, is_active)
+        for category_id, name, is_active in categories.all():
+            self.upsert_category(category_id, name, is_active)
+        self._watermark = watermark
+        self._last_refresh = time.monotonic()
+
+    def upsert_bot(
+        self,
+        bot_id: int,
+        name: Optional[str],
+        category_id: Optional[int] = None,
+        is_active: Optional[bool] = True
+    ) -> None:
+        """Добавление или изменение названия бота (неактивные боты не подсказываются)"""
+        self._upsert((BOT, bot_id), name, category_id, is_active)
+
+    def upsert_category(self, category_id: int, name: Optional[str], is_active: Optional[bool] = True) -> None:
+        """Добавление или изменение названия категории"""
+        self._upsert((CATEGORY, category_id), name, category_id, is_active)
+
+    def remove_bot(self, bot_id: int) -> None:
+        self._remove((BOT, bot_id))
+
+    def remove_category(self, category_id: int) -> None:
+        self._remove((CATEGORY, category_id))
+
+    def _upsert(
+        self,
+        key: Tuple[str, int],
+        name: Optional[str],
+        category_id: Optional[int],
+        is_active: Optional[bool]
+    ) -> None:
+        self._remove(key)
+        words = tuple(dict.fromkeys(self.tokenizer.words(name)))
+        if is_active is False or not words:
+            return
+        for word in words:
+            postings = self._postings.get(word)
+            if postings is None:
+                postings = self._postings[word] = set()
+                self._insert_word(word)
+            postings.add(key)
+        self._entries[key] = (name, words, category_id)
+
+    def _remove(self, key: Tuple[str, int]) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for word in entry[1]:
+            postings = self._postings[word]
+            postings.discard(key)
+            if not postings:
+                del self._postings[word]
+                self._delete_word(word)
+
+    def _insert_word(self, word: str) -> None:
+        node = self._root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[_END] = word
+
+    def _delete_word(self, word: str) -> None:
+        # Удаляем слово и опустевшие узлы его пути
+        path = [self._root]
+        for char in word:
+            path.append(path[-1][char])
+        del path[-1][_END]
+        for depth in range(len(word), 0, -1):
+            if path[depth]:
+                break
+            del path[depth - 1][word[depth - 1]]
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict]:
+        """Подсказки по убыванию качества совпадения: [{type, id, name, category_id}]"""
+        query_words = list(dict.fromkeys(self.tokenizer.words(query)))
+        if not query_words or limit <= 0:
+            return []
+
+        # Для каждого слова запроса - подходящие слова словаря с числом опечаток
+        matches = [self._complete(word, max_distance(word)) for word in query_words]
+        if not all(matches):
+            return []
+
+        # Кандидаты берутся по самому редкому слову запроса (от лучших совпадений),
+        # остальные слова запроса проверяются по словам названия кандидата
+        driver = min(range(len(matches)), key=lambda i: sum(len(self._postings[w]) for w in matches[i]))
+        others = matches[:driver] + matches[driver + 1:]
+        allowed = None
+        for word_matches in others:
+            # Сначала отбрасываем названия без остальных слов (операции над множествами)
+            keys = set().union(*(self._postings[word] for word in word_matches))
+            allowed = keys if allowed is None else allowed & keys
+        ranked = []
+        for word, edits in matches[driver].items():
+            postings = self._postings[word] if allowed is None else self._postings[word] & allowed
+            for key in postings:
+                name, words, _ = self._entries[key]
+                total = edits
+                for word_matches in others:
+                    distances = [word_matches[w] for w in words if w in word_matches]
+                    if not distances:
+                        break
+                    total += min(distances)
+                else:
+                    # Меньше опечаток, название начинается с запроса, короче, категории выше ботов
+                    starts = 0 if words[0] in matches[0] else 1
+                    ranked.append(((total, starts, len(name), key[0] != CATEGORY, key[1]), key))
+                    if len(ranked) >= MAX_CANDIDATES:
+                        break
+            if len(ranked) >= MAX_CANDIDATES:
+                break
+
+        return [
+            {"type": key[0], "id": key[1], "name": self._entries[key][0], "category_id": self._entries[key][2]}
+            for _, key in heapq.nsmallest(limit, ranked)
+        ]
+
+    def _complete(self, word: str, distance: int) -> Dict[str, int]:
+        """Слова словаря, префикс которых отличается от word не больше чем на distance правок.
+
+        Первая буква должна совпадать: опечатки в ней редки, а без этого
+        обход затрагивает ветви всех букв алфавита.
+        """
+        start = self._root.get(word[0])
+        if start is None:
+            return {}
+        # Узлы, путь к которым близок к word: (правок, глубина, узел)
+        prefixes: List[Tuple[int, int, dict]] = []
+        stack = [(start, 1, _next_row(list(range(len(word) + 1)), word, word[0]))]
+        while stack:
+            node, depth, row = stack.pop()
+            if row[-1] <= distance:
+                prefixes.append((row[-1], depth, node))
+                if row[-1] == 0:
+                    # Точный префикс: глубже совпадение лучше не станет
+                    continue
+            if min(row) > distance:
+                continue
+            for char, child in node.items():
+                if char != _END:
+                    stack.append((child, depth + 1, _next_row(row, word, char)))
+
+        # Дополнения собираются от лучших префиксов, в ширину - сначала короткие слова
+        found: Dict[str, int] = {}
+        for edits, _, node in sorted(prefixes, key=lambda item: (item[0], -item[1])):
+            queue = deque([node])
+            while queue and len(found) < MAX_WORD_EXPANSIONS:
+                current = queue.popleft()
+                for char, child in current.items():
+                    if char == _END:
+                        found.setdefault(child, edits)
+                    else:
+                        queue.append(child)
+            if len(found) >= MAX_WORD_EXPANSIONS:
+                break
+        return found
+
+# Общий для процесса экземпляр
+_name_suggest_index: Optional[NameSuggestIndex] = None
+
+def get_name_suggest_index() -> NameSuggestIndex:
+    """Получение общего индекса подсказок по названиям"""
+    global _name_suggest_index
+    if _name_suggest_index is None:
+        _name_suggest_index = NameSuggestIndex()
+    return _name_suggest_index
@@ -1,13 +1,13 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update, func
 from ..models.notification import Notification, NotificationType, NotificationChannel
 from ..schemas.notification import NotificationCreate, NotificationUpdate
 from .email_service import EmailService
 from .telegram_service import TelegramService
 
 class NotificationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.email_service = EmailService()
         self.telegram_service = TelegramService()
@@ -23,11 +23,12 @@ class NotificationService:
             channel=notification.channel,
             title=notification.title,
             message=notification.message,
-            metadata=notification.metadata
+            metadata_=notification.metadata
         )
         self.db.add(db_notification)
-        self.db.commit()
-        self.db.refresh(db_notification)
+        await self.db.commit()
+        # Пользователь нужен каналам доставки; загружаем его явно вместе с обновлением
+        await self.db.refresh(db_notification, ["user"])
 
         # Отправка уведомления через выбранные каналы
         await self._send_notification(db_notification)
@@ -50,12 +51,15 @@ class NotificationService:
         unread_only: bool = False
     ) -> List[Notification]:
         """Получение уведомлений пользователя"""
-        query = self.db.query(Notification).filter(Notification.user_id == user_id)
+        query = select(Notification).where(Notification.user_id == user_id)
         
         if unread_only:
-            query = query.filter(Notification.is_read == 0)
+            query = query.where(Notification.is_read == 0)
             
-        return query.order_by(Notification.created_at.desc()).offset(skip).limit(limit).all()
+        result = await self.db.execute(
+            query.order_by(Notification.created_at.desc()).offset(skip).limit(limit)
+        )
+        return result.scalars().all()
 
     async def mark_as_read(
         self,
@@ -63,33 +67,40 @@ class NotificationService:
         user_id: int
     ) -> Optional[Notification]:
         """Пометка уведомления как прочитанного"""
-        notification = self.db.query(Notification).filter(
-            Notification.id == notification_id,
-            Notification.user_id == user_id
-        ).first()
+        result = await self.db.execute(
+            select(Notification).where(
+                Notification.id == notification_id,
+                Notification.user_id == user_id
+            )
+        )
+        notification = result.scalars().first()
 
         if notification:
             notification.is_read = 1
             notification.read_at = func.now()
-            self.db.commit()
-            self.db.refresh(notification)
+            await self.db.commit()
+            await self.db.refresh(notification)
 
         return notification
 
     async def mark_all_as_read(self, user_id: int) -> None:
         """Пометка всех уведомлений пользователя как прочитанных"""
-        self.db.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == 0
-        ).update({
-            Notification.is_read: 1,
-            Notification.read_at: func.now()
-        })
-        self.db.commit()
+        await self.db.execute(
+            update(Notification).where(
+                Notification.user_id == user_id,
+                Notification.is_read == 0
+            ).values({
+                Notification.is_read: 1,
+                Notification.read_at: func.now()
+            })
+        )
+        await self.db.commit()
 
     async def get_unread_count(self, user_id: int) -> int:
         """Получение количества непрочитанных уведомлений"""
-        return self.db.query(Notification).filter(
-            Notification.user_id == user_id,
-            Notification.is_read == 0
-        ).count() 
\ No newline at end of file
+        return await self.db.scalar(
+            select(func.count(Notification.id)).where(
+                Notification.user_id == user_id,
+                Notification.is_read == 0
+            )
+        ) 
\ No newline at end of file
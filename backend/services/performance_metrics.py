@@ -1,15 +1,18 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from ..models.monitoring import Metric
 from ..schemas.monitoring import MetricCreate
 from ..services.monitoring_service import MonitoringService
+from ..services.analytics_ingest import get_analytics_ingestor
+from ..query_stats import get_query_metrics
 import psutil
 import time
 import gc
 
 class PerformanceMetricsService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.monitoring_service = MonitoringService(db)
         self._last_collection = datetime.utcnow()
@@ -49,11 +52,13 @@ class PerformanceMetricsService:
     async def collect_database_metrics(self) -> None:
         """Сбор метрик базы данных"""
         # Количество активных соединений
-        active_connections = self.db.execute("SHOW STATUS LIKE 'Threads_connected'").scalar()
+        result = await self.db.execute(text("SHOW STATUS LIKE 'Threads_connected'"))
+        active_connections = float(result.first()[1])
         await self._record_metric("db.connections.active", active_connections)
         
         # Время выполнения запросов
-        query_time = self.db.execute("SHOW STATUS LIKE 'Uptime'").scalar()
+        result = await self.db.execute(text("SHOW STATUS LIKE 'Uptime'"))
+        query_time = float(result.first()[1])
         await self._record_metric("db.uptime", query_time)
 
     async def collect_api_metrics(self, endpoint: str, method: str, duration: float, status_code: int) -> None:
@@ -82,6 +87,25 @@ class PerformanceMetricsService:
             labels={"operation": operation, "success": str(success)}
         )
 
+    async def collect_ingest_metrics(self) -> None:
+        """Сбор метрик очереди записи событий аналитики"""
+        stats = get_analytics_ingestor().stats()
+        await self._record_metric("analytics.ingest.queue_depth", stats["queue_depth"])
+        await self._record_metric("analytics.ingest.flush_latency", stats["last_flush_latency"])
+        await self._record_metric("analytics.ingest.rejected", stats["rejected"])
+        await self._record_metric("analytics.ingest.failed", stats["failed"])
+
+    async def collect_query_metrics(self) -> None:
+        """Сбор показателей SQL по эндпоинтам, накопленных с прошлого сбора"""
+        for (method, endpoint), totals in get_query_metrics().drain().items():
+            labels = {"endpoint": endpoint, "method": method}
+            requests = totals["requests"]
+            await self._record_metric("api.db.requests", requests, labels=labels)
+            await self._record_metric("api.db.statements", totals["statements"] / requests, labels=labels)
+            await self._record_metric("api.db.statements.max", totals["max_statements"], labels=labels)
+            await self._record_metric("api.db.duration", totals["duration"] / requests, labels=labels)
+            await self._record_metric("api.db.slowest", totals["slowest"], labels=labels)
+
     async def collect_all_metrics(self) -> None:
         """Сбор всех метрик"""
         start_time = time.time()
@@ -90,6 +114,8 @@ class PerformanceMetricsService:
             await self.collect_system_metrics()
             await self.collect_application_metrics()
             await self.collect_database_metrics()
+            await self.collect_ingest_metrics()
+            await self.collect_query_metrics()
             
             # Записываем время сбора метрик
             collection_duration = time.time() - start_time
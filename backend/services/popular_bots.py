@@ -0,0 +1,142 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+import logging
+from ..config import settings
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+# Счетчики, по которым ведутся дневные рейтинги ботов
+METRICS = ("views", "purchases", "revenue")
+
+# Вес покупки относительно просмотра в оценке популярности
+PURCHASE_WEIGHT = 10.0
+
+def bucket_key(metric: str, day: date, category_id: Optional[int] = None) -> str:
+    """Дневной рейтинг ботов по счетчику (общий или по категории)"""
+    key = f"topk:bots:{metric}:{day.isoformat()}"
+    if category_id is not None:
+        key = f"{key}:category:{category_id}"
+    return key
+
+def window_bounds(days: int) -> Tuple[date, date]:
+    """Первый и последний день периода "последние days дней" (включая сегодня).
+
+    Общие границы для окон в Redis, сводки и расчета по bot_analytics.
+    """
+    end_day = datetime.utcnow().date()
+    return end_day - timedelta(days=days - 1), end_day
+
+class PopularBotsTracker:
+    """Скользящие рейтинги популярных ботов в отсортированных множествах Redis.
+
+    Каждое событие увеличивает (ZINCRBY) счет бота в дневной корзине
+    счетчика - общей и своей категории. Рейтинг за окно собирается
+    ZUNIONSTORE по корзинам окна (с затуханием по возрасту корзины для
+    оценки популярности) и кэшируется на window_ttl секунд, поэтому чтение
+    топ-K - это ZREVRANGE за O(log N + K), без группировки bot_analytics.
+    Ботов в каталоге немного, поэтому корзины хранят точные счетчики и
+    приближенные структуры (Count-Min) не нужны.
+    """
+
+    def __init__(
+        self,
+        retention_days: Optional[int] = None,
+        window_days: Optional[int] = None,
+        half_life_days: Optional[float] = None,
+        window_ttl: Optional[int] = None
+    ):
+        self.retention_days = (
+            settings.POPULAR_BOTS_RETENTION_DAYS
+            if retention_days is None else retention_days
+        )
+        self.window_days = (
+            settings.POPULAR_BOTS_WINDOW_DAYS
+            if window_days is None else window_days
+        )
+        self.half_life_days = (
+            settings.POPULAR_BOTS_HALF_LIFE_DAYS
+            if half_life_days is None else half_life_days
+        )
+        self.window_ttl = (
+            settings.POPULAR_BOTS_WINDOW_TTL
+            if window_ttl is None else window_ttl
+        )
+        self.cache = CacheService()
+
+    async def record(self, increments: Iterable[Tuple[int, Optional[int], date, Dict[str, float]]]) -> None:
+        """Учет приращений [(bot_id, category_id, день, {счетчик: приращение})] одним конвейером"""
+        async with self.cache.redis.pipeline(transaction=False) as pipe:
+            touched = {}
+            for bot_id, category_id, day, values in increments:
+                for metric in METRICS:
+                    amount = values.get(metric, 0)
+                    if not amount:
+                        continue
+                    keys = [bucket_key(metric, day)]
+                    if category_id is not None and metric != "revenue":
+                        keys.append(bucket_key(metric, day, category_id))
+                    for key in keys:
+                        pipe.zincrby(key, amount, bot_id)
+                        touched[key] = day
+            if not touched:
+                return
+            for key, day in touched.items():
+                pipe.expireat(key, datetime.combine(day + timedelta(days=self.retention_days + 1), datetime.min.time()))
+            await pipe.execute()
+
+    async def top(self, metric: str, limit: int, days: int) -> List[Tuple[int, float]]:
+        """Топ ботов по сумме счетчика за последние days дней"""
+        return await self._read_window(await self._sum_window(metric, days), limit)
+
+    async def scores(self, metric: str, bot_ids: List[int], days: int) -> Dict[int, float]:
+        """Суммы счетчика за последние days дней для заданных ботов"""
+        if not bot_ids:
+            return {}
+        values = await self.cache.redis.zmscore(await self._sum_window(metric, days), bot_ids)
+        return {bot_id: value or 0.0 for bot_id, value in zip(bot_ids, values)}
+
+    async def trending(self, limit: int, category_id: Optional[int] = None) -> List[int]:
+        """Популярные боты: просмотры и покупки с экспоненциальным затуханием по дням"""
+        today = datetime.utcnow().date()
+        window_key = f"topk:bots:window:trending:{category_id or 'all'}:{today.isoformat()}"
+        weights = {}
+        for age in range(self.window_days):
+            day = today - timedelta(days=age)
+            decay = 0.5 ** (age / self.half_life_days)
+            weights[bucket_key("views", day, category_id)] = decay
+            weights[bucket_key("purchases", day, category_id)] = decay * PURCHASE_WEIGHT
+        await self._ensure_window(window_key, weights)
+        return [bot_id for bot_id, _ in await self._read_window(window_key, limit)]
+
+    async def _sum_window(self, metric: str, days: int) -> str:
+        start_day, end_day = window_bounds(days)
+        window_key = f"topk:bots:window:{metric}:{days}:{end_day.isoformat()}"
+        await self._ensure_window(window_key, {
+            bucket_key(metric, start_day + timedelta(days=offset)): 1.0
+            for offset in range(days)
+        })
+        return window_key
+
+    async def _ensure_window(self, window_key: str, weights: Dict[str, float]) -> None:
+        # Параллельная пересборка безопасна: результат одинаковый
+        if await self.cache.redis.exists(window_key):
+            return
+        async with self.cache.redis.pipeline(transaction=True) as pipe:
+            pipe.zunionstore(window_key, weights, aggregate="SUM")
+            pipe.expire(window_key, self.window_ttl)
+            await pipe.execute()
+
+    async def _read_window(self, window_key: str, limit: int) -> List[Tuple[int, float]]:
+        members = await self.cache.redis.zrevrange(window_key, 0, limit - 1, withscores=True)
+        return [(int(bot_id), score) for bot_id, score in members]
+
+# Общий для процесса экземпляр
+_popular_bots_tracker: Optional[PopularBotsTracker] = None
+
+def get_popular_bots_tracker() -> PopularBotsTracker:
+    """Получение общих рейтингов популярных ботов"""
+    global _popular_bots_tracker
+    if _popular_bots_tracker is None:
+        _popular_bots_tracker = PopularBotsTracker()
+    return _popular_bots_tracker
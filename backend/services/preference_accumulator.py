@@ -0,0 +1,174 @@
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy import select, func, tuple_
+import asyncio
+import logging
+import math
+from ..models.user_preference import UserPreference
+from ..database import AsyncSessionLocal
+from ..config import settings
+from .cache_service import CacheService
+
+logger = logging.getLogger(__name__)
+
+# Размер пакета ключей в одном SELECT/INSERT
+FLUSH_BATCH_SIZE = 1000
+
+def score_increment(interaction_count: int, weights: List[float]) -> float:
+    """Прирост оценки предпочтения за серию взаимодействий.
+
+    Та же формула, что и при поштучном обновлении: i-е взаимодействие дает
+    weight * 1 / (1 + ln(1 + count_i)), где count_i - счетчик после него.
+    Ограничение оценки сверху единицей применяется к итогу: прирост
+    неотрицателен, поэтому результат совпадает с поштучным расчетом.
+    """
+    return sum(
+        weight / (1.0 + math.log(1 + interaction_count + i))
+        for i, weight in enumerate(weights, start=1)
+    )
+
+class PreferenceAccumulator:
+    """Накопитель обновлений предпочтений (write-behind).
+
+    Взаимодействия складываются в памяти процесса по ключу
+    (user_id, category_id) и периодически записываются одним пакетным
+    INSERT ... ON DUPLICATE KEY UPDATE. Счетчик взаимодействий
+    увеличивается в самом запросе, поэтому параллельные сбросы из разных
+    воркеров не теряют взаимодействий.
+    """
+
+    def __init__(self, flush_interval: Optional[float] = None, max_pending: Optional[int] = None):
+        self.flush_interval = (
+            settings.PREFERENCE_FLUSH_INTERVAL
+            if flush_interval is None else flush_interval
+        )
+        self.max_pending = (
+            settings.PREFERENCE_MAX_PENDING
+            if max_pending is None else max_pending
+        )
+        # (user_id, category_id) -> веса взаимодействий в порядке поступления
+        self._pending: Dict[Tuple[int, int], List[float]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_requested = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, user_id: int, category_id: int, weight: float) -> None:
+        """Учет взаимодействия (без обращения к базе)"""
+        self._pending.setdefault((user_id, category_id), []).append(weight)
+        if len(self._pending) >= self.max_pending:
+            self._flush_requested.set()
+
+    async def flush(self, db: Optional[AsyncSession] = None) -> int:
+        """Запись накопленных взаимодействий; возвращает число обновленных предпочтений"""
+        async with self._flush_lock:
+            pending, self._pending = self._pending, {}
+            self._flush_requested.clear()
+            if not pending:
+                return 0
+
+            try:
+                if db is not None:
+                    await self._write(db, pending)
+                else:
+                    async with AsyncSessionLocal() as session:
+                        await self._write(session, pending)
+            except Exception:
+                # Возвращаем взаимодействия в очередь перед более новыми
+                for key, weights in self._pending.items():
+                    pending.setdefault(key, []).extend(weights)
+                self._pending = pending
+                raise
+
+        await self._invalidate(pending)
+        return len(pending)
+
+    async def write(self, db: AsyncSession, user_id: int, category_id: int, weight: float) -> None:
+        """Синхронная запись одного взаимодействия в сессии запроса.
+
+        Используется при отключенном write-behind: не трогает очередь
+        накопителя и не ждет блокировку сброса.
+        """
+        pending = {(user_id, category_id): [weight]}
+        await self._write(db, pending)
+        await self._invalidate(pending)
+
+    async def _invalidate(self, pending: Dict[Tuple[int, int], List[float]]) -> None:
+        # Инвалидируем кэш затронутых пользователей одним запросом
+        cache = CacheService()
+        await cache.invalidate_tags(*{cache.user_tag(user_id) for user_id, _ in pending})
+
+    async def _write(self, db: AsyncSession, pending: Dict[Tuple[int, int], List[float]]) -> None:
+        keys = list(pending)
+        for start in range(0, len(keys), FLUSH_BATCH_SIZE):
+            batch = keys[start:start + FLUSH_BATCH_SIZE]
+
+            # Текущие счетчики нужны для затухания веса взаимодействий
+            result = await db.execute(
+                select(UserPreference.user_id, UserPreference.category_id, UserPreference.interaction_count).where(
+                    tuple_(UserPreference.user_id, UserPreference.category_id).in_(batch)
+                )
+            )
+            counts = {(user_id, category_id): count or 0 for user_id, category_id, count in result.all()}
+
+            statement = insert(UserPreference).values([
+                {
+                    "user_id": user_id,
+                    "category_id": category_id,
+                    "interaction_count": len(pending[(user_id, category_id)]),
+                    "preference_score": min(1.0, score_increment(
+                        counts.get((user_id, category_id), 0), pending[(user_id, category_id)]
+                    )),
+                    "last_interaction": func.now()
+                }
+                for user_id, category_id in batch
+            ])
+            await db.execute(statement.on_duplicate_key_update(
+                interaction_count=UserPreference.interaction_count + statement.inserted.interaction_count,
+                preference_score=func.least(1.0, UserPreference.preference_score + statement.inserted.preference_score),
+                last_interaction=statement.inserted.last_interaction
+            ))
+        await db.commit()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Preference flush failed: {str(e)}")
+
+    def start(self) -> None:
+        """Запуск периодического сброса"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Остановка сброса с записью оставшихся взаимодействий"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"Preference flush on shutdown failed: {str(e)}")
+
+# Общий для процесса экземпляр
+_preference_accumulator: Optional[PreferenceAccumulator] = None
+
+def get_preference_accumulator() -> PreferenceAccumulator:
+    """Получение общего накопителя обновлений предпочтений"""
+    global _preference_accumulator
+    if _preference_accumulator is None:
+        _preference_accumulator = PreferenceAccumulator()
+    return _preference_accumulator
@@ -0,0 +1,272 @@
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy import select, func
+from datetime import datetime, timedelta, timezone
+import argparse
+import asyncio
+import logging
+import time
+import numpy as np
+from ..models.user_preference import UserPreference
+from ..models.user_recommendation import UserRecommendation
+from ..models import Bot
+from .. import schemas
+from ..database import AsyncSessionLocal
+from ..config import settings
+from .cache_service import CacheService, close_connection_pool
+from .scoring_engine import ScoringEngine, get_scoring_engine
+
+logger = logging.getLogger(__name__)
+
+# Блокировка, чтобы расчет по расписанию запускал только один воркер
+PRECOMPUTE_LOCK_KEY = "lock:recommendations:precompute"
+
+# Каталог ботов в процессе-исполнителе (передается один раз при запуске процесса)
+_worker_engine: Optional[ScoringEngine] = None
+
+def _init_worker(bot_ids: np.ndarray, category_ids: np.ndarray, ratings: np.ndarray) -> None:
+    global _worker_engine
+    _worker_engine = ScoringEngine()
+    _worker_engine.load_rows(zip(bot_ids.tolist(), category_ids.tolist(), ratings.tolist()))
+
+def _score_chunk(
+    chunk: List[Tuple[int, Dict[int, float]]],
+    limit: int
+) -> Dict[int, List[int]]:
+    """Расчет рекомендаций для пакета пользователей [(user_id, вектор предпочтений)]"""
+    return {
+        user_id: _worker_engine.top_k(preference_vector, limit)
+        for user_id, preference_vector in chunk
+    }
+
+class RecommendationPrecomputeService:
+    """Пакетный расчет рекомендаций всех пользователей.
+
+    Предпочтения читаются потоком, упорядоченными по пользователю, и
+    разбиваются на пакеты; пакеты считаются в пуле процессов по снимку
+    каталога ScoringEngine. Результаты записываются в кэш в формате
+    get_or_compute (запрос становится чтением ключа) и, по желанию,
+    в таблицу user_recommendations, откуда RecommendationService читает их
+    при промахе кэша.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.cache = CacheService()
+        # Боты уже загруженных рекомендаций (схемы, без привязки к сессии)
+        self._bots: Dict[int, schemas.Bot] = {}
+
+    async def run(
+        self,
+        chunk_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        limit: Optional[int] = None,
+        ttl: Optional[int] = None,
+        persist: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Расчет и запись рекомендаций всех пользователей с предпочтениями"""
+        chunk_size = chunk_size or settings.RECOMMENDATIONS_PRECOMPUTE_CHUNK_SIZE
+        workers = settings.RECOMMENDATIONS_PRECOMPUTE_WORKERS if workers is None else workers
+        limit = limit or settings.RECOMMENDATIONS_PRECOMPUTE_LIMIT
+        ttl = ttl or settings.RECOMMENDATIONS_PRECOMPUTE_TTL
+        persist = settings.RECOMMENDATIONS_PRECOMPUTE_PERSIST if persist is None else persist
+        started = time.monotonic()
+
+        engine = get_scoring_engine()
+        await engine.ensure_fresh(self.db)
+        n = len(engine)
+        snapshot = (engine.bot_ids[:n].copy(), engine.category_ids[:n].copy(), engine.ratings[:n].copy())
+
+        executor: Optional[Executor] = None
+        if workers > 0:
+            executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=snapshot)
+        else:
+            _init_worker(*snapshot)
+
+        loop = asyncio.get_running_loop()
+        pending = set()
+        users = 0
+        # Запись идет в отдельной сессии: соединение основной занято потоковым чтением
+        async with AsyncSessionLocal() as write_db:
+            async def write(future: asyncio.Future) -> None:
+                nonlocal users
+                recommendations = future.result()
+                await self._write_chunk(write_db, recommendations, limit, ttl, persist)
+                users += len(recommendations)
+
+            try:
+                async for chunk in self._stream_chunks(chunk_size):
+                    if executor is not None:
+                        pending.add(loop.run_in_executor(executor, _score_chunk, chunk, limit))
+                    else:
+                        future = loop.create_future()
+                        future.set_result(_score_chunk(chunk, limit))
+                        pending.add(future)
+
+                    # Ограничиваем число пакетов в памяти
+                    while len(pending) > max(workers, 1) * 2:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for future in done:
+                            await write(future)
+
+                if pending:
+                    done, _ = await asyncio.wait(pending)
+                    for future in done:
+                        await write(future)
+            finally:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+
+        stats = {
+            "users": users,
+            "bots": n,
+            "duration": time.monotonic() - started
+        }
+        logger.info(f"Recommendations precomputed: {stats}")
+        return stats
+
+    async def _stream_chunks(self, chunk_size: int):
+        """Поток пакетов [(user_id, {category_id: preference_score})]"""
+        result = await self.db.stream(
+            select(
+                UserPreference.user_id,
+                UserPreference.category_id,
+                UserPreference.preference_score
+            ).order_by(UserPreference.user_id).execution_options(yield_per=chunk_size * 10)
+        )
+        chunk: List[Tuple[int, Dict[int, float]]] = []
+        current_user, vector = None, {}
+        async for partition in result.partitions():
+            for user_id, category_id, score in partition:
+                if user_id != current_user:
+                    if vector:
+                        chunk.append((current_user, vector))
+                        if len(chunk) >= chunk_size:
+                            yield chunk
+                            chunk = []
+                    current_user, vector = user_id, {}
+                vector[category_id] = score or 0.0
+        if vector:
+            chunk.append((current_user, vector))
+        if chunk:
+            yield chunk
+
+    async def _write_chunk(
+        self,
+        db: AsyncSession,
+        recommendations: Dict[int, List[int]],
+        limit: int,
+        ttl: int,
+        persist: bool
+    ) -> None:
+        """Запись рекомендаций пакета в кэш и (опционально) в user_recommendations"""
+        missing = {
+            bot_id for bot_ids in recommendations.values()
+            for bot_id in bot_ids if bot_id not in self._bots
+        }
+        if missing:
+            result = await db.execute(select(Bot).where(Bot.id.in_(missing)))
+            for bot in result.scalars().all():
+                self._bots[bot.id] = schemas.Bot.model_validate(bot)
+
+        await self.cache.set_recommendations_many(
+            {
+                user_id: [self._bots[bot_id] for bot_id in bot_ids if bot_id in self._bots]
+                for user_id, bot_ids in recommendations.items()
+            },
+            expire=ttl,
+            limit=limit
+        )
+
+        if persist and recommendations:
+            statement = insert(UserRecommendation).values([
+                {"user_id": user_id, "bot_ids": bot_ids, "computed_at": func.now()}
+                for user_id, bot_ids in recommendations.items()
+            ])
+            await db.execute(statement.on_duplicate_key_update(
+                bot_ids=statement.inserted.bot_ids,
+                computed_at=statement.inserted.computed_at
+            ))
+            await db.commit()
+
+# Фоновый расчет по расписанию
+_scheduler_task: Optional[asyncio.Task] = None
+
+def _seconds_until_next_run(now: Optional[datetime] = None) -> float:
+    """Время до ближайшего запуска в RECOMMENDATIONS_PRECOMPUTE_HOUR (UTC)"""
+    now = now or datetime.now(timezone.utc)
+    next_run = now.replace(hour=settings.RECOMMENDATIONS_PRECOMPUTE_HOUR, minute=0, second=0, microsecond=0)
+    if next_run <= now:
+        next_run += timedelta(days=1)
+    return (next_run - now).total_seconds()
+
+async def run_precompute() -> Optional[Dict[str, Any]]:
+    """Запуск пакетного расчета, если его не выполняет другой воркер"""
+    cache = CacheService()
+    # После успешного расчета блокировка остается: повторный запуск в тот же день не нужен
+    if not await cache.redis.set(PRECOMPUTE_LOCK_KEY, "1", nx=True, ex=23 * 3600):
+        return None
+    completed = False
+    try:
+        async with AsyncSessionLocal() as db:
+            stats = await RecommendationPrecomputeService(db).run()
+        completed = True
+        return stats
+    finally:
+        # При ошибке снимаем блокировку, чтобы расчет мог повторить другой воркер
+        if not completed:
+            await cache.redis.delete(PRECOMPUTE_LOCK_KEY)
+
+async def _precompute_loop() -> None:
+    while True:
+        await asyncio.sleep(_seconds_until_next_run())
+        try:
+            await run_precompute()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Recommendations precompute failed: {str(e)}")
+
+async def start_precompute_scheduler() -> None:
+    """Запуск расчета по расписанию (при старте приложения)"""
+    global _scheduler_task
+    if settings.RECOMMENDATIONS_PRECOMPUTE_ENABLED and _scheduler_task is None:
+        _scheduler_task = asyncio.create_task(_precompute_loop())
+
+async def stop_precompute_scheduler() -> None:
+    """Остановка расчета по расписанию"""
+    global _scheduler_task
+    if _scheduler_task is not None:
+        _scheduler_task.cancel()
+        try:
+            await _scheduler_task
+        except asyncio.CancelledError:
+            pass
+        _scheduler_task = None
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            stats = await RecommendationPrecomputeService(db).run(
+                chunk_size=args.chunk_size,
+                workers=args.workers,
+                limit=args.limit,
+                ttl=args.ttl,
+                persist=args.persist
+            )
+        print(f"Users: {stats['users']}, bots: {stats['bots']}, duration: {stats['duration']:.1f}s")
+    finally:
+        await close_connection_pool()
+
+if __name__ == "__main__":
+    # python -m backend.services.recommendation_precompute --workers 4 --persist
+    parser = argparse.ArgumentParser(description="Пакетный расчет рекомендаций для всех пользователей")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Пользователей в пакете")
+    parser.add_argument("--workers", type=int, default=None, help="Число процессов (0 - в текущем процессе)")
+    parser.add_argument("--limit", type=int, default=None, help="Рекомендаций на пользователя")
+    parser.add_argument("--ttl", type=int, default=None, help="Время жизни в кэше (секунды)")
+    parser.add_argument("--persist", action="store_true", default=None, help="Записать в user_recommendations")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
@@ -1,15 +1,28 @@
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-import numpy as np
+from datetime import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy import select
 from ..models.user_preference import UserPreference
-from ..models.bot import Bot
-from ..models.category import Category
+from ..models.user_recommendation import UserRecommendation
+from ..models import Bot, Category, Purchase
+from .. import schemas
 from ..schemas.user_preference import UserPreferenceCreate, UserPreferenceUpdate
+from ..database import AsyncSessionLocal
+from ..config import settings
 from .cache_service import CacheService
+from .scoring_engine import get_scoring_engine
+from .similarity_index import get_similarity_index
+from .preference_accumulator import get_preference_accumulator
+from .popular_bots import get_popular_bots_tracker
+
+# Мягкое время жизни кэшированных результатов (секунды)
+RECOMMENDATIONS_TTL = 1800
+POPULAR_BOTS_TTL = 3600
+SIMILAR_USERS_RECOMMENDATIONS_TTL = 1800
 
 class RecommendationService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.cache = CacheService()
 
@@ -20,25 +33,12 @@ class RecommendationService:
         interaction_type: str,
         interaction_weight: float = 0.1
     ) -> None:
-        """Обновление предпочтений пользователя на основе взаимодействия"""
-        preference = self.db.query(UserPreference).filter(
-            UserPreference.user_id == user_id,
-            UserPreference.category_id == category_id
-        ).first()
-
-        if not preference:
-            preference = UserPreference(
-                user_id=user_id,
-                category_id=category_id,
-                preference_score=0.0,
-                interaction_count=0
-            )
-            self.db.add(preference)
-
-        # Обновляем счетчик взаимодействий
-        preference.interaction_count += 1
-        preference.last_interaction = func.now()
+        """Обновление предпочтений пользователя на основе взаимодействия.
 
+        Взаимодействие накапливается и записывается пакетом вместе с другими
+        (write-behind); кэш пользователя инвалидируется при записи. При
+        PREFERENCE_WRITE_BEHIND_ENABLED=false пишется сразу в сессии запроса.
+        """
         # Обновляем оценку предпочтения
         if interaction_type == "view":
             weight = interaction_weight
@@ -49,105 +49,198 @@ class RecommendationService:
         else:
             weight = interaction_weight
 
-        # Экспоненциальное затухание для старых взаимодействий
-        time_factor = 1.0 / (1.0 + np.log(1 + preference.interaction_count))
-        preference.preference_score = min(1.0, preference.preference_score + weight * time_factor)
-
-        self.db.commit()
-
-        # Инвалидируем кэш предпочтений и рекомендаций
-        await self.cache.delete(f"user_preferences:{user_id}")
-        await self.cache.delete(f"recommendations:{user_id}:all")
-        await self.cache.delete(f"recommendations:{user_id}:{category_id}")
+        accumulator = get_preference_accumulator()
+        if settings.PREFERENCE_WRITE_BEHIND_ENABLED:
+            accumulator.add(user_id, category_id, weight)
+        else:
+            await accumulator.write(self.db, user_id, category_id, weight)
 
     async def get_recommendations(
         self,
         user_id: int,
         limit: int = 10,
         category_id: Optional[int] = None
-    ) -> List[Bot]:
+    ) -> List[schemas.Bot]:
         """Получение рекомендаций для пользователя"""
-        # Пробуем получить рекомендации из кэша
-        cached_recommendations = await self.cache.get_recommendations(user_id, category_id)
-        if cached_recommendations:
-            return cached_recommendations
-
-        # Получаем предпочтения пользователя
-        preferences = self.db.query(UserPreference).filter(
-            UserPreference.user_id == user_id
-        ).all()
-
-        if not preferences:
-            # Если нет предпочтений, возвращаем популярные боты
-            bots = await self._get_popular_bots(limit, category_id)
-            # Сохраняем в кэш
-            await self.cache.set_recommendations(user_id, bots, category_id)
-            return bots
+        key = self.cache.recommendations_key(user_id, category_id, limit)
 
-        # Создаем вектор предпочтений
-        preference_vector = {
-            pref.category_id: pref.preference_score
-            for pref in preferences
-        }
+        async def compute() -> List[schemas.Bot]:
+            # Пересчет может идти в фоне после ответа, поэтому в собственной сессии
+            async with AsyncSessionLocal() as db:
+                bots = await RecommendationService(db)._compute_recommendations(
+                    user_id, limit, category_id
+                )
+                # Тот же тип, что и после чтения из кэша (и у пакетного расчета)
+                return [schemas.Bot.model_validate(bot) for bot in bots]
 
-        # Получаем боты с учетом предпочтений
-        query = self.db.query(Bot).join(Category)
+        return await self.cache.get_or_compute(
+            key, compute, ttl=RECOMMENDATIONS_TTL, tags=[self.cache.user_tag(user_id)]
+        )
 
-        if category_id:
-            query = query.filter(Bot.category_id == category_id)
+    async def _compute_recommendations(
+        self,
+        user_id: int,
+        limit: int = 10,
+        category_id: Optional[int] = None
+    ) -> List[Any]:
+        """Расчет рекомендаций для пользователя без обращения к кэшу рекомендаций"""
+        # Получаем вектор предпочтений пользователя
+        result = await self.db.execute(
+            select(
+                UserPreference.category_id,
+                UserPreference.preference_score,
+                UserPreference.last_interaction
+            ).where(UserPreference.user_id == user_id)
+        )
+        rows = result.all()
+        preference_vector = {category_id: score for category_id, score, _ in rows}
 
-        # Сортируем по рейтингу и предпочтениям
-        bots = query.all()
-        scored_bots = []
+        if not preference_vector:
+            # Если нет предпочтений, возвращаем популярные боты
+            return await self._get_popular_bots(limit, category_id)
 
-        for bot in bots:
-            # Базовый вес - рейтинг бота
-            score = bot.rating or 0.0
+        bot_ids = None
+        if category_id is None and settings.RECOMMENDATIONS_PRECOMPUTE_PERSIST:
+            updated_at = max((t for _, _, t in rows if t is not None), default=None)
+            bot_ids = await self._get_precomputed_bot_ids(user_id, limit, updated_at)
 
-            # Учитываем предпочтения пользователя
-            if bot.category_id in preference_vector:
-                score *= (1.0 + preference_vector[bot.category_id])
+        if bot_ids is None:
+            # Считаем оценки по всему каталогу в памяти и загружаем только итоговые боты
+            engine = get_scoring_engine()
+            await engine.ensure_fresh(self.db)
+            bot_ids = engine.top_k(preference_vector, limit, category_id)
+        if not bot_ids:
+            return []
 
-            scored_bots.append((bot, score))
+        result = await self.db.execute(select(Bot).where(Bot.id.in_(bot_ids)))
+        bots = {bot.id: bot for bot in result.scalars().all()}
+        return [bots[bot_id] for bot_id in bot_ids if bot_id in bots]
 
-        # Сортируем по итоговому весу
-        scored_bots.sort(key=lambda x: x[1], reverse=True)
-        recommendations = [bot for bot, _ in scored_bots[:limit]]
+    async def _get_precomputed_bot_ids(
+        self,
+        user_id: int,
+        limit: int,
+        updated_at: Optional[datetime]
+    ) -> Optional[List[int]]:
+        """Рекомендации из user_recommendations (пакетный расчет), если они актуальны.
 
-        # Сохраняем в кэш
-        await self.cache.set_recommendations(user_id, recommendations, category_id)
-        return recommendations
+        Запись не используется, если в ней меньше limit ботов или предпочтения
+        пользователя менялись после расчета.
+        """
+        result = await self.db.execute(
+            select(UserRecommendation.bot_ids, UserRecommendation.computed_at).where(
+                UserRecommendation.user_id == user_id
+            )
+        )
+        row = result.first()
+        if row is None or len(row.bot_ids) < limit:
+            return None
+        if updated_at is not None and row.computed_at < updated_at:
+            return None
+        return row.bot_ids[:limit]
 
     async def _get_popular_bots(
         self,
         limit: int = 10,
         category_id: Optional[int] = None
-    ) -> List[Bot]:
-        """Получение популярных ботов"""
-        # Пробуем получить из кэша
-        cached_bots = await self.cache.get_popular_bots(category_id)
-        if cached_bots:
-            return cached_bots
+    ) -> List[schemas.Bot]:
+        """Получение популярных ботов (по просмотрам и покупкам с затуханием).
 
-        query = self.db.query(Bot).filter(Bot.rating.isnot(None))
+        Пока событий мало, список дополняется ботами с лучшим рейтингом.
+        """
+        key = self.cache.popular_bots_key(category_id, limit)
 
-        if category_id:
-            query = query.filter(Bot.category_id == category_id)
+        async def compute() -> List[schemas.Bot]:
+            bot_ids = await get_popular_bots_tracker().trending(limit, category_id)
+            async with AsyncSessionLocal() as db:
+                bots = []
+                if bot_ids:
+                    result = await db.execute(select(Bot).where(Bot.id.in_(bot_ids)))
+                    by_id = {bot.id: bot for bot in result.scalars().all()}
+                    bots = [by_id[bot_id] for bot_id in bot_ids if bot_id in by_id]
 
-        bots = query.order_by(Bot.rating.desc()).limit(limit).all()
+                if len(bots) < limit:
+                    query = select(Bot).where(Bot.rating.isnot(None))
 
-        # Сохраняем в кэш
-        await self.cache.set_popular_bots(bots, category_id)
-        return bots
+                    if category_id:
+                        query = query.where(Bot.category_id == category_id)
+                    if bots:
+                        query = query.where(Bot.id.notin_([bot.id for bot in bots]))
+
+                    result = await db.execute(query.order_by(Bot.rating.desc()).limit(limit - len(bots)))
+                    bots.extend(result.scalars().all())
+                return [schemas.Bot.model_validate(bot) for bot in bots]
+
+        return await self.cache.get_or_compute(key, compute, ttl=POPULAR_BOTS_TTL)
 
     async def get_similar_users(
         self,
         user_id: int,
         limit: int = 5
     ) -> List[int]:
-        """Получение списка похожих пользователей"""
-        # TODO: Реализовать поиск похожих пользователей на основе предпочтений
-        return []
+        """Получение списка похожих пользователей (косинусная близость предпочтений)"""
+        index = get_similarity_index()
+        await index.ensure_fresh(self.db)
+        return [similar_user_id for similar_user_id, _ in index.similar(user_id, limit)]
+
+    async def get_similar_users_recommendations(
+        self,
+        user_id: int,
+        limit: int = 10,
+        neighbours: int = 20
+    ) -> List[schemas.Bot]:
+        """Рекомендации "пользователи, похожие на вас, купили" """
+        key = self.cache.get_key("similar_users_recommendations", user_id, limit, neighbours)
+
+        async def compute() -> List[schemas.Bot]:
+            async with AsyncSessionLocal() as db:
+                bots = await RecommendationService(db)._compute_similar_users_recommendations(
+                    user_id, limit, neighbours
+                )
+                return [schemas.Bot.model_validate(bot) for bot in bots]
+
+        return await self.cache.get_or_compute(
+            key, compute, ttl=SIMILAR_USERS_RECOMMENDATIONS_TTL, tags=[self.cache.user_tag(user_id)]
+        )
+
+    async def _compute_similar_users_recommendations(
+        self,
+        user_id: int,
+        limit: int = 10,
+        neighbours: int = 20
+    ) -> List[Bot]:
+        """Расчет рекомендаций по покупкам похожих пользователей"""
+        index = get_similarity_index()
+        await index.ensure_fresh(self.db)
+        similar = dict(index.similar(user_id, neighbours))
+        if not similar:
+            return []
+
+        # Покупки соседей и самого пользователя одним запросом
+        result = await self.db.execute(
+            select(Purchase.user_id, Purchase.bot_id).where(
+                Purchase.user_id.in_([user_id, *similar])
+            )
+        )
+        owned = set()
+        scores: Dict[int, float] = {}
+        for buyer_id, bot_id in result.all():
+            if buyer_id == user_id:
+                owned.add(bot_id)
+            else:
+                # Вес покупки - близость купившего пользователя
+                scores[bot_id] = scores.get(bot_id, 0.0) + similar[buyer_id]
+
+        bot_ids = [
+            bot_id for bot_id, _ in sorted(scores.items(), key=lambda x: (-x[1], x[0]))
+            if bot_id not in owned
+        ][:limit]
+        if not bot_ids:
+            return []
+
+        result = await self.db.execute(select(Bot).where(Bot.id.in_(bot_ids)))
+        bots = {bot.id: bot for bot in result.scalars().all()}
+        return [bots[bot_id] for bot_id in bot_ids if bot_id in bots]
 
     async def get_category_recommendations(
         self,
@@ -158,11 +251,20 @@ class RecommendationService:
         # Пробуем получить из кэша
         cached_preferences = await self.cache.get_user_preferences(user_id)
         if cached_preferences:
-            return [self.db.query(Category).get(cat_id) for cat_id in cached_preferences.keys()][:limit]
+            category_ids = [int(cat_id) for cat_id in cached_preferences.keys()][:limit]
+            result = await self.db.execute(select(Category).where(Category.id.in_(category_ids)))
+            categories = {category.id: category for category in result.scalars().all()}
+            return [categories[cat_id] for cat_id in category_ids if cat_id in categories]
 
-        preferences = self.db.query(UserPreference).filter(
-            UserPreference.user_id == user_id
-        ).order_by(UserPreference.preference_score.desc()).limit(limit).all()
+        # Категории загружаются вместе с предпочтениями: ленивая загрузка в AsyncSession недоступна
+        result = await self.db.execute(
+            select(UserPreference).options(
+                selectinload(UserPreference.category)
+            ).where(
+                UserPreference.user_id == user_id
+            ).order_by(UserPreference.preference_score.desc()).limit(limit)
+        )
+        preferences = result.scalars().all()
 
         # Сохраняем в кэш
         preferences_dict = {pref.category_id: pref.preference_score for pref in preferences}
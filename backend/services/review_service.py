@@ -1,30 +1,31 @@
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
 from ..models.review import Review
-from ..models.user import User
-from ..models.bot import Bot
+from ..models import User, Bot
 from ..schemas.review import ReviewCreate, ReviewUpdate
-from ..services.notification_service import NotificationService
+from .scoring_engine import get_scoring_engine
 
 class ReviewService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
-        self.notification_service = NotificationService(db)
 
     async def create_review(self, user_id: int, review: ReviewCreate) -> Review:
         """Создание нового отзыва"""
         # Проверяем, есть ли уже отзыв от этого пользователя
-        existing_review = self.db.query(Review).filter(
-            Review.user_id == user_id,
-            Review.bot_id == review.bot_id
-        ).first()
+        result = await self.db.execute(
+            select(Review).where(
+                Review.user_id == user_id,
+                Review.bot_id == review.bot_id
+            )
+        )
+        existing_review = result.scalars().first()
         
         if existing_review:
             raise ValueError("Вы уже оставили отзыв на этого бота")
 
         # Проверяем, купил ли пользователь бота
-        bot = self.db.query(Bot).filter(Bot.id == review.bot_id).first()
+        bot = await self.db.get(Bot, review.bot_id)
         if not bot:
             raise ValueError("Бот не найден")
 
@@ -39,28 +40,23 @@ class ReviewService:
         )
         
         self.db.add(db_review)
-        self.db.commit()
-        self.db.refresh(db_review)
+        await self.db.commit()
+        await self.db.refresh(db_review)
 
         # Обновляем рейтинг бота
         await self._update_bot_rating(review.bot_id)
 
-        # Отправляем уведомление владельцу бота
-        await self.notification_service.notify_new_review(
-            bot_owner_id=bot.owner_id,
-            bot_id=bot.id,
-            rating=review.rating,
-            comment=review.comment
-        )
-
         return db_review
 
     async def update_review(self, user_id: int, review_id: int, review: ReviewUpdate) -> Review:
         """Обновление отзыва"""
-        db_review = self.db.query(Review).filter(
-            Review.id == review_id,
-            Review.user_id == user_id
-        ).first()
+        result = await self.db.execute(
+            select(Review).where(
+                Review.id == review_id,
+                Review.user_id == user_id
+            )
+        )
+        db_review = result.scalars().first()
         
         if not db_review:
             raise ValueError("Отзыв не найден")
@@ -68,8 +64,8 @@ class ReviewService:
         for field, value in review.dict(exclude_unset=True).items():
             setattr(db_review, field, value)
 
-        self.db.commit()
-        self.db.refresh(db_review)
+        await self.db.commit()
+        await self.db.refresh(db_review)
 
         # Обновляем рейтинг бота
         await self._update_bot_rating(db_review.bot_id)
@@ -78,22 +74,25 @@ class ReviewService:
 
     async def delete_review(self, user_id: int, review_id: int) -> None:
         """Удаление отзыва"""
-        db_review = self.db.query(Review).filter(
-            Review.id == review_id,
-            Review.user_id == user_id
-        ).first()
+        result = await self.db.execute(
+            select(Review).where(
+                Review.id == review_id,
+                Review.user_id == user_id
+            )
+        )
+        db_review = result.scalars().first()
         
         if not db_review:
             raise ValueError("Отзыв не найден")
 
         bot_id = db_review.bot_id
-        self.db.delete(db_review)
-        self.db.commit()
+        await self.db.delete(db_review)
+        await self.db.commit()
 
         # Обновляем рейтинг бота
         await self._update_bot_rating(bot_id)
 
-    def get_reviews(
+    async def get_reviews(
         self,
         bot_id: Optional[int] = None,
         user_id: Optional[int] = None,
@@ -103,18 +102,19 @@ class ReviewService:
         limit: int = 100
     ) -> List[Review]:
         """Получение списка отзывов с фильтрацией"""
-        query = self.db.query(Review)
+        query = select(Review)
 
         if bot_id:
-            query = query.filter(Review.bot_id == bot_id)
+            query = query.where(Review.bot_id == bot_id)
         if user_id:
-            query = query.filter(Review.user_id == user_id)
+            query = query.where(Review.user_id == user_id)
         if only_verified:
-            query = query.filter(Review.is_verified == True)
+            query = query.where(Review.is_verified == True)
         if only_approved:
-            query = query.filter(Review.is_approved == True)
+            query = query.where(Review.is_approved == True)
 
-        return query.offset(skip).limit(limit).all()
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        return result.scalars().all()
 
     def _check_purchase(self, user_id: int, bot_id: int) -> bool:
         """Проверка покупки бота пользователем"""
@@ -123,14 +123,17 @@ class ReviewService:
 
     async def _update_bot_rating(self, bot_id: int) -> None:
         """Обновление рейтинга бота"""
-        avg_rating = self.db.query(func.avg(Review.rating)).filter(
-            Review.bot_id == bot_id,
-            Review.is_verified == True,
-            Review.is_approved == True
-        ).scalar()
+        avg_rating = await self.db.scalar(
+            select(func.avg(Review.rating)).where(
+                Review.bot_id == bot_id,
+                Review.is_verified == True,
+                Review.is_approved == True
+            )
+        )
 
         if avg_rating is not None:
-            bot = self.db.query(Bot).filter(Bot.id == bot_id).first()
+            bot = await self.db.get(Bot, bot_id)
             if bot:
                 bot.rating = round(avg_rating, 2)
-                self.db.commit() 
\ No newline at end of file
+                await self.db.commit()
+                get_scoring_engine().upsert_bot(bot.id, bot.category_id, bot.rating) 
\ No newline at end of file
@@ -0,0 +1,188 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, func
+from datetime import datetime
+import asyncio
+import time
+import numpy as np
+from ..models import Bot, Category
+from ..config import settings
+
+class ScoringEngine:
+    """Векторизованный расчет рекомендаций по каталогу ботов в памяти процесса.
+
+    Идентификаторы, категории и рейтинги ботов хранятся в массивах NumPy.
+    Оценка бота: rating * (1 + preference_score категории), как и в исходном
+    построчном алгоритме. Отбор лучших - через argpartition, поэтому расчет
+    линеен по каталогу без сортировки всех ботов и без загрузки ORM-объектов.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: Optional[float] = None,
+        full_reload_interval: Optional[float] = None
+    ):
+        self.refresh_interval = (
+            settings.SCORING_ENGINE_REFRESH_INTERVAL
+            if refresh_interval is None else refresh_interval
+        )
+        self.full_reload_interval = (
+            settings.SCORING_ENGINE_FULL_RELOAD_INTERVAL
+            if full_reload_interval is None else full_reload_interval
+        )
+        self._size = 0
+        self.bot_ids = np.empty(0, dtype=np.int64)
+        self.category_ids = np.empty(0, dtype=np.int64)
+        # NaN - у бота нет рейтинга
+        self.ratings = np.empty(0, dtype=np.float64)
+        self._positions: Dict[int, int] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Загрузка каталога или догрузка изменений, если данные устарели"""
+        now = time.monotonic()
+        if self._last_full_reload and now - self._last_refresh < self.refresh_interval:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            if not self._last_full_reload or now - self._last_full_reload >= self.full_reload_interval:
+                await self.reload(db)
+            elif now - self._last_refresh >= self.refresh_interval:
+                await self.refresh(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Полная загрузка каталога (удаленные боты исчезают только здесь)"""
+        watermark = await db.scalar(select(func.now()))
+        result = await db.execute(
+            select(Bot.id, Bot.category_id, Bot.rating).join(Category)
+        )
+        self.load_rows(result.all())
+        self._watermark = watermark
+        self._last_full_reload = self._last_refresh = time.monotonic()
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Догрузка ботов, созданных или измененных после предыдущей загрузки"""
+        watermark = await db.scalar(select(func.now()))
+        result = await db.execute(
+            select(Bot.id, Bot.category_id, Bot.rating).join(Category).where(
+                or_(Bot.created_at >= self._watermark, Bot.updated_at >= self._watermark)
+            )
+        )
+        for bot_id, category_id, rating in result.all():
+            self.upsert_bot(bot_id, category_id, rating)
+        self._watermark = watermark
+        self._last_refresh = time.monotonic()
+
+    def load_rows(self, rows: Iterable[Tuple[int, int, Optional[float]]]) -> None:
+        """Замена каталога строками (bot_id, category_id, rating)"""
+        rows = list(rows)
+        self._size = len(rows)
+        self.bot_ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.category_ids = np.array([row[1] for row in rows], dtype=np.int64)
+        self.ratings = np.array(
+            [np.nan if row[2] is None else row[2] for row in rows],
+            dtype=np.float64
+        )
+        self._positions = {int(bot_id): i for i, bot_id in enumerate(self.bot_ids)}
+
+    def upsert_bot(self, bot_id: int, category_id: Optional[int], rating: Optional[float]) -> None:
+        """Добавление или обновление бота"""
+        if category_id is None:
+            self.remove_bot(bot_id)
+            return
+
+        rating = np.nan if rating is None else rating
+        position = self._positions.get(bot_id)
+        if position is None:
+            self._ensure_capacity(self._size + 1)
+            position = self._size
+            self._size += 1
+            self._positions[bot_id] = position
+            self.bot_ids[position] = bot_id
+
+        self.category_ids[position] = category_id
+        self.ratings[position] = rating
+
+    def remove_bot(self, bot_id: int) -> None:
+        """Удаление бота: на его место переносится последний элемент"""
+        position = self._positions.pop(bot_id, None)
+        if position is None:
+            return
+
+        last = self._size - 1
+        if position != last:
+            moved_id = int(self.bot_ids[last])
+            self.bot_ids[position] = self.bot_ids[last]
+            self.category_ids[position] = self.category_ids[last]
+            self.ratings[position] = self.ratings[last]
+            self._positions[moved_id] = position
+        self._size = last
+
+    def top_k(
+        self,
+        preference_vector: Dict[int, float],
+        limit: int,
+        category_id: Optional[int] = None,
+        offset: int = 0
+    ) -> List[int]:
+        """Идентификаторы ботов с наибольшей оценкой (страница offset..offset+limit)"""
+        n = self._size
+        if n == 0 or limit <= 0:
+            return []
+
+        category_ids = self.category_ids[:n]
+        scores = np.nan_to_num(self.ratings[:n], nan=0.0)
+
+        if preference_vector:
+            # Плотная таблица category_id -> preference_score
+            max_category = int(max(category_ids.max(), max(preference_vector)))
+            weights = np.zeros(max_category + 1, dtype=np.float64)
+            for pref_category_id, score in preference_vector.items():
+                if pref_category_id >= 0:
+                    weights[pref_category_id] = score
+            scores = scores * (1.0 + weights[category_ids])
+
+        candidates = np.arange(n)
+        if category_id:
+            candidates = candidates[category_ids == category_id]
+            scores = scores[candidates]
+
+        k = min(offset + limit, len(candidates))
+        if k <= 0:
+            return []
+        if k < len(candidates):
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(candidates))
+
+        # Сортировка только отобранных: по убыванию оценки, при равенстве - по позиции
+        order = np.lexsort((candidates[top], -scores[top]))
+        positions = candidates[top[order]][offset:offset + limit]
+        return [int(bot_id) for bot_id in self.bot_ids[positions]]
+
+    def _ensure_capacity(self, capacity: int) -> None:
+        if capacity <= len(self.bot_ids):
+            return
+        new_capacity = max(capacity, 2 * len(self.bot_ids), 16)
+        for name in ("bot_ids", "category_ids", "ratings"):
+            array = getattr(self, name)
+            grown = np.empty(new_capacity, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            setattr(self, name, grown)
+
+# Общий для процесса экземпляр
+_scoring_engine: Optional[ScoringEngine] = None
+
+def get_scoring_engine() -> ScoringEngine:
+    """Получение общего движка расчета рекомендаций"""
+    global _scoring_engine
+    if _scoring_engine is None:
+        _scoring_engine = ScoringEngine()
+    return _scoring_engine
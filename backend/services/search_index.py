@@ -0,0 +1,261 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, func
+from collections import Counter
+from datetime import datetime
+import asyncio
+import bisect
+import heapq
+import math
+import re
+import time
+from ..models import Bot
+from ..config import settings
+from ..db_routing import use_primary
+
+try:
+    import snowballstemmer
+except ImportError:  # pragma: no cover - необязательная зависимость
+    snowballstemmer = None
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC = re.compile(r"[а-я]")
+
+# Параметры BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Вес вхождения слова в название относительно описания
+NAME_WEIGHT = 3.0
+
+# Сколько слов индекса может подставить префикс последнего слова запроса
+MAX_PREFIX_EXPANSIONS = 50
+
+# Предел кэша основ (слова запросов тоже попадают в кэш)
+MAX_CACHED_STEMS = 200000
+
+class Tokenizer:
+    """Разбиение текста на основы слов (русский и английский стемминг Snowball)"""
+
+    def __init__(self):
+        self._russian = snowballstemmer.stemmer("russian") if snowballstemmer else None
+        self._english = snowballstemmer.stemmer("english") if snowballstemmer else None
+        # Стемминг на чистом Python медленный, а словарь каталога невелик
+        self._stems: Dict[str, str] = {}
+
+    def words(self, text: Optional[str]) -> List[str]:
+        """Слова текста в нижнем регистре (ё приравнивается к е)"""
+        if not text:
+            return []
+        return _TOKEN.findall(text.lower().replace("ё", "е"))
+
+    def stem(self, word: str) -> str:
+        stem = self._stems.get(word)
+        if stem is None:
+            if self._russian is None:
+                return word
+            stemmer = self._russian if _CYRILLIC.search(word) else self._english
+            if len(self._stems) >= MAX_CACHED_STEMS:
+                self._stems.clear()
+            stem = self._stems[word] = stemmer.stemWord(word)
+        return stem
+
+    def tokens(self, text: Optional[str]) -> List[str]:
+        """Основы слов текста"""
+        return [self.stem(word) for word in self.words(text)]
+
+class SearchIndex:
+    """Инвертированный индекс активных ботов по названию и описанию в памяти процесса.
+
+    Для каждой основы слова хранится список ботов с весом вхождения
+    (вхождение в название весит NAME_WEIGHT); документы ранжируются по
+    BM25. Последнее слово запроса дополнительно ищется как префикс, чтобы
+    находить боты по недописанному слову. Индекс загружается и догружается
+    по меткам времени так же, как ScoringEngine, а create/update/delete
+    бота обновляют его сразу.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: Optional[float] = None,
+        full_reload_interval: Optional[float] = None
+    ):
+        self.refresh_interval = (
+            settings.SEARCH_INDEX_REFRESH_INTERVAL
+            if refresh_interval is None else refresh_interval
+        )
+        self.full_reload_interval = (
+            settings.SEARCH_INDEX_FULL_RELOAD_INTERVAL
+            if full_reload_interval is None else full_reload_interval
+        )
+        self.tokenizer = Tokenizer()
+        # основа -> {bot_id: вес вхождений}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        # bot_id -> (веса основ документа, длина документа, category_id)
+        self._documents: Dict[int, Tuple[Dict[str, float], float, Optional[int]]] = {}
+        self._total_length = 0.0
+        # Отсортированные основы для поиска по префиксу (пересобираются при изменении словаря)
+        self._terms: Optional[List[str]] = None
+        self._watermark: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Загрузка каталога или догрузка изменений, если данные устарели"""
+        now = time.monotonic()
+        if self._last_full_reload and now - self._last_refresh < self.refresh_interval:
+            return
+
+        async with self._lock:
+            # Метка NOW() и изменения - из основной базы: на отстающей реплике
+            # строки, записанные до метки, могли еще не появиться
+            use_primary(db)
+            now = time.monotonic()
+            if not self._last_full_reload or now - self._last_full_reload >= self.full_reload_interval:
+                await self.reload(db)
+            elif now - self._last_refresh >= self.refresh_interval:
+                await self.refresh(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Полная перестройка индекса (удаленные боты исчезают только здесь)"""
+        watermark = await db.scalar(select(func.now()))
+        result = await db.execute(
+            select(Bot.id, Bot.name, Bot.description, Bot.category_id, Bot.is_active)
+        )
+        self.load_rows(result.all())
+        self._watermark = watermark
+        self._last_full_reload = self._last_refresh = time.monotonic()
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Догрузка ботов, созданных или измененных после предыдущей загрузки"""
+        watermark = await db.scalar(select(func.now()))
+        result = await db.execute(
+            select(Bot.id, Bot.name, Bot.description, Bot.category_id, Bot.is_active).where(
+                or_(Bot.created_at >= self._watermark, Bot.updated_at >= self._watermark)
+            )
+        )
+        for row in result.all():
+            self.upsert_bot(*row)
+        self._watermark = watermark
+        self._last_refresh = time.monotonic()
+
+    def load_rows(self, rows: Iterable[Tuple[int, Optional[str], Optional[str], Optional[int], bool]]) -> None:
+        """Замена индекса строками (bot_id, name, description, category_id, is_active)"""
+        self._postings = {}
+        self._documents = {}
+        self._total_length = 0.0
+        self._terms = None
+        for row in rows:
+            self.upsert_bot(*row)
+
+    def upsert_bot(
+        self,
+        bot_id: int,
+        name: Optional[str],
+        description: Optional[str],
+        category_id: Optional[int] = None,
+        is_active: Optional[bool] = True
+    ) -> None:
+        """Добавление или переиндексация бота (неактивные боты не ищутся)"""
+        self.remove_bot(bot_id)
+        if is_active is False:
+            return
+
+        weights: Counter = Counter()
+        for token in self.tokenizer.tokens(name):
+            weights[token] += NAME_WEIGHT
+        for token in self.tokenizer.tokens(description):
+            weights[token] += 1.0
+        if not weights:
+            return
+
+        length = sum(weights.values())
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                self._terms = None
+            postings[bot_id] = weight
+        self._documents[bot_id] = (dict(weights), length, category_id)
+        self._total_length += length
+
+    def remove_bot(self, bot_id: int) -> None:
+        """Удаление бота из индекса"""
+        document = self._documents.pop(bot_id, None)
+        if document is None:
+            return
+        weights, length, _ = document
+        for token in weights:
+            postings = self._postings[token]
+            del postings[bot_id]
+            if not postings:
+                del self._postings[token]
+                self._terms = None
+        self._total_length -= length
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        category_id: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """Боты по убыванию релевантности BM25: [(bot_id, оценка)]"""
+        words = self.tokenizer.words(query)
+        if not words or not self._documents or limit <= 0:
+            return []
+
+        # Основы слов запроса; последнее слово может быть недописанным,
+        # поэтому основы с таким префиксом тоже ищутся, но с половинным весом
+        query_terms = {self.tokenizer.stem(word): 1.0 for word in words}
+        for term in self._prefix_terms(words[-1]):
+            query_terms.setdefault(term, 0.5)
+
+        n = len(self._documents)
+        documents = self._documents
+        # k1 * (1 - b + b * |D| / avgdl) = base + scale * |D|
+        base = BM25_K1 * (1.0 - BM25_B)
+        scale = BM25_K1 * BM25_B * n / self._total_length
+        scores: Dict[int, float] = {}
+        for term, boost in query_terms.items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1.0 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            factor = boost * idf * (BM25_K1 + 1.0)
+            for bot_id, weight in postings.items():
+                norm = base + scale * documents[bot_id][1]
+                scores[bot_id] = scores.get(bot_id, 0.0) + factor * weight / (weight + norm)
+
+        if category_id is not None:
+            scores = {
+                bot_id: score for bot_id, score in scores.items()
+                if self._documents[bot_id][2] == category_id
+            }
+        # При равной оценке выше бот с меньшим id
+        best = heapq.nlargest(limit, ((score, -bot_id) for bot_id, score in scores.items()))
+        return [(-negative_id, score) for score, negative_id in best]
+
+    def _prefix_terms(self, word: str) -> List[str]:
+        """Основы индекса, начинающиеся с word (самые частые)"""
+        if self._terms is None:
+            self._terms = sorted(self._postings)
+        start = bisect.bisect_left(self._terms, word)
+        end = bisect.bisect_left(self._terms, word + "￿")
+        terms = self._terms[start:end]
+        if len(terms) > MAX_PREFIX_EXPANSIONS:
+            terms = heapq.nlargest(MAX_PREFIX_EXPANSIONS, terms, key=lambda term: len(self._postings[term]))
+        return terms
+
+# Общий для процесса экземпляр
+_search_index: Optional[SearchIndex] = None
+
+def get_search_index() -> SearchIndex:
+    """Получение общего поискового индекса каталога"""
+    global _search_index
+    if _search_index is None:
+        _search_index = SearchIndex()
+    return _search_index
@@ -0,0 +1,291 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from datetime import datetime
+import asyncio
+import math
+import time
+import numpy as np
+from scipy import sparse
+from ..models.user_preference import UserPreference
+from ..config import settings
+
+class UserSimilarityIndex:
+    """Индекс похожих пользователей по предпочтениям категорий.
+
+    Предпочтения хранятся в разреженной матрице пользователи x категории
+    с нормированными строками, поэтому скалярное произведение строк равно
+    косинусной близости. Запрос затрагивает только столбцы категорий самого
+    пользователя (CSC), а лучшие соседи отбираются argpartition - без
+    перебора всех пар. Измененные пользователи держатся в небольшом
+    оверлее и вливаются в матрицу при его переполнении.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: Optional[float] = None,
+        full_reload_interval: Optional[float] = None,
+        compaction_threshold: Optional[int] = None
+    ):
+        self.refresh_interval = (
+            settings.SIMILARITY_INDEX_REFRESH_INTERVAL
+            if refresh_interval is None else refresh_interval
+        )
+        self.full_reload_interval = (
+            settings.SIMILARITY_INDEX_FULL_RELOAD_INTERVAL
+            if full_reload_interval is None else full_reload_interval
+        )
+        self.compaction_threshold = (
+            settings.SIMILARITY_INDEX_COMPACTION_THRESHOLD
+            if compaction_threshold is None else compaction_threshold
+        )
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._category_columns: Dict[int, int] = {}
+        self._rows = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self._columns = sparse.csc_matrix((0, 0), dtype=np.float32)
+        # Строки матрицы, замененные оверлеем или удаленные
+        self._stale = np.zeros(0, dtype=bool)
+        # user_id -> нормированный вектор {category_id: вес}
+        self._overlay: Dict[int, Dict[int, float]] = {}
+        self._watermark: Optional[datetime] = None
+        self._last_refresh = 0.0
+        self._last_full_reload = 0.0
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return int(len(self.user_ids) - self._stale.sum()) + len(self._overlay)
+
+    async def ensure_fresh(self, db: AsyncSession) -> None:
+        """Загрузка индекса или догрузка изменений, если данные устарели"""
+        now = time.monotonic()
+        if self._last_full_reload and now - self._last_refresh < self.refresh_interval:
+            return
+
+        async with self._lock:
+            now = time.monotonic()
+            if not self._last_full_reload or now - self._last_full_reload >= self.full_reload_interval:
+                await self.reload(db)
+            elif now - self._last_refresh >= self.refresh_interval:
+                await self.refresh(db)
+
+    async def reload(self, db: AsyncSession) -> None:
+        """Полная загрузка предпочтений всех пользователей потоком"""
+        watermark = await db.scalar(select(func.now()))
+        result = await db.stream(
+            select(
+                UserPreference.user_id,
+                UserPreference.category_id,
+                UserPreference.preference_score
+            ).execution_options(yield_per=10000)
+        )
+        rows = []
+        async for partition in result.partitions():
+            rows.extend(partition)
+        self.build(rows)
+        self._watermark = watermark
+        self._last_full_reload = self._last_refresh = time.monotonic()
+
+    async def refresh(self, db: AsyncSession) -> None:
+        """Перезагрузка векторов пользователей, взаимодействовавших после прошлой загрузки"""
+        watermark = await db.scalar(select(func.now()))
+        changed_users = select(UserPreference.user_id).where(
+            UserPreference.last_interaction >= self._watermark
+        ).distinct()
+        result = await db.execute(
+            select(
+                UserPreference.user_id,
+                UserPreference.category_id,
+                UserPreference.preference_score
+            ).where(UserPreference.user_id.in_(changed_users))
+        )
+        vectors: Dict[int, Dict[int, float]] = {}
+        for user_id, category_id, score in result.all():
+            vectors.setdefault(user_id, {})[category_id] = score
+        for user_id, vector in vectors.items():
+            self.update_user(user_id, vector)
+        self._watermark = watermark
+        self._last_refresh = time.monotonic()
+
+    def build(self, rows: Iterable[Tuple[int, int, Optional[float]]]) -> None:
+        """Построение индекса по строкам (user_id, category_id, preference_score)"""
+        user_positions: Dict[int, int] = {}
+        category_columns: Dict[int, int] = {}
+        row_index, col_index, values = [], [], []
+        for user_id, category_id, score in rows:
+            if not score:
+                continue
+            row = user_positions.setdefault(user_id, len(user_positions))
+            col = category_columns.setdefault(category_id, len(category_columns))
+            row_index.append(row)
+            col_index.append(col)
+            values.append(score)
+
+        matrix = sparse.csr_matrix(
+            (np.array(values, dtype=np.float32), (row_index, col_index)),
+            shape=(len(user_positions), len(category_columns))
+        )
+        # Нормируем строки: скалярное произведение = косинусная близость
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        matrix = sparse.csr_matrix(sparse.diags(1.0 / norms) @ matrix, dtype=np.float32)
+
+        self.user_ids = np.fromiter(user_positions.keys(), dtype=np.int64, count=len(user_positions))
+        self._positions = user_positions
+        self._category_columns = category_columns
+        self._rows = matrix
+        self._columns = matrix.tocsc()
+        self._stale = np.zeros(len(user_positions), dtype=bool)
+        self._overlay = {}
+
+    def update_user(self, user_id: int, preferences: Dict[int, float]) -> None:
+        """Замена вектора пользователя (вливается в матрицу при переполнении оверлея)"""
+        position = self._positions.get(user_id)
+        if position is not None:
+            self._stale[position] = True
+
+        vector = {category_id: score for category_id, score in preferences.items() if score}
+        norm = math.sqrt(sum(score * score for score in vector.values()))
+        if norm:
+            self._overlay[user_id] = {category_id: score / norm for category_id, score in vector.items()}
+        else:
+            self._overlay.pop(user_id, None)
+
+        if len(self._overlay) > self.compaction_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Перестроение матрицы с учетом оверлея"""
+        rows = []
+        coo = self._rows.tocoo()
+        categories = np.fromiter(self._category_columns.keys(), dtype=np.int64, count=len(self._category_columns))
+        for row, col, value in zip(coo.row, coo.col, coo.data):
+            if not self._stale[row]:
+                rows.append((int(self.user_ids[row]), int(categories[col]), float(value)))
+        for user_id, vector in self._overlay.items():
+            for category_id, value in vector.items():
+                rows.append((user_id, category_id, value))
+        self.build(rows)
+
+    def get_vector(self, user_id: int) -> Dict[int, float]:
+        """Нормированный вектор предпочтений пользователя"""
+        if user_id in self._overlay:
+            return self._overlay[user_id]
+        position = self._positions.get(user_id)
+        if position is None or self._stale[position]:
+            return {}
+        row = self._rows.getrow(position)
+        categories = list(self._category_columns.keys())
+        return {categories[col]: float(value) for col, value in zip(row.indices, row.data)}
+
+    def similar(self, user_id: int, limit: int = 5) -> List[Tuple[int, float]]:
+        """Похожие пользователи: [(user_id, косинусная близость)] по убыванию"""
+        vector = self.get_vector(user_id)
+        if not vector or limit <= 0:
+            return []
+
+        candidates: List[Tuple[int, float]] = []
+
+        # Основная матрица: только столбцы категорий пользователя
+        columns = [
+            (self._category_columns[category_id], weight)
+            for category_id, weight in vector.items()
+            if category_id in self._category_columns
+        ]
+        if columns:
+            sub = self._columns[:, [col for col, _ in columns]]
+            scores = sub @ np.array([weight for _, weight in columns], dtype=np.float32)
+            scores[self._stale] = 0.0
+            position = self._positions.get(user_id)
+            if position is not None:
+                scores[position] = 0.0
+
+            nonzero = np.flatnonzero(scores > 0)
+            if len(nonzero) > limit:
+                nonzero = nonzero[np.argpartition(-scores[nonzero], limit - 1)[:limit]]
+            candidates.extend(
+                (int(self.user_ids[i]), float(scores[i])) for i in nonzero
+            )
+
+        # Оверлей невелик (ограничен compaction_threshold), считаем напрямую
+        for other_id, other_vector in self._overlay.items():
+            if other_id == user_id:
+                continue
+            score = sum(weight * other_vector.get(category_id, 0.0) for category_id, weight in vector.items())
+            if score > 0:
+                candidates.append((other_id, score))
+
+        candidates.sort(key=lambda x: (-x[1], x[0]))
+        return candidates[:limit]
+
+    def similar_batch(
+        self,
+        user_ids: Iterable[int],
+        limit: int = 5,
+        block_size: int = 64,
+        max_candidates: Optional[int] = None
+    ) -> Dict[int, List[Tuple[int, float]]]:
+        """Похожие пользователи для многих пользователей сразу.
+
+        Кандидаты блока берутся из инвертированных списков категорий его
+        пользователей (столбцы CSC): из каждой категории - не больше
+        max_candidates пользователей с наибольшим весом. Близость считается
+        только с кандидатами, а не со всей матрицей. Используется для
+        предварительного расчета; оверлей предварительно вливается.
+        """
+        if self._overlay or self._stale.any():
+            self.compact()
+        max_candidates = (
+            settings.SIMILARITY_INDEX_MAX_CANDIDATES
+            if max_candidates is None else max_candidates
+        )
+
+        positions = [
+            (user_id, self._positions[user_id])
+            for user_id in user_ids if user_id in self._positions
+        ]
+        indptr, indices, data = self._columns.indptr, self._columns.indices, self._columns.data
+        # Столбец -> ограниченный список кандидатов (общий для всех блоков)
+        column_candidates: Dict[int, np.ndarray] = {}
+
+        def candidates_of(col: int) -> np.ndarray:
+            found = column_candidates.get(col)
+            if found is None:
+                begin, end = indptr[col], indptr[col + 1]
+                found = indices[begin:end]
+                if end - begin > max_candidates:
+                    found = found[np.argpartition(-data[begin:end], max_candidates - 1)[:max_candidates]]
+                column_candidates[col] = found
+            return found
+
+        neighbours: Dict[int, List[Tuple[int, float]]] = {}
+        for start in range(0, len(positions), block_size):
+            block = positions[start:start + block_size]
+            block_rows = self._rows[[position for _, position in block]]
+            candidates = np.unique(np.concatenate([
+                candidates_of(col) for col in np.unique(block_rows.indices)
+            ]))
+            products = (block_rows @ self._rows[candidates].T).tocsr()
+            for i, (user_id, position) in enumerate(block):
+                row = products.getrow(i)
+                found, scores = candidates[row.indices], row.data
+                mask = found != position
+                found, scores = found[mask], scores[mask]
+                if len(found) > limit:
+                    top = np.argpartition(-scores, limit - 1)[:limit]
+                    found, scores = found[top], scores[top]
+                order = np.argsort(-scores, kind="stable")
+                neighbours[user_id] = [
+                    (int(self.user_ids[found[j]]), float(scores[j])) for j in order
+                ]
+        return neighbours
+
+# Общий для процесса экземпляр
+_similarity_index: Optional[UserSimilarityIndex] = None
+
+def get_similarity_index() -> UserSimilarityIndex:
+    """Получение общего индекса похожих пользователей"""
+    global _similarity_index
+    if _similarity_index is None:
+        _similarity_index = UserSimilarityIndex()
+    return _similarity_index
@@ -0,0 +1,21 @@
+import pytest
+import fakeredis
+from redis.asyncio import ConnectionPool, Redis
+from ..services import cache_service
+
+@pytest.fixture
+async def redis(monkeypatch):
+    """Redis в памяти (fakeredis) вместо общего пула CacheService.
+
+    Пул создается заново для каждого теста: соединения привязаны к циклу
+    событий теста, а данные не пересекаются с другими тестами и живым Redis.
+    Локальный кэш L1 тоже свой.
+    """
+    pool = ConnectionPool(
+        connection_class=fakeredis.aioredis.FakeConnection,
+        server=fakeredis.FakeServer()
+    )
+    monkeypatch.setattr(cache_service, "_connection_pool", pool)
+    monkeypatch.setattr(cache_service, "_local_cache", None)
+    yield Redis(connection_pool=pool)
+    await cache_service.close_connection_pool()
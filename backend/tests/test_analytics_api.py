@@ -0,0 +1,76 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from .. import routers
+from ..api import analytics
+from ..dependencies import get_current_user
+from ..services.analytics_ingest import AnalyticsIngestor
+from ..models import User, UserRole
+
+QUERY = {"report": "top_bots", "start_date": "2024-01-01", "end_date": "2024-01-31"}
+
+class FakeQueryEngine:
+    async def run_report(self, report, start_date, end_date, limit=100):
+        return {"report": report, "columns": ["bot_id"], "rows": [[1]]}
+
+@pytest.fixture
+def app():
+    # Роутеры подключаются так же, как в main.py
+    app = FastAPI()
+    app.include_router(routers.router, prefix="/api")
+    return app
+
+@pytest.fixture
+def ingestor(monkeypatch):
+    # Очередь на одно событие без фоновой записи: второе событие не помещается
+    ingestor = AnalyticsIngestor(max_queue_size=1, batch_size=10, flush_interval=60, enqueue_timeout=0.01)
+    monkeypatch.setattr(analytics, "get_analytics_ingestor", lambda: ingestor)
+    return ingestor
+
+async def request(app, method, url, **kwargs):
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        return await client.request(method, url, **kwargs)
+
+async def test_query_requires_token(app):
+    response = await request(app, "POST", "/api/analytics/query", json=QUERY)
+    assert response.status_code == 401
+
+async def test_query_requires_admin(app):
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, role=UserRole.USER)
+    response = await request(app, "POST", "/api/analytics/query", json=QUERY)
+    assert response.status_code == 403
+
+async def test_query_as_admin(app, monkeypatch):
+    monkeypatch.setattr(analytics, "get_analytics_query_engine", lambda: FakeQueryEngine())
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, role=UserRole.ADMIN)
+    response = await request(app, "POST", "/api/analytics/query", json=QUERY)
+    assert response.status_code == 200
+    assert response.json() == {"report": "top_bots", "columns": ["bot_id"], "rows": [[1]]}
+
+async def test_track_event_accepted(app, ingestor):
+    response = await request(app, "POST", "/api/analytics/events/", json={"user_id": 1, "event_type": "page_view"})
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 1
+    assert ingestor.stats()["queue_depth"] == 1
+
+async def test_track_event_queue_full(app, ingestor):
+    event = {"user_id": 1, "event_type": "page_view"}
+    assert (await request(app, "POST", "/api/analytics/events/", json=event)).status_code == 202
+
+    response = await request(app, "POST", "/api/analytics/events/", json=event)
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert ingestor.stats()["rejected"] == 1
+
+async def test_ingest_stats_requires_admin(app, ingestor):
+    response = await request(app, "GET", "/api/analytics/events/stats/")
+    assert response.status_code == 401
+
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, role=UserRole.USER)
+    response = await request(app, "GET", "/api/analytics/events/stats/")
+    assert response.status_code == 403
+
+    app.dependency_overrides[get_current_user] = lambda: User(id=1, role=UserRole.ADMIN)
+    response = await request(app, "GET", "/api/analytics/events/stats/")
+    assert response.status_code == 200
+    assert response.json()["max_queue_size"] == 1
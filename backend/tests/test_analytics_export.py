@@ -0,0 +1,81 @@
+import pytest
+from datetime import date, datetime
+from ..services.analytics_export import AnalyticsExportService, month_path
+from ..services.analytics_query import AnalyticsQueryEngine, AnalyticsQueryError
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("duckdb")
+
+ANALYTICS_ROWS = [
+    (1, 5, "bot_view", '{"bot_id": 1}', None, datetime(2026, 9, 30, 23, 0)),
+    (2, 5, "bot_view", {"bot_id": 2}, None, datetime(2026, 10, 1, 10, 0)),
+    (3, 6, "search", '{"query": "бот"}', '{"source": "web"}', datetime(2026, 10, 1, 11, 0)),
+    (4, None, "page_view", "{}", None, datetime(2026, 10, 2, 9, 0))
+]
+
+BOT_ANALYTICS_ROWS = [
+    (1, 1, date(2026, 9, 30), 10, 1, 5.0, None, 0),
+    (2, 1, date(2026, 10, 1), 20, 2, 10.0, 4.5, 1),
+    (3, 2, date(2026, 10, 1), 50, 1, 3.0, None, 0)
+]
+
+class FakeStream:
+    def __init__(self, rows):
+        self.rows = rows
+
+    async def partitions(self):
+        # Пакеты по одной строке, как при маленьком yield_per
+        for row in self.rows:
+            yield [row]
+
+class FakeDB:
+    """Сессия, отдающая строки таблиц по диапазону времени запроса"""
+
+    tables = {
+        "analytics": (ANALYTICS_ROWS, 5),
+        "bot_analytics": (BOT_ANALYTICS_ROWS, 2)
+    }
+
+    async def scalar(self, statement):
+        table = str(statement).split("FROM ")[1]
+        rows, time_index = self.tables[table]
+        return min(row[time_index] for row in rows)
+
+    async def stream(self, statement):
+        table = str(statement).split("FROM ")[1].split()[0]
+        params = statement.compile().params
+        rows, time_index = self.tables[table]
+        return FakeStream([row for row in rows if params["start"] <= row[time_index] < params["end"]])
+
+async def test_export_and_reports(tmp_path):
+    directory = str(tmp_path)
+    stats = await AnalyticsExportService(FakeDB()).export(directory=directory, today=date(2026, 11, 5))
+
+    assert stats == {
+        "analytics": {"2026-09": 1, "2026-10": 3, "2026-11": 0},
+        "bot_analytics": {"2026-09": 1, "2026-10": 2, "2026-11": 0}
+    }
+    assert not (tmp_path / "analytics" / "month=2026-11" / "data.parquet").exists()
+    assert (tmp_path / "analytics" / "month=2026-10" / "data.parquet").exists()
+
+    engine = AnalyticsQueryEngine(directory=directory, threads=1, memory_limit="256MB", concurrency=1)
+    result = await engine.run_report("events_by_day", date(2026, 10, 1), date(2026, 10, 1))
+    assert result["columns"] == ["day", "event_type", "events"]
+    assert result["rows"] == [[date(2026, 10, 1), "bot_view", 1], [date(2026, 10, 1), "search", 1]]
+
+    result = await engine.run_report("top_bots", date(2026, 9, 1), date(2026, 10, 31), limit=1)
+    assert result["rows"][0][:4] == [1, 30, 3, 15.0]
+
+    result = await engine.run_report("revenue_by_month", date(2026, 9, 1), date(2026, 10, 31))
+    assert [row[0] for row in result["rows"]] == ["2026-09", "2026-10"]
+
+async def test_report_errors(tmp_path):
+    engine = AnalyticsQueryEngine(directory=str(tmp_path), threads=1, memory_limit="256MB", concurrency=1)
+    with pytest.raises(AnalyticsQueryError):
+        await engine.run_report("drop_everything", date(2026, 10, 1), date(2026, 10, 2))
+    # Выгрузки еще нет
+    with pytest.raises(AnalyticsQueryError):
+        await engine.run_report("events_by_day", date(2026, 10, 1), date(2026, 10, 2))
+
+def test_month_path():
+    assert month_path("/data", "analytics", date(2026, 1, 1)) == "/data/analytics/month=2026-01/data.parquet"
@@ -0,0 +1,89 @@
+import pytest
+import asyncio
+from ..services import analytics_ingest
+from ..services.analytics_ingest import AnalyticsIngestor, IngestQueueFull
+from ..schemas.analytics import AnalyticsCreate
+
+class FakeSession:
+    """Сессия, запоминающая пакеты вместо записи в базу"""
+    batches = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+    async def execute(self, statement, rows):
+        FakeSession.batches.append(list(rows))
+
+    async def commit(self):
+        pass
+
+@pytest.fixture
+def batches(monkeypatch, redis):
+    # Уникальные посетители пишутся в fakeredis, а не в живой Redis
+    FakeSession.batches = []
+    monkeypatch.setattr(analytics_ingest, "AsyncSessionLocal", FakeSession)
+    return FakeSession.batches
+
+def make_event(i):
+    return AnalyticsCreate(user_id=i, event_type="page_view", event_data={"page": "/"})
+
+async def test_batches_by_size(batches):
+    # Полные пакеты записываются без ожидания интервала
+    ingestor = AnalyticsIngestor(max_queue_size=100, batch_size=10, flush_interval=60, enqueue_timeout=0.1)
+    ingestor.start()
+    await ingestor.enqueue_many([make_event(i) for i in range(25)])
+    await asyncio.sleep(0.05)
+    
+    assert [len(batch) for batch in batches] == [10, 10]
+    
+    # Остаток дописывается при остановке
+    await ingestor.stop(timeout=0.1)
+    assert sum(len(batch) for batch in batches) == 25
+    assert ingestor.stats()["written"] == 25
+    assert ingestor.stats()["queue_depth"] == 0
+
+async def test_batches_by_time(batches):
+    ingestor = AnalyticsIngestor(max_queue_size=100, batch_size=10, flush_interval=0.05, enqueue_timeout=0.1)
+    ingestor.start()
+    await ingestor.enqueue(make_event(1))
+    await asyncio.sleep(0.1)
+    
+    assert [len(batch) for batch in batches] == [1]
+    assert batches[0][0]["user_id"] == 1
+    await ingestor.stop()
+
+async def test_backpressure(batches):
+    # Без фоновой записи очередь заполняется и новые события отклоняются
+    ingestor = AnalyticsIngestor(max_queue_size=2, batch_size=10, flush_interval=1, enqueue_timeout=0.01)
+    await ingestor.enqueue_many([make_event(1), make_event(2)])
+    
+    with pytest.raises(IngestQueueFull):
+        await ingestor.enqueue(make_event(3))
+    assert ingestor.stats()["rejected"] == 1
+    
+    await ingestor.stop()
+    assert [len(batch) for batch in batches] == [2]
+    with pytest.raises(IngestQueueFull):
+        await ingestor.enqueue(make_event(4))
+
+async def test_stop_cancels_stuck_writer(batches, monkeypatch):
+    # Зависшая запись отменяется по таймауту, остаток очереди дописывается при остановке
+    class StuckSession(FakeSession):
+        async def execute(self, statement, rows):
+            await asyncio.Event().wait()
+    
+    ingestor = AnalyticsIngestor(max_queue_size=100, batch_size=10, flush_interval=60, enqueue_timeout=0.1)
+    monkeypatch.setattr(analytics_ingest, "AsyncSessionLocal", StuckSession)
+    ingestor.start()
+    await ingestor.enqueue_many([make_event(i) for i in range(15)])
+    await asyncio.sleep(0.05)
+    
+    monkeypatch.setattr(analytics_ingest, "AsyncSessionLocal", FakeSession)
+    await ingestor.stop(timeout=0.05)
+    
+    assert [len(batch) for batch in batches] == [5]
+    assert ingestor.stats()["failed"] == 10
+    assert ingestor.stats()["queue_depth"] == 0
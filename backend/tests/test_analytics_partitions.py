@@ -0,0 +1,106 @@
+import csv
+import gzip
+import pytest
+from datetime import date, datetime
+from ..services.analytics_partitions import (
+    AnalyticsPartitionManager,
+    ArchiveWriter,
+    add_months,
+    expired_partitions,
+    partition_month,
+    partition_name
+)
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class FakeDB:
+    """Сессия со списком секций, запоминающая выполненные ALTER TABLE"""
+
+    def __init__(self, partitions):
+        self.partitions = partitions
+        self.statements = []
+
+    async def execute(self, statement):
+        sql = str(statement)
+        if sql.startswith("SELECT PARTITION_NAME"):
+            return FakeResult([(name,) for name in self.partitions])
+        self.statements.append(sql)
+        return FakeResult([])
+
+def test_partition_names():
+    assert partition_name(date(2026, 1, 1)) == "p202601"
+    assert partition_month("p202601") == date(2026, 1, 1)
+    assert partition_month("p_future") is None
+    assert add_months(date(2026, 11, 15), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+def test_expired_partitions():
+    names = ["p202509", "p202510", "p202511", "p202610", "p_future"]
+    assert expired_partitions(names, 12, date(2026, 10, 17)) == ["p202509"]
+    # Нулевой срок хранения - без удаления
+    assert expired_partitions(names, 0, date(2026, 10, 17)) == []
+
+async def test_ensure_partitions_splits_future():
+    db = FakeDB(["p202609", "p202610", "p_future"])
+    created = await AnalyticsPartitionManager(db).ensure_partitions(2, today=date(2026, 10, 17))
+
+    assert created == ["p202611", "p202612"]
+    assert db.statements == [
+        "ALTER TABLE analytics REORGANIZE PARTITION p_future INTO ("
+        "PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01')), "
+        "PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01')), "
+        "PARTITION p_future VALUES LESS THAN MAXVALUE)"
+    ]
+    # Все секции уже есть
+    db = FakeDB(["p202610", "p202611", "p202612", "p_future"])
+    assert await AnalyticsPartitionManager(db).ensure_partitions(2, today=date(2026, 10, 17)) == []
+
+async def test_expired_kept_without_archive():
+    # Без каталога архива устаревшие секции удаляются только по явному согласию
+    partitions = ["p202509", "p202610", "p202611", "p202612", "p_future"]
+    db = FakeDB(partitions)
+    stats = await AnalyticsPartitionManager(db).run(
+        retention_months=12, months_ahead=2, archive_dir="", today=date(2026, 10, 17)
+    )
+    assert stats["dropped"] == []
+    assert stats["kept"] == ["p202509"]
+    assert db.statements == []
+
+    db = FakeDB(partitions)
+    stats = await AnalyticsPartitionManager(db).run(
+        retention_months=12, months_ahead=2, archive_dir="", drop_without_archive=True,
+        today=date(2026, 10, 17)
+    )
+    assert stats["dropped"] == ["p202509"]
+    assert db.statements == ["ALTER TABLE analytics DROP PARTITION p202509"]
+
+def test_csv_archive(tmp_path):
+    path = str(tmp_path / "analytics_2026_10.csv.gz")
+    writer = ArchiveWriter(path, "csv")
+    writer.write([
+        (1, 5, "bot_view", '{"bot_id": 3}', None, datetime(2026, 10, 1, 12, 0)),
+        (2, None, "search", {"query": "бот"}, {"source": "web"}, datetime(2026, 10, 2, 8, 30))
+    ])
+    writer.close()
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "user_id", "event_type", "event_data", "metadata", "created_at"]
+    assert rows[1] == ["1", "5", "bot_view", '{"bot_id": 3}', "", "2026-10-01T12:00:00"]
+    assert rows[2] == ["2", "", "search", '{"query": "бот"}', '{"source": "web"}', "2026-10-02T08:30:00"]
+
+def test_parquet_archive(tmp_path):
+    parquet = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "analytics_2026_10.parquet")
+    writer = ArchiveWriter(path, "parquet")
+    writer.write([(1, 5, "bot_view", '{"bot_id": 3}', None, datetime(2026, 10, 1, 12, 0))])
+    writer.close()
+
+    table = parquet.read_table(path)
+    assert table.num_rows == 1
+    assert table.column("event_type").to_pylist() == ["bot_view"]
@@ -0,0 +1,133 @@
+import pytest
+from datetime import date
+from ..services import analytics_service
+from ..services.analytics_service import AnalyticsService
+from ..models.analytics import BotAnalytics, AnalyticsDailyTotals, CategoryAnalyticsDaily
+from ..schemas.analytics import AnalyticsSummary
+from ..json_stream import JSONStreamError
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class FakeDB:
+    """Сессия, возвращающая категории ботов и запоминающая commit"""
+
+    def __init__(self, bot_categories):
+        self.bot_categories = bot_categories
+        self.committed = False
+
+    async def execute(self, statement):
+        return FakeResult(list(self.bot_categories.items()))
+
+    async def commit(self):
+        self.committed = True
+
+class FakeSession:
+    async def __aenter__(self):
+        return None
+
+    async def __aexit__(self, *args):
+        return False
+
+async def test_increment_updates_rollups():
+    db = FakeDB({1: 10, 2: 10, 3: None})
+    service = AnalyticsService(db)
+    upserts = {}
+
+    async def upsert(model, rows):
+        upserts[model] = rows
+
+    service._upsert_increments = upsert
+    day = date(2026, 10, 1)
+    await service.increment_bot_analytics({
+        (1, day): {"views": 2, "purchases": 1, "revenue": 10.0},
+        (2, day): {"views": 3},
+        (3, day): {"views": 1}
+    })
+
+    assert db.committed
+    assert len(upserts[BotAnalytics]) == 3
+    assert upserts[AnalyticsDailyTotals] == [
+        {"day": day, "views": 6, "purchases": 1, "revenue": 10.0}
+    ]
+    # Бот без категории учитывается только в дневных итогах
+    assert upserts[CategoryAnalyticsDaily] == [
+        {"category_id": 10, "day": day, "views": 5, "purchases": 1, "revenue": 10.0}
+    ]
+
+async def test_summary_is_cached(monkeypatch, redis):
+    calls = []
+    summary = AnalyticsSummary(
+        total_views=5,
+        total_purchases=1,
+        total_revenue=10.0,
+        avg_rating=None,
+        total_reviews=0,
+        top_categories={"Tools": 5},
+        top_bots={"Bot": 5}
+    )
+
+    async def compute(self, days):
+        calls.append(days)
+        return summary
+
+    monkeypatch.setattr(analytics_service, "ReadSessionLocal", FakeSession)
+    monkeypatch.setattr(AnalyticsService, "_compute_analytics_summary", compute)
+
+    service = AnalyticsService(None)
+    assert await service.get_analytics_summary(7) == summary
+    assert await service.get_analytics_summary(7) == summary
+    assert calls == [7]
+
+class FakeBulkDB:
+    """Сессия, записывающая порядок вставок и commit"""
+
+    def __init__(self, log):
+        self.log = log
+
+    async def execute(self, statement, rows):
+        self.log.append(("insert", len(rows)))
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+class FakeVisitorCounter:
+    async def add_events(self, rows):
+        pass
+
+async def test_bulk_commits_each_chunk(monkeypatch):
+    monkeypatch.setattr(analytics_service, "get_unique_visitor_counter", FakeVisitorCounter)
+    log = []
+
+    async def items():
+        for i in range(5):
+            log.append("read")
+            yield {"event_type": "page_view", "user_id": i}
+
+    result = await AnalyticsService(FakeBulkDB(log)).track_events_bulk(items(), chunk_size=2)
+
+    assert result.accepted == 5
+    # Пакет записывается и фиксируется до чтения следующих событий
+    assert log == [
+        "read", "read", ("insert", 2), "commit",
+        "read", "read", ("insert", 2), "commit",
+        "read", ("insert", 1), "commit"
+    ]
+
+async def test_bulk_stream_error_reports_written(monkeypatch):
+    monkeypatch.setattr(analytics_service, "get_unique_visitor_counter", FakeVisitorCounter)
+
+    async def items():
+        yield {"event_type": "page_view"}
+        yield {"event_type": "page_view"}
+        raise JSONStreamError("Invalid JSON in item 2")
+
+    with pytest.raises(JSONStreamError, match=r"\(2 events already written\)"):
+        await AnalyticsService(FakeBulkDB([])).track_events_bulk(items(), chunk_size=2)
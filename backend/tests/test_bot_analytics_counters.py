@@ -0,0 +1,91 @@
+import pytest
+from datetime import datetime
+from ..services import analytics_service, bot_analytics_counters
+from ..services.bot_analytics_counters import BotAnalyticsCounters, COUNTERS_KEY
+
+class FakeSession:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+@pytest.fixture
+def written(monkeypatch):
+    # Вместо записи в базу запоминаем приращения
+    written = []
+
+    class FakeAnalyticsService:
+        def __init__(self, db):
+            pass
+
+        async def increment_bot_analytics(self, counters):
+            written.append(counters)
+
+    monkeypatch.setattr(bot_analytics_counters, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(bot_analytics_counters, "AnalyticsService", FakeAnalyticsService)
+    return written
+
+@pytest.fixture
+def counters(redis):
+    return BotAnalyticsCounters(flush_interval=60)
+
+async def test_flush_aggregates_counters(counters, written):
+    await counters.record(1, "view")
+    await counters.record(1, "view")
+    await counters.record(1, "purchase", 10.5)
+    await counters.record(2, "view")
+    
+    assert await counters.flush() == 2
+    
+    today = datetime.utcnow().date()
+    assert written == [{
+        (1, today): {"views": 2.0, "purchases": 1.0, "revenue": 10.5},
+        (2, today): {"views": 1.0}
+    }]
+    # Приращения забраны из Redis
+    assert await counters.flush() == 0
+
+async def test_flush_failure_restores_counters(counters, written, monkeypatch):
+    class FailingAnalyticsService:
+        def __init__(self, db):
+            pass
+
+        async def increment_bot_analytics(self, counters):
+            raise RuntimeError("database is unavailable")
+
+    await counters.record(1, "view")
+    await counters.record(1, "purchase", 5.0)
+    monkeypatch.setattr(bot_analytics_counters, "AnalyticsService", FailingAnalyticsService)
+    
+    with pytest.raises(RuntimeError):
+        await counters.flush()
+    
+    prefix = f"{datetime.utcnow().date().isoformat()}:1"
+    assert int(await counters.cache.redis.hget(COUNTERS_KEY, f"{prefix}:views")) == 1
+    assert float(await counters.cache.redis.hget(COUNTERS_KEY, f"{prefix}:revenue")) == 5.0
+
+async def test_background_event_uses_counters(counters, monkeypatch):
+    # Просмотры и покупки из запросов попадают в счетчики Redis
+    monkeypatch.setattr(analytics_service.settings, "BOT_ANALYTICS_REDIS_COUNTERS", True)
+    monkeypatch.setattr(bot_analytics_counters, "_bot_analytics_counters", counters)
+    monkeypatch.setattr(analytics_service, "AsyncSessionLocal", FakeSession)
+    
+    await analytics_service.record_bot_event_background(1, "view")
+    await analytics_service.record_bot_event_background(1, "purchase", 7.5, user_id=3)
+    
+    prefix = f"{datetime.utcnow().date().isoformat()}:1"
+    assert await counters.cache.redis.hgetall(COUNTERS_KEY) == {
+        f"{prefix}:views".encode(): b"1",
+        f"{prefix}:purchases".encode(): b"1",
+        f"{prefix}:revenue".encode(): b"7.5"
+    }
+
+async def test_background_event_errors_are_logged(monkeypatch):
+    # Ошибка учета не доходит до запроса
+    class FailingSession(FakeSession):
+        async def __aenter__(self):
+            raise RuntimeError("database is unavailable")
+    
+    monkeypatch.setattr(analytics_service, "AsyncSessionLocal", FailingSession)
+    await analytics_service.record_bot_event_background(1, "view")
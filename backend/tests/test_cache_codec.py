@@ -0,0 +1,86 @@
+import pytest
+from datetime import datetime
+from ..services.cache_codec import CacheCodec, CacheCodecError, MAGIC, TAG_PYDANTIC, default_codec
+from ..services.cache_service import CacheEntry
+from .. import models, schemas
+
+@pytest.fixture
+def codec():
+    return default_codec
+
+@pytest.fixture
+def test_bot():
+    return models.Bot(
+        id=1,
+        name="Test Bot",
+        description="Test Description",
+        price=10.0,
+        category_id=1,
+        is_active=True,
+        created_at=datetime.utcnow()
+    )
+
+def test_plain_data_roundtrip(codec):
+    # Тестируем простые данные
+    value = {"name": "bot", "tags": ["a", "b"], "score": 0.5, "active": True}
+    
+    encoded = codec.encode(value)
+    
+    assert encoded.startswith(MAGIC)
+    assert codec.decode(encoded) == value
+
+def test_integer_stored_as_counter(codec):
+    # Тестируем, что целые числа совместимы с INCR/DECR
+    assert codec.encode(42) == b"42"
+    assert codec.decode(b"43") == 43
+
+def test_orm_list_roundtrip(codec, test_bot):
+    # Тестируем, что ORM-объекты кодируются через схему
+    decoded = codec.decode(codec.encode([test_bot]))
+    
+    assert len(decoded) == 1
+    assert isinstance(decoded[0], schemas.Bot)
+    assert decoded[0].name == test_bot.name
+
+def test_cache_entry_roundtrip(codec):
+    # Тестируем конверт get_or_compute
+    entry = CacheEntry(value=[1, 2, 3], soft_expires_at=1000.5, delta=0.25)
+    decoded = codec.decode(codec.encode(entry))
+    
+    assert decoded == entry
+
+def test_compression():
+    # Тестируем сжатие крупных значений
+    zstandard = pytest.importorskip("zstandard")
+    codec = CacheCodec(compression_threshold=100)
+    value = {"data": "x" * 10000}
+    
+    encoded = codec.encode(value)
+    
+    assert len(encoded) < 1000
+    assert codec.decode(encoded) == value
+
+def test_schema_registered_in_other_process():
+    # Значение записал другой воркер: схема находится по имени, а не по регистрации
+    from ..schemas.analytics import AnalyticsSummary
+    summary = AnalyticsSummary(total_views=5, top_bots={"Bot": 5})
+    encoded = CacheCodec().encode(summary)
+
+    assert CacheCodec().decode(encoded) == summary
+
+def test_schema_outside_schemas_rejected():
+    codec = CacheCodec()
+    payload = codec._dumps_plain({"schema": "os.PathLike", "many": False, "items": [{}]})
+
+    with pytest.raises(CacheCodecError, match="Unknown cache schema"):
+        codec._decode_payload(TAG_PYDANTIC, payload)
+
+def test_legacy_pickle_rejected(codec):
+    # Тестируем, что старые pickle-значения не распаковываются
+    with pytest.raises(CacheCodecError):
+        codec.decode(b"\x80\x04\x95")
+
+def test_legacy_text(codec):
+    # Тестируем значения старого формата без заголовка
+    assert codec.decode(b'{"a": 1}') == {"a": 1}
+    assert codec.decode(b"plain text") == "plain text"
\ No newline at end of file
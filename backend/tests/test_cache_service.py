@@ -1,119 +1,225 @@
 import pytest
+import asyncio
+import time
 from datetime import datetime
+from ..services import cache_service as cache_module
 from ..services.cache_service import CacheService
-from ..models.bot import Bot
-from ..models.category import Category
+from ..services.local_cache import LocalCache
+from .. import models, schemas
 
 @pytest.fixture
-def cache_service():
+def cache_service(redis):
     return CacheService()
 
 @pytest.fixture
 def test_bot():
-    return Bot(
+    return models.Bot(
         id=1,
         name="Test Bot",
         description="Test Description",
         price=10.0,
-        category_id=1
+        category_id=1,
+        is_active=True,
+        created_at=datetime.utcnow()
     )
 
 @pytest.fixture
 def test_category():
-    return Category(
+    return models.Category(
         id=1,
-        name="Test Category"
+        name="Test Category",
+        discount=0.0,
+        is_active=True,
+        created_at=datetime.utcnow()
     )
 
-def test_set_get_string(cache_service):
+async def test_set_get_string(cache_service):
     # Тестируем сохранение и получение строки
     key = "test_key"
     value = "test_value"
     
-    cache_service.set(key, value)
-    cached_value = cache_service.get(key)
+    await cache_service.set(key, value)
+    cached_value = await cache_service.get(key)
     
     assert cached_value == value
 
-def test_set_get_json(cache_service):
+async def test_set_get_json(cache_service):
     # Тестируем сохранение и получение JSON
     key = "test_json_key"
     value = {"test": "value"}
     
-    cache_service.set(key, value, data_type="json")
-    cached_value = cache_service.get(key, data_type="json")
+    await cache_service.set(key, value)
+    cached_value = await cache_service.get(key)
     
     assert cached_value == value
 
-def test_set_get_pickle(cache_service, test_bot):
-    # Тестируем сохранение и получение объекта через pickle
-    key = "test_pickle_key"
+async def test_set_get_orm_object(cache_service, test_bot):
+    # Тестируем, что ORM-объект сохраняется через Pydantic-схему, а не pickle
+    key = "test_orm_key"
     
-    cache_service.set(key, test_bot, data_type="pickle")
-    cached_value = cache_service.get(key, data_type="pickle")
+    await cache_service.set(key, test_bot)
+    cached_value = await cache_service.get(key)
     
-    assert isinstance(cached_value, Bot)
+    assert isinstance(cached_value, schemas.Bot)
     assert cached_value.name == test_bot.name
 
-def test_delete(cache_service):
+async def test_delete(cache_service):
     # Тестируем удаление из кэша
     key = "test_delete_key"
     value = "test_value"
     
-    cache_service.set(key, value)
-    cache_service.delete(key)
+    await cache_service.set(key, value)
+    await cache_service.delete(key)
     
-    assert cache_service.get(key) is None
+    assert await cache_service.get(key) is None
 
-def test_exists(cache_service):
+async def test_exists(cache_service):
     # Тестируем проверку существования ключа
     key = "test_exists_key"
     value = "test_value"
     
-    assert not cache_service.exists(key)
+    assert not await cache_service.exists(key)
     
-    cache_service.set(key, value)
-    assert cache_service.exists(key)
+    await cache_service.set(key, value)
+    assert await cache_service.exists(key)
 
-def test_increment_decrement(cache_service):
+async def test_increment_decrement(cache_service):
     # Тестируем инкремент и декремент
     key = "test_counter_key"
     
-    cache_service.set(key, 0)
-    cache_service.increment(key)
-    assert cache_service.get(key) == 1
+    await cache_service.set(key, 0)
+    await cache_service.increment(key)
+    assert await cache_service.get(key) == 1
     
-    cache_service.decrement(key)
-    assert cache_service.get(key) == 0
+    await cache_service.decrement(key)
+    assert await cache_service.get(key) == 0
 
-def test_get_set_popular_bots(cache_service, test_bot):
+async def test_get_set_popular_bots(cache_service, test_bot):
     # Тестируем кэширование популярных ботов
     bots = [test_bot]
     
-    cache_service.set_popular_bots(bots)
-    cached_bots = cache_service.get_popular_bots()
+    await cache_service.set_popular_bots(bots)
+    cached_bots = await cache_service.get_popular_bots()
     
     assert len(cached_bots) == 1
     assert cached_bots[0].name == test_bot.name
 
-def test_get_set_user_preferences(cache_service, test_category):
+async def test_get_set_user_preferences(cache_service, test_category):
     # Тестируем кэширование предпочтений пользователя
     user_id = 1
     preferences = [test_category]
     
-    cache_service.set_user_preferences(user_id, preferences)
-    cached_preferences = cache_service.get_user_preferences(user_id)
+    await cache_service.set_user_preferences(user_id, preferences)
+    cached_preferences = await cache_service.get_user_preferences(user_id)
     
     assert len(cached_preferences) == 1
     assert cached_preferences[0].name == test_category.name
 
-def test_get_set_recommendations(cache_service, test_bot):
+async def test_get_set_recommendations(cache_service, test_bot):
     # Тестируем кэширование рекомендаций
     user_id = 1
     recommendations = [test_bot]
     
-    cache_service.set_recommendations(user_id, recommendations)
-    cached_recommendations = cache_service.get_recommendations(user_id)
+    await cache_service.set_recommendations(user_id, recommendations)
+    cached_recommendations = await cache_service.get_recommendations(user_id)
     
     assert len(cached_recommendations) == 1
-    assert cached_recommendations[0].name == test_bot.name 
\ No newline at end of file
+    assert cached_recommendations[0].name == test_bot.name 
+
+def test_shared_connection_pool(redis):
+    # Тестируем, что все экземпляры используют общий пул соединений
+    first = CacheService()
+    second = CacheService()
+    
+    assert first.redis.connection_pool is second.redis.connection_pool
+
+async def test_get_or_compute_single_flight(cache_service):
+    # Тестируем, что одновременные промахи приводят к одному вычислению
+    key = "test_stampede_key"
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"value": 1}
+
+    await cache_service.delete(key)
+    results = await asyncio.gather(*[
+        cache_service.get_or_compute(key, compute, ttl=60)
+        for _ in range(20)
+    ])
+    
+    assert calls == 1
+    assert all(result == {"value": 1} for result in results)
+    assert await cache_service.get_value(key) == {"value": 1}
+
+async def test_get_set_many(cache_service):
+    # Тестируем пакетные операции
+    values = {"test_many_1": {"a": 1}, "test_many_2": [1, 2], "test_many_3": "value"}
+    
+    await cache_service.set_many(values, expire=60)
+    cached_values = await cache_service.get_many(list(values) + ["test_many_missing"])
+    
+    assert cached_values == values
+
+async def test_delete_many_and_pattern(cache_service):
+    # Тестируем пакетное удаление и удаление по шаблону
+    await cache_service.set_many({"test_pattern:1": 1, "test_pattern:2": 2, "test_other": 3})
+    
+    assert await cache_service.delete_pattern("test_pattern:*") == 2
+    await cache_service.delete_many(["test_other"])
+    
+    assert await cache_service.get_many(["test_pattern:1", "test_pattern:2", "test_other"]) == {}
+
+async def test_invalidate_tags(cache_service):
+    # Тестируем удаление ключей по тегу
+    await cache_service.set("test_tagged_1", "value", expire=60, tags=["test_tag"])
+    await cache_service.set("test_tagged_2", "value", expire=60, tags=["test_tag"])
+    await cache_service.set("test_untagged", "value", expire=60)
+    
+    deleted = await cache_service.invalidate_tags("test_tag")
+    
+    assert sorted(deleted) == ["test_tagged_1", "test_tagged_2"]
+    assert await cache_service.get("test_tagged_1") is None
+    assert await cache_service.get("test_untagged") == "value"
+
+async def test_set_recommendations_many(cache_service, test_bot):
+    # Тестируем пакетную запись рекомендаций с тегами пользователей
+    await cache_service.set_recommendations_many({1: [test_bot], 2: []}, expire=60)
+    
+    cached = await cache_service.get_recommendations(1)
+    assert [bot.id for bot in cached] == [test_bot.id]
+    assert await cache_service.get_recommendations(2) == []
+    
+    await cache_service.invalidate_user(1)
+    assert await cache_service.get_recommendations(1) is None
+    assert await cache_service.get_recommendations(2) == []
+
+async def test_recommendations_keyed_by_limit(cache_service, test_bot):
+    # Список на 2 бота не отдается запросу на 5
+    await cache_service.set_recommendations_many({1: [test_bot]}, expire=60, limit=2)
+    
+    assert [bot.id for bot in await cache_service.get_recommendations(1, limit=2)] == [test_bot.id]
+    assert await cache_service.get_recommendations(1, limit=5) is None
+    
+    await cache_service.set_popular_bots([test_bot], limit=1)
+    assert await cache_service.get_popular_bots(limit=1) is not None
+    assert await cache_service.get_popular_bots(limit=10) is None
+
+async def test_local_ttl_capped_by_redis_ttl(redis, monkeypatch):
+    # Запись L1 живет не дольше ключа в Redis
+    monkeypatch.setattr(
+        cache_module, "_local_cache",
+        LocalCache(max_bytes=10000, max_items=100, default_ttl=300)
+    )
+    service = CacheService()
+    await service.set("test_short", "value", expire=1)
+    await service.set_many({"test_short_many": "value"}, expire=1)
+    
+    assert await service.get("test_short") == "value"
+    assert await service.get_many(["test_short_many"]) == {"test_short_many": "value"}
+    
+    deadline = time.monotonic() + 1
+    for key in ("test_short", "test_short_many"):
+        assert service.local_cache._items[key][2] <= deadline
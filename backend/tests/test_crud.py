@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import crud, models, schemas
+
+@pytest.fixture
+async def db():
+    # Асинхронная сессия поверх SQLite в памяти
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[
+                models.User.__table__,
+                models.Category.__table__,
+                models.Bot.__table__,
+                models.Purchase.__table__,
+                models.BugReport.__table__,
+                models.Changelog.__table__
+            ]
+        )
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+async def test_user_roundtrip(db):
+    # Создание, чтение, изменение и удаление пользователя через AsyncSession
+    user = await crud.create_user(db, schemas.UserCreate(telegram_id=100, username="alice"))
+    assert user.id is not None
+    assert (await crud.get_user(db, user.id)).username == "alice"
+    assert (await crud.get_user_by_telegram_id(db, 100)).id == user.id
+    
+    updated = await crud.update_user(db, user.id, schemas.UserUpdate(telegram_id=100, username="bob", balance=5.0))
+    assert updated.username == "bob"
+    assert updated.balance == 5.0
+    
+    users, next_cursor = await crud.get_users(db)
+    assert [u.id for u in users] == [user.id]
+    assert next_cursor is None
+    
+    assert await crud.delete_user(db, user.id)
+    assert await crud.get_user(db, user.id) is None
+    assert not await crud.delete_user(db, user.id)
+
+async def test_bot_purchase_roundtrip(db):
+    category = await crud.create_category(db, schemas.CategoryCreate(name="Tools"))
+    bot = await crud.create_bot(db, schemas.BotCreate(name="Helper", price=10.0, category_id=category.id))
+    user = await crud.create_user(db, schemas.UserCreate(telegram_id=200))
+    purchase = await crud.create_purchase(
+        db, schemas.PurchaseCreate(user_id=user.id, bot_id=bot.id, price=10.0, status="completed")
+    )
+    
+    assert (await crud.get_purchase(db, purchase.id)).bot_id == bot.id
+    assert (await crud.get_bot(db, bot.id)).name == "Helper"
+    
+    # При удалении бота покупка остается без ссылки на него
+    assert await crud.delete_bot(db, bot.id)
+    assert await crud.get_bot(db, bot.id) is None
+    await db.refresh(purchase)
+    assert purchase.bot_id is None
@@ -0,0 +1,126 @@
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from ..database import Base
+from .. import models
+from ..db_routing import ReplicaPool, RoutingSession, use_primary
+from ..services.search_index import SearchIndex
+
+async def make_engine(path, category_name):
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=[models.Category.__table__])
+        await connection.execute(models.Category.__table__.insert().values(id=1, name=category_name))
+    return engine
+
+async def make_databases(path):
+    # Основная база и две реплики с разными названиями категории 1
+    primary = await make_engine(path / "primary.db", "primary")
+    replicas = [
+        await make_engine(path / "replica1.db", "replica1"),
+        await make_engine(path / "replica2.db", "replica2")
+    ]
+    return primary, ReplicaPool(replicas, check_interval=60, max_lag=0)
+
+def sessionmaker(primary, pool, read_replica):
+    info = {"replica_pool": pool}
+    if read_replica:
+        info["read_replica"] = True
+    return async_sessionmaker(
+        bind=primary,
+        class_=AsyncSession,
+        sync_session_class=RoutingSession,
+        expire_on_commit=False,
+        info=info
+    )
+
+async def category_name(db):
+    return await db.scalar(select(models.Category.name).where(models.Category.id == 1))
+
+async def test_reads_go_to_replicas_round_robin(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    async with sessionmaker(primary, pool, read_replica=True)() as db:
+        names = {await category_name(db) for _ in range(4)}
+    assert names == {"replica1", "replica2"}
+
+async def test_default_session_uses_primary(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    async with sessionmaker(primary, pool, read_replica=False)() as db:
+        assert await category_name(db) == "primary"
+
+async def test_read_your_writes(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    Session = sessionmaker(primary, pool, read_replica=True)
+    async with Session() as db:
+        db.add(models.Category(id=2, name="new"))
+        await db.commit()
+        # После записи сессия читает из основной базы
+        assert await category_name(db) == "primary"
+        assert await db.get(models.Category, 2) is not None
+
+    # Закрепление действует только на свою сессию
+    async with Session() as db:
+        assert await category_name(db) != "primary"
+
+async def test_primary_for_locking_reads_and_text(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    async with sessionmaker(primary, pool, read_replica=True)() as db:
+        assert await db.scalar(text("SELECT name FROM categories WHERE id = 1")) == "primary"
+    async with sessionmaker(primary, pool, read_replica=True)() as db:
+        assert await db.scalar(
+            select(models.Category.name).where(models.Category.id == 1).with_for_update()
+        ) == "primary"
+
+async def test_use_primary(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    async with sessionmaker(primary, pool, read_replica=True)() as db:
+        use_primary(db)
+        assert await category_name(db) == "primary"
+
+async def test_failover(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    Session = sessionmaker(primary, pool, read_replica=True)
+
+    pool.mark_down(0, "test")
+    async with Session() as db:
+        assert {await category_name(db) for _ in range(3)} == {"replica2"}
+
+    # Без доступных реплик чтение идет в основную базу
+    pool.mark_down(1, "test")
+    async with Session() as db:
+        assert await category_name(db) == "primary"
+
+    # Проверка возвращает работающие реплики
+    await pool.check()
+    assert pool.choose() is not None
+
+async def test_check_marks_broken_replica(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    broken = create_async_engine(f"sqlite+aiosqlite:///{tmp_path}/missing/replica.db")
+    pool = ReplicaPool([broken, pool.engines[0]], check_interval=60, max_lag=0)
+
+    await pool.check()
+    assert not pool.is_available(0)
+    assert pool.is_available(1)
+    assert pool.choose() is pool.engines[1]
+
+    # После check_interval недоступная реплика пробуется снова
+    pool.check_interval = 0
+    assert pool.is_available(0)
+    await broken.dispose()
+
+async def test_empty_pool_uses_primary(tmp_path):
+    primary, _ = await make_databases(tmp_path)
+    async with sessionmaker(primary, ReplicaPool([]), read_replica=True)() as db:
+        assert await category_name(db) == "primary"
+
+async def test_index_refresh_reads_primary(tmp_path):
+    primary, pool = await make_databases(tmp_path)
+    # Бот есть только в основной базе; на репликах нет даже таблицы
+    async with primary.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=[models.Bot.__table__])
+        await connection.execute(models.Bot.__table__.insert().values(id=1, name="Погода", category_id=1, is_active=True))
+
+    index = SearchIndex()
+    async with sessionmaker(primary, pool, read_replica=True)() as db:
+        await index.ensure_fresh(db)
+    assert [bot_id for bot_id, _ in index.search("погода")] == [1]
@@ -0,0 +1,74 @@
+import pytest
+import json
+from ..json_stream import JSONStreamError, JSONStreamTooLarge, iter_json_array, iter_ndjson
+
+EVENTS = [
+    {"event_type": "page_view", "event_data": {"page": "/"}},
+    {"event_type": "bot_view", "event_data": {"bot_id": 1, "name": "Бот [1], {тест}"}},
+    {"event_type": "search", "event_data": {"query": "\"quoted\" \\ text"}}
+]
+
+async def chunked(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+async def collect(items):
+    return [item async for item in items]
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1024])
+async def test_json_array_any_chunking(size):
+    # Результат не зависит от того, как тело разбито на фрагменты
+    data = json.dumps(EVENTS, ensure_ascii=False, indent=2).encode("utf-8")
+    
+    assert await collect(iter_json_array(chunked(data, size), 1024)) == EVENTS
+
+@pytest.mark.parametrize("size", [1, 5, 1024])
+async def test_ndjson_any_chunking(size):
+    data = "\n".join(json.dumps(event, ensure_ascii=False) for event in EVENTS).encode("utf-8") + b"\n\n"
+    
+    assert await collect(iter_ndjson(chunked(data, size), 1024)) == EVENTS
+
+async def test_empty_array():
+    assert await collect(iter_json_array(chunked(b" [ ] ", 2), 1024)) == []
+
+@pytest.mark.parametrize("data", [
+    b'{"event_type": "page_view"}',
+    b'[{"event_type": "page_view"} {"event_type": "page_view"}]',
+    b'[{"event_type": "page_view"},',
+    b'[{"event_type": "page_view"}] []',
+    b'[1, 2]'
+])
+async def test_json_array_invalid(data):
+    with pytest.raises(JSONStreamError):
+        await collect(iter_json_array(chunked(data, 4), 1024))
+
+async def test_ndjson_invalid_line():
+    data = b'{"event_type": "page_view"}\n{broken\n'
+    
+    with pytest.raises(JSONStreamError, match="line 2"):
+        await collect(iter_ndjson(chunked(data, 4), 1024))
+
+@pytest.mark.parametrize("size", [64, 4096])
+async def test_item_size_limit(size):
+    # Элемент больше лимита отклоняется, пришел он по частям или одним фрагментом
+    data = b'[{"event_data": "' + b"x" * 500 + b'"}]'
+    line = b'{"event_data": "' + b"x" * 500 + b'"}\n'
+    
+    with pytest.raises(JSONStreamTooLarge):
+        await collect(iter_json_array(chunked(data, size), 100))
+    with pytest.raises(JSONStreamTooLarge):
+        await collect(iter_ndjson(chunked(line, size), 100))
+
+@pytest.mark.parametrize("size", [1, 4, 4096])
+async def test_malformed_item_is_not_too_large(size):
+    # Некорректный элемент - ошибка разбора, а не ожидание продолжения до лимита
+    data = b'[{"a": 1x}, {"event_data": "' + b"x" * 500 + b'"}]'
+    
+    with pytest.raises(JSONStreamError, match="Invalid JSON in item 0"):
+        await collect(iter_json_array(chunked(data, size), 100))
+
+async def test_escaped_quotes_and_brackets_in_strings():
+    events = [{"text": 'a \\"} ] [ {'}, {"text": "\\"}]
+    data = json.dumps(events).encode("utf-8")
+    
+    assert await collect(iter_json_array(chunked(data, 1), 1024)) == events
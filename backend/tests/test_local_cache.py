@@ -0,0 +1,88 @@
+import pytest
+import time
+from ..services.local_cache import LocalCache
+
+@pytest.fixture
+def local_cache():
+    return LocalCache(max_bytes=100, max_items=3, default_ttl=60)
+
+def test_set_get(local_cache):
+    # Тестируем сохранение и получение значения
+    local_cache.set("key", {"value": 1}, size=10)
+    found, value = local_cache.get("key")
+    
+    assert found
+    assert value == {"value": 1}
+    assert local_cache.stats()["hits"] == 1
+
+def test_miss(local_cache):
+    # Тестируем промах
+    found, value = local_cache.get("missing")
+    
+    assert not found
+    assert value is None
+    assert local_cache.stats()["misses"] == 1
+
+def test_ttl_expiration(local_cache):
+    # Тестируем истечение времени жизни записи
+    local_cache.set("key", "value", size=10, ttl=0.01)
+    time.sleep(0.02)
+    
+    found, _ = local_cache.get("key")
+    assert not found
+
+def test_lru_eviction_by_items(local_cache):
+    # Тестируем вытеснение наименее используемой записи по количеству
+    local_cache.set("a", 1, size=1)
+    local_cache.set("b", 2, size=1)
+    local_cache.set("c", 3, size=1)
+    local_cache.get("a")
+    local_cache.set("d", 4, size=1)
+    
+    assert local_cache.get("a")[0]
+    assert not local_cache.get("b")[0]
+    assert local_cache.stats()["evictions"] == 1
+
+def test_eviction_by_bytes(local_cache):
+    # Тестируем вытеснение по суммарному размеру
+    local_cache.set("a", 1, size=60)
+    local_cache.set("b", 2, size=60)
+    
+    assert not local_cache.get("a")[0]
+    assert local_cache.get("b")[0]
+    assert local_cache.stats()["size_bytes"] == 60
+
+def test_oversized_value_is_not_stored(local_cache):
+    # Тестируем, что слишком большое значение не кэшируется
+    local_cache.set("big", "value", size=1000)
+    
+    assert not local_cache.get("big")[0]
+
+def test_delete(local_cache):
+    # Тестируем удаление
+    local_cache.set("key", "value", size=10)
+    local_cache.delete("key")
+    
+    assert not local_cache.get("key")[0]
+    assert local_cache.stats()["size_bytes"] == 0
+def test_stale_version_is_not_stored(local_cache):
+    # Значение, прочитанное до инвалидации ключа, не попадает в кэш
+    version = local_cache.version("key")
+    local_cache.delete("key")
+    local_cache.set("key", "stale", size=10, version=version)
+    assert not local_cache.get("key")[0]
+
+    version = local_cache.version("key")
+    local_cache.clear()
+    local_cache.set("key", "stale", size=10, version=version)
+    assert not local_cache.get("key")[0]
+
+    version = local_cache.version("key")
+    local_cache.set("key", "fresh", size=10, version=version)
+    assert local_cache.get("key") == (True, "fresh")
+
+def test_ttl_capped_by_default(local_cache):
+    # Срок жизни записи не превышает default_ttl
+    local_cache.set("key", "value", size=10, ttl=3600)
+    expires_at = local_cache._items["key"][2]
+    assert expires_at <= time.monotonic() + 60
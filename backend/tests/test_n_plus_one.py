@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import create_engine, insert, select, text, update
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import crud, models
+from ..config import settings
+from ..n_plus_one import (
+    NPlusOneError,
+    install_n_plus_one_detector,
+    track_lazy_loads,
+    uninstall_n_plus_one_detector
+)
+
+TABLES = [models.Category.__table__, models.Bot.__table__, models.Purchase.__table__, models.Changelog.__table__]
+
+def seed(session):
+    session.add_all([models.Category(id=i, name=f"Category {i}") for i in range(1, 4)])
+    session.add_all([models.Bot(id=i, name=f"Bot {i}", price=1.0, category_id=i) for i in range(1, 4)])
+    session.add(models.Purchase(id=1, bot_id=1, price=1.0))
+    session.add(models.Changelog(id=1, bot_id=1, version="1.0"))
+    session.commit()
+
+@pytest.fixture
+def detector():
+    # Слушатель общий для всех сессий процесса: после теста снимаем его
+    install_n_plus_one_detector()
+    yield
+    uninstall_n_plus_one_detector()
+
+@pytest.fixture
+def session(detector):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=TABLES)
+    with Session(engine) as session:
+        seed(session)
+        session.expunge_all()
+        yield session
+
+def test_counts_lazy_loads(session):
+    with track_lazy_loads() as counts:
+        bots = session.scalars(select(models.Bot)).all()
+        assert [bot.category.name for bot in bots] == ["Category 1", "Category 2", "Category 3"]
+    assert counts == {"Bot.category": 3}
+
+def test_eager_loading_not_counted(session):
+    with track_lazy_loads() as counts:
+        bots = session.scalars(select(models.Bot).options(selectinload(models.Bot.category))).all()
+        assert len({bot.category.id for bot in bots}) == 3
+    assert not counts
+
+def test_not_counted_outside_request(session, monkeypatch):
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 1)
+    monkeypatch.setattr(settings, "N_PLUS_ONE_RAISE", True)
+    for bot in session.scalars(select(models.Bot)).all():
+        bot.category
+
+def test_raises_above_threshold(session, monkeypatch):
+    monkeypatch.setattr(settings, "N_PLUS_ONE_THRESHOLD", 2)
+    monkeypatch.setattr(settings, "N_PLUS_ONE_RAISE", True)
+    bots = session.scalars(select(models.Bot)).all()
+    with track_lazy_loads():
+        bots[0].category
+        bots[1].category
+        with pytest.raises(NPlusOneError):
+            bots[2].category
+
+def test_writes_and_text_not_affected(session):
+    # Не-SELECT запросы проходят через тот же слушатель do_orm_execute
+    with track_lazy_loads() as counts:
+        session.execute(insert(models.Category).values(id=10, name="New"))
+        session.execute(update(models.Category).where(models.Category.id == 10).values(name="Renamed"))
+        assert session.execute(text("SELECT name FROM categories WHERE id = 10")).scalar() == "Renamed"
+        session.add(models.Category(id=11, name="Added"))
+        session.commit()
+    assert not counts
+
+async def test_delete_bot_without_lazy_loads(detector):
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all, tables=TABLES)
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    await session.run_sync(seed)
+    session.expunge_all()
+
+    # Связи удаляемых объектов загружаются заранее, а не по одной при flush
+    with track_lazy_loads() as counts:
+        assert await crud.delete_bot(session, 1)
+        assert await crud.delete_category(session, 2)
+    assert not counts
+
+    purchase = await session.get(models.Purchase, 1)
+    assert purchase.bot_id is None
+    await session.close()
+    await engine.dispose()
@@ -0,0 +1,60 @@
+import pytest
+from ..services.name_suggest import NameSuggestIndex, max_distance
+
+@pytest.fixture
+def index():
+    index = NameSuggestIndex(refresh_interval=30, full_reload_interval=600)
+    index.upsert_bot(1, "Погода сегодня", 1)
+    index.upsert_bot(2, "Переводчик", 2)
+    index.upsert_bot(3, "Прогноз погоды", 1)
+    index.upsert_bot(4, "Weather Bot", 1)
+    index.upsert_bot(5, "Старая погода", 1, is_active=False)
+    index.upsert_category(1, "Погода и климат")
+    index.upsert_category(2, "Переводы")
+    return index
+
+def names(suggestions):
+    return [(item["type"], item["id"]) for item in suggestions]
+
+def test_max_distance():
+    assert [max_distance(word) for word in ("бот", "погод", "переводчик")] == [0, 1, 2]
+
+def test_prefix(index):
+    # Название, начинающееся с запроса, выше; при равенстве - более короткое
+    assert names(index.suggest("пого")) == [("bot", 1), ("category", 1), ("bot", 3)]
+
+def test_typo(index):
+    # Одна опечатка в слове из 5-7 букв
+    assert names(index.suggest("пагода")) == [("bot", 1), ("category", 1)]
+    assert names(index.suggest("weathr")) == [("bot", 4)]
+    # В коротких словах опечатки не допускаются
+    assert index.suggest("пвг") == []
+
+def test_exact_before_typo(index):
+    # "перев" - точный префикс обоих названий, а не опечатка
+    assert names(index.suggest("перев")) == [("category", 2), ("bot", 2)]
+
+def test_all_words_must_match(index):
+    assert names(index.suggest("прогноз пог")) == [("bot", 3)]
+    assert index.suggest("прогноз перев") == []
+
+def test_result_fields(index):
+    assert index.suggest("weather b", limit=1) == [
+        {"type": "bot", "id": 4, "name": "Weather Bot", "category_id": 1}
+    ]
+
+def test_update_and_remove(index):
+    index.upsert_bot(2, "Погодный переводчик", 2)
+    index.remove_category(1)
+    index.remove_bot(1)
+
+    assert names(index.suggest("пого")) == [("bot", 2), ("bot", 3)]
+    assert index.suggest("переводч", limit=1) == [
+        {"type": "bot", "id": 2, "name": "Погодный переводчик", "category_id": 2}
+    ]
+
+    # Слова удаленных названий исчезают из дерева
+    index.remove_bot(2)
+    index.remove_bot(3)
+    assert index.suggest("пого") == []
+    assert len(index) == 2
@@ -0,0 +1,71 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import models
+from ..models.notification import Notification, NotificationChannel, NotificationType
+from ..schemas.notification import NotificationCreate, NotificationResponse
+from ..services.notification_service import NotificationService
+
+class FakeChannel:
+    """Канал доставки, запоминающий уведомления вместо отправки"""
+    def __init__(self):
+        self.sent = []
+
+    async def send_notification(self, notification):
+        self.sent.append((notification.id, notification.user.telegram_id))
+        return True
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[models.User.__table__, Notification.__table__]
+        )
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+@pytest.fixture
+def service(db):
+    service = NotificationService(db)
+    service.email_service = FakeChannel()
+    service.telegram_service = FakeChannel()
+    return service
+
+async def test_notification_roundtrip(db, service):
+    user = models.User(telegram_id=100)
+    db.add(user)
+    await db.commit()
+
+    notification = await service.create_notification(NotificationCreate(
+        user_id=user.id,
+        type="review",
+        channel="telegram",
+        title="Новый отзыв",
+        message="5 звезд",
+        metadata='{"bot_id": 1}'
+    ))
+    system = await service.create_notification(NotificationCreate(
+        user_id=user.id, type="system", channel="email", title="Обновление", message="..."
+    ))
+
+    # Каждое уведомление уходит только в свой канал
+    assert service.telegram_service.sent == [(notification.id, 100)]
+    assert len(service.email_service.sent) == 1
+
+    response = NotificationResponse.model_validate(notification)
+    assert response.type == NotificationType.REVIEW
+    assert response.channel == NotificationChannel.TELEGRAM
+    assert response.metadata == '{"bot_id": 1}'
+
+    assert await service.get_unread_count(user.id) == 2
+    read = await service.mark_as_read(notification.id, user.id)
+    assert read.is_read == 1 and read.read_at is not None
+    assert await service.mark_as_read(notification.id, user.id + 1) is None
+    assert [n.id for n in await service.get_user_notifications(user.id, unread_only=True)] == [system.id]
+
+    await service.mark_all_as_read(user.id)
+    assert await service.get_unread_count(user.id) == 0
+    assert len(await service.get_user_notifications(user.id)) == 2
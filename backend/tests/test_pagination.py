@@ -0,0 +1,94 @@
+import pytest
+from sqlalchemy import inspect, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import models
+from ..crud import BOT_SORTS, get_bots
+from ..pagination import CursorError, decode_cursor, encode_cursor, paginate
+
+PRICES = [5.0, 1.0, None, 3.0, 1.0, None, 2.0, 5.0]
+
+async def make_session():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[models.Category.__table__, models.Bot.__table__]
+        )
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    session.add(models.Category(id=1, name="Tools"))
+    session.add_all([
+        models.Bot(id=i, name=f"Bot {i}", price=price, category_id=1)
+        for i, price in enumerate(PRICES, start=1)
+    ])
+    await session.commit()
+    return session
+
+async def read_all(session, sort, limit):
+    # Все страницы подряд по курсорам
+    ids, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = await paginate(session, select(models.Bot), models.Bot, BOT_SORTS, sort, cursor, limit)
+        ids.extend(row.id for row in rows)
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+@pytest.mark.parametrize("sort, expected", [
+    ("id", [1, 2, 3, 4, 5, 6, 7, 8]),
+    ("-id", [8, 7, 6, 5, 4, 3, 2, 1]),
+    # Равные значения упорядочены по id, NULL - первыми при возрастании
+    ("price", [3, 6, 2, 5, 7, 4, 1, 8]),
+    ("-price", [8, 1, 4, 7, 5, 2, 6, 3])
+])
+async def test_pages_cover_all_rows(sort, expected):
+    session = await make_session()
+    try:
+        for limit in (1, 3, 8, 20):
+            ids, pages = await read_all(session, sort, limit)
+            assert ids == expected
+            assert pages == max(1, -(-len(expected) // limit))
+    finally:
+        await session.close()
+
+def test_cursor_roundtrip():
+    cursor = encode_cursor("-price", 2.5, 7)
+    assert decode_cursor(cursor, "-price") == (2.5, 7)
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, "price")
+    with pytest.raises(CursorError):
+        decode_cursor("not a cursor", "price")
+
+async def test_unsupported_sort():
+    with pytest.raises(CursorError):
+        await paginate(None, select(models.Bot), models.Bot, BOT_SORTS, "description")
+
+async def test_bot_filters():
+    session = await make_session()
+    try:
+        bots, cursor = await get_bots(session, min_price=2.0, max_price=5.0, sort="-price")
+        assert [bot.id for bot in bots] == [8, 1, 4, 7]
+        assert cursor is None
+
+        bots, _ = await get_bots(session, category_id=2)
+        assert bots == []
+    finally:
+        await session.close()
+
+async def test_bot_sparse_fields():
+    session = await make_session()
+    try:
+        bots, cursor = await get_bots(session, limit=3, sort="price", fields=["name"])
+        assert [bot.name for bot in bots] == ["Bot 3", "Bot 6", "Bot 2"]
+        # Незапрошенные столбцы не читаются, столбец сортировки - для курсора
+        state = inspect(bots[0])
+        assert "description" in state.unloaded
+        assert "price" not in state.unloaded
+
+        bots, _ = await get_bots(session, cursor=cursor, limit=3, sort="price", fields=["name"])
+        assert [bot.id for bot in bots] == [5, 7, 4]
+
+        with pytest.raises(ValueError):
+            await get_bots(session, fields=["password"])
+    finally:
+        await session.close()
@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta
+from ..services import analytics_service
+from ..services.analytics_service import AnalyticsService
+from ..services.popular_bots import PopularBotsTracker, window_bounds
+
+async def test_popular_bots(redis):
+    tracker = PopularBotsTracker(retention_days=30, window_days=30, half_life_days=1, window_ttl=60)
+
+    today = datetime.utcnow().date()
+    old_day = today - timedelta(days=10)
+    await tracker.record([
+        (1, 10, today, {"views": 5, "purchases": 1, "revenue": 9.5}),
+        (2, 10, today, {"views": 8}),
+        (3, 20, today, {"views": 2}),
+        # Давние просмотры: попадают в сумму за окно, но почти не влияют на популярность
+        (3, 20, old_day, {"views": 100})
+    ])
+
+    assert await tracker.top("views", 2, 1) == [(2, 8.0), (1, 5.0)]
+    assert await tracker.top("views", 1, 30) == [(3, 102.0)]
+    assert await tracker.scores("revenue", [1, 2], 1) == {1: 9.5, 2: 0.0}
+
+    # Окно за days дней включает сегодня и те же дни, что window_bounds
+    start_day, end_day = window_bounds(11)
+    assert (start_day, end_day) == (old_day, today)
+    assert await tracker.scores("views", [3], 11) == {3: 102.0}
+    assert await tracker.scores("views", [3], 10) == {3: 2.0}
+
+    # Покупка весит больше просмотров, давние события затухают
+    assert await tracker.trending(3) == [1, 2, 3]
+    assert await tracker.trending(3, category_id=20) == [3]
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+class FakeDB:
+    """Сессия с готовыми строками bot_analytics"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        return FakeResult(self.rows)
+
+async def test_popular_bots_fall_back_to_db(redis, monkeypatch):
+    # Пустые рейтинги Redis (после очистки) не дают пустой ответ
+    tracker = PopularBotsTracker(retention_days=30, window_days=30, half_life_days=1, window_ttl=60)
+    monkeypatch.setattr(analytics_service, "get_popular_bots_tracker", lambda: tracker)
+    db = FakeDB([(1, 5, 1, 9.5)])
+
+    assert await AnalyticsService(db).get_popular_bots(limit=5, days=7) == [
+        {"bot_id": 1, "total_views": 5, "total_purchases": 1, "total_revenue": 9.5}
+    ]
+    assert db.queries == 1
+
+    # Когда рейтинги есть, база не читается
+    await tracker.record([(2, 10, datetime.utcnow().date(), {"views": 3})])
+    assert [row["bot_id"] for row in await AnalyticsService(db).get_popular_bots(limit=5, days=7)] == [2]
+    assert db.queries == 1
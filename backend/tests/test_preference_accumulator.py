@@ -0,0 +1,73 @@
+import pytest
+import asyncio
+import numpy as np
+from ..services.preference_accumulator import PreferenceAccumulator, score_increment
+
+def apply_one_by_one(score, count, weights):
+    # Поштучное обновление, как до накопления взаимодействий
+    for weight in weights:
+        count += 1
+        time_factor = 1.0 / (1.0 + np.log(1 + count))
+        score = min(1.0, score + weight * time_factor)
+    return score, count
+
+@pytest.mark.parametrize("score, count, weights", [
+    (0.0, 0, [0.1]),
+    (0.0, 0, [0.1, 0.2, 0.15, 0.1]),
+    (0.4, 7, [0.1] * 20),
+    (0.9, 3, [0.2, 0.2, 0.2])
+])
+def test_score_increment_matches_formula(score, count, weights):
+    expected_score, expected_count = apply_one_by_one(score, count, weights)
+    
+    assert min(1.0, score + score_increment(count, weights)) == pytest.approx(expected_score)
+    assert count + len(weights) == expected_count
+
+def test_add_coalesces_by_key():
+    # Взаимодействия группируются по паре пользователь/категория
+    accumulator = PreferenceAccumulator(flush_interval=60, max_pending=100)
+    accumulator.add(1, 1, 0.1)
+    accumulator.add(1, 1, 0.2)
+    accumulator.add(1, 2, 0.1)
+    accumulator.add(2, 1, 0.3)
+    
+    assert len(accumulator) == 3
+    assert accumulator._pending[(1, 1)] == [0.1, 0.2]
+
+def test_add_requests_flush_when_full():
+    accumulator = PreferenceAccumulator(flush_interval=60, max_pending=2)
+    accumulator.add(1, 1, 0.1)
+    assert not accumulator._flush_requested.is_set()
+    
+    accumulator.add(2, 1, 0.1)
+    assert accumulator._flush_requested.is_set()
+
+class FakeDB:
+    """Сессия, запоминающая выполненные запросы"""
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+    
+    async def execute(self, statement):
+        self.statements.append(statement)
+        return FakeResult()
+    
+    async def commit(self):
+        self.commits += 1
+
+class FakeResult:
+    def all(self):
+        return []
+
+async def test_write_skips_flush_lock(redis):
+    # Синхронная запись не ждет фоновый сброс и не трогает очередь
+    accumulator = PreferenceAccumulator(flush_interval=60, max_pending=100)
+    accumulator.add(2, 1, 0.1)
+    db = FakeDB()
+    
+    async with accumulator._flush_lock:
+        await asyncio.wait_for(accumulator.write(db, 1, 1, 0.2), timeout=1)
+    
+    assert db.commits == 1
+    assert "now()" in str(db.statements[-1]).lower()
+    assert list(accumulator._pending) == [(2, 1)]
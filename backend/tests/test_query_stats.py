@@ -0,0 +1,127 @@
+import logging
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import create_engine, text
+from ..config import settings
+from ..query_stats import (
+    QueryMetrics,
+    QueryStats,
+    QueryStatsMiddleware,
+    fingerprint,
+    get_query_metrics,
+    instrument_engine,
+    track_queries
+)
+
+@pytest.mark.parametrize("statement, expected", [
+    (
+        "SELECT bots.id, bots.name\nFROM bots\nWHERE bots.id = %s AND bots.name = 'x''y'",
+        "SELECT bots.id, bots.name FROM bots WHERE bots.id = ? AND bots.name = ?"
+    ),
+    (
+        "SELECT * FROM bots WHERE bots.id IN (%(id_1)s, %(id_2)s, %(id_3)s) LIMIT 10",
+        "SELECT * FROM bots WHERE bots.id IN (?+) LIMIT ?"
+    ),
+    (
+        "INSERT INTO analytics (user_id, event_type) VALUES (%s, %s), (%s, %s), (%s, %s)",
+        "INSERT INTO analytics (user_id, event_type) VALUES (?+), ..."
+    ),
+    (
+        "SELECT t1.id FROM t1 /* hint */ WHERE t1.created_at >= :since -- comment",
+        "SELECT t1.id FROM t1 WHERE t1.created_at >= ?"
+    )
+])
+def test_fingerprint(statement, expected):
+    assert fingerprint(statement) == expected
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    return engine
+
+def test_track_queries(engine):
+    with engine.connect() as connection:
+        with track_queries() as stats:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        # Вне блока запросы не учитываются
+        connection.execute(text("SELECT 3"))
+
+    assert stats.statements == 2
+    assert stats.duration >= stats.slowest_duration > 0
+    assert stats.slowest_statement in ("SELECT 1", "SELECT 2")
+    assert stats.server_timing().startswith('db;dur=')
+    assert 'desc="2 queries", db-slowest;dur=' in stats.server_timing()
+
+def test_failed_statement_does_not_break_timing(engine):
+    with engine.connect() as connection:
+        with track_queries() as stats:
+            with pytest.raises(Exception):
+                connection.execute(text("SELECT * FROM missing_table"))
+            connection.execute(text("SELECT 1"))
+        assert not connection.info.get("query_start_time")
+    assert stats.statements == 1
+
+def test_slow_query_log(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_THRESHOLD_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="backend.query_stats"):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 42"))
+    assert "Slow query" in caplog.text
+    assert "SELECT ?" in caplog.text
+
+def test_query_metrics_drain():
+    metrics = QueryMetrics()
+    metrics.record("GET", "/api/bots/{bot_id}", QueryStats(statements=3, duration=0.03, slowest_duration=0.02))
+    metrics.record("GET", "/api/bots/{bot_id}", QueryStats(statements=1, duration=0.01, slowest_duration=0.01))
+
+    assert metrics.drain() == {
+        ("GET", "/api/bots/{bot_id}"): {
+            "requests": 2,
+            "statements": 4,
+            "duration": pytest.approx(0.04),
+            "max_statements": 3,
+            "slowest": 0.02
+        }
+    }
+    assert metrics.drain() == {}
+
+async def test_middleware(engine):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    get_query_metrics().drain()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/items/5")
+
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    # Метки - шаблон пути, а не сам путь
+    assert get_query_metrics().drain()[("GET", "/items/{item_id}")]["statements"] == 2
+
+async def test_middleware_logs_slowest_statement(engine, monkeypatch, caplog):
+    monkeypatch.setattr(settings, "SQL_SLOW_REQUEST_THRESHOLD_MS", 0.000001)
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 42"))
+        return {"id": item_id}
+
+    with caplog.at_level(logging.WARNING, logger="backend.query_stats"):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            await client.get("/items/5")
+
+    assert "Slow SQL in GET /items/{item_id}: 1 queries" in caplog.text
+    assert "SELECT ?" in caplog.text
@@ -0,0 +1,115 @@
+import pytest
+import numpy as np
+from datetime import datetime, timedelta, timezone
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from .. import models, schemas
+from ..models.user_recommendation import UserRecommendation
+from ..services import recommendation_precompute, recommendation_service
+from ..services.cache_service import CacheService
+from ..services.recommendation_precompute import (
+    PRECOMPUTE_LOCK_KEY, _init_worker, _score_chunk, _seconds_until_next_run, run_precompute
+)
+from ..services.recommendation_service import RecommendationService
+from ..services.scoring_engine import ScoringEngine
+
+@pytest.fixture
+def catalog():
+    return (
+        np.array([1, 2, 3], dtype=np.int64),
+        np.array([1, 1, 2], dtype=np.int64),
+        np.array([4.0, 3.0, 3.5])
+    )
+
+def test_score_chunk_matches_engine(catalog):
+    # Расчет в процессе-исполнителе совпадает с ScoringEngine
+    _init_worker(*catalog)
+    engine = ScoringEngine()
+    engine.load_rows(zip(*(array.tolist() for array in catalog)))
+    chunk = [(10, {2: 1.0}), (11, {1: 0.5})]
+    
+    result = _score_chunk(chunk, limit=2)
+    
+    assert result == {
+        10: engine.top_k({2: 1.0}, 2),
+        11: engine.top_k({1: 0.5}, 2)
+    }
+    assert result[10] == [3, 1]
+
+def test_seconds_until_next_run(monkeypatch):
+    # Запуск в заданный час: сегодня, если час еще не наступил, иначе завтра
+    monkeypatch.setattr(recommendation_precompute.settings, "RECOMMENDATIONS_PRECOMPUTE_HOUR", 3)
+    
+    assert _seconds_until_next_run(datetime(2024, 1, 1, 1, 0, tzinfo=timezone.utc)) == 2 * 3600
+    assert _seconds_until_next_run(datetime(2024, 1, 1, 4, 0, tzinfo=timezone.utc)) == 23 * 3600
+
+async def test_lock_released_on_failure(redis, monkeypatch):
+    # После ошибки расчета блокировка снимается, после успеха остается
+    async def failing_run(self):
+        raise RuntimeError("boom")
+    monkeypatch.setattr(recommendation_precompute.RecommendationPrecomputeService, "run", failing_run)
+    
+    with pytest.raises(RuntimeError):
+        await run_precompute()
+    assert not await redis.exists(PRECOMPUTE_LOCK_KEY)
+    
+    async def run(self):
+        return {"users": 0}
+    monkeypatch.setattr(recommendation_precompute.RecommendationPrecomputeService, "run", run)
+    
+    assert await run_precompute() == {"users": 0}
+    assert await redis.exists(PRECOMPUTE_LOCK_KEY)
+    assert await run_precompute() is None
+
+async def test_precomputed_fallback(redis):
+    # Рекомендации из user_recommendations используются, пока они актуальны
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as conn:
+        await conn.run_sync(UserRecommendation.metadata.create_all, tables=[UserRecommendation.__table__])
+    computed_at = datetime(2024, 1, 1)
+    
+    async with async_sessionmaker(engine)() as db:
+        db.add(UserRecommendation(user_id=1, bot_ids=[3, 1, 2], computed_at=computed_at))
+        await db.commit()
+        service = RecommendationService(db)
+        
+        assert await service._get_precomputed_bot_ids(1, 2, computed_at - timedelta(hours=1)) == [3, 1]
+        assert await service._get_precomputed_bot_ids(1, 2, None) == [3, 1]
+        # Предпочтения изменились после расчета
+        assert await service._get_precomputed_bot_ids(1, 2, computed_at + timedelta(hours=1)) is None
+        # Рассчитано меньше, чем запрошено
+        assert await service._get_precomputed_bot_ids(1, 5, None) is None
+        assert await service._get_precomputed_bot_ids(2, 2, None) is None
+    await engine.dispose()
+
+async def test_precomputed_cache_respects_limit(redis, monkeypatch):
+    # Пакетный расчет на 2 бота используется только для limit=2
+    def make_bot(bot_id):
+        return models.Bot(id=bot_id, name=f"Bot {bot_id}", price=1.0, category_id=1, is_active=True, created_at=datetime(2024, 1, 1))
+
+    class FakeSession:
+        async def __aenter__(self):
+            return None
+
+        async def __aexit__(self, *args):
+            return False
+
+    computed = []
+    async def compute(self, user_id, limit, category_id):
+        computed.append(limit)
+        return [make_bot(bot_id) for bot_id in range(1, limit + 1)]
+    monkeypatch.setattr(recommendation_service, "AsyncSessionLocal", FakeSession)
+    monkeypatch.setattr(RecommendationService, "_compute_recommendations", compute)
+    
+    await CacheService().set_recommendations_many(
+        {1: [schemas.Bot.model_validate(make_bot(3)), schemas.Bot.model_validate(make_bot(1))]}, expire=60, limit=2
+    )
+    service = RecommendationService(None)
+    
+    assert [bot.id for bot in await service.get_recommendations(1, limit=2)] == [3, 1]
+    assert computed == []
+    
+    bots = await service.get_recommendations(1, limit=3)
+    assert [bot.id for bot in bots] == [1, 2, 3]
+    assert computed == [3]
+    # Рассчитанные рекомендации того же типа, что и из кэша
+    assert all(isinstance(bot, schemas.Bot) for bot in bots)
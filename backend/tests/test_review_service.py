@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import models
+from ..models.review import Review
+from ..schemas.review import ReviewCreate, ReviewUpdate
+from ..services import review_service
+from ..services.review_service import ReviewService
+
+class FakeScoringEngine:
+    def __init__(self):
+        self.bots = {}
+
+    def upsert_bot(self, bot_id, category_id, rating):
+        self.bots[bot_id] = rating
+
+@pytest.fixture
+async def db():
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[models.User.__table__, models.Category.__table__, models.Bot.__table__, Review.__table__]
+        )
+    async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+@pytest.fixture
+def scoring_engine(monkeypatch):
+    engine = FakeScoringEngine()
+    monkeypatch.setattr(review_service, "get_scoring_engine", lambda: engine)
+    return engine
+
+async def test_review_roundtrip(db, scoring_engine):
+    user = models.User(telegram_id=100)
+    bot = models.Bot(name="Helper", price=10.0)
+    db.add_all([user, bot])
+    await db.commit()
+    service = ReviewService(db)
+
+    review = await service.create_review(user.id, ReviewCreate(bot_id=bot.id, rating=4.2, comment="ok"))
+    assert review.rating == 4.0
+    assert not review.is_verified
+    with pytest.raises(ValueError):
+        await service.create_review(user.id, ReviewCreate(bot_id=bot.id, rating=5))
+    with pytest.raises(ValueError):
+        await service.create_review(user.id, ReviewCreate(bot_id=bot.id + 1, rating=5))
+
+    # Рейтинг бота считается только по подтвержденным отзывам
+    review.is_verified = True
+    await db.commit()
+    updated = await service.update_review(user.id, review.id, ReviewUpdate(rating=5))
+    assert updated.rating == 5.0
+    assert (await db.get(models.Bot, bot.id)).rating == 5.0
+    assert scoring_engine.bots == {bot.id: 5.0}
+
+    assert [r.id for r in await service.get_reviews(bot_id=bot.id, only_verified=True)] == [review.id]
+    await service.delete_review(user.id, review.id)
+    assert await service.get_reviews(bot_id=bot.id) == []
+    with pytest.raises(ValueError):
+        await service.delete_review(user.id, review.id)
@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+from ..services.scoring_engine import ScoringEngine
+
+@pytest.fixture
+def engine():
+    engine = ScoringEngine(refresh_interval=30, full_reload_interval=600)
+    engine.load_rows([
+        (1, 1, 4.0),
+        (2, 1, 3.0),
+        (3, 2, 3.5),
+        (4, 2, None),
+        (5, 3, 5.0)
+    ])
+    return engine
+
+def test_top_k_by_rating(engine):
+    # Без предпочтений боты упорядочены по рейтингу
+    assert engine.top_k({}, limit=3) == [5, 1, 3]
+
+def test_top_k_with_preferences(engine):
+    # Предпочтения увеличивают оценку ботов категории
+    # 3.5 * (1 + 1.0) = 7.0 > 5.0 > 4.0
+    assert engine.top_k({2: 1.0}, limit=3) == [3, 5, 1]
+
+def test_top_k_category_filter(engine):
+    assert engine.top_k({}, limit=10, category_id=2) == [3, 4]
+
+def test_top_k_offset(engine):
+    assert engine.top_k({}, limit=2, offset=2) == [3, 2]
+
+def test_upsert_and_remove(engine):
+    # Изменение рейтинга, добавление и удаление ботов
+    engine.upsert_bot(2, 1, 10.0)
+    engine.upsert_bot(6, 3, 6.0)
+    engine.remove_bot(5)
+    
+    assert len(engine) == 5
+    assert engine.top_k({}, limit=3) == [2, 6, 1]
+
+def test_matches_loop_scoring():
+    # Векторизованный расчет совпадает с построчным алгоритмом
+    rng = np.random.default_rng(0)
+    rows = [
+        (i, int(rng.integers(1, 20)), float(rng.uniform(1, 5)))
+        for i in range(1, 1001)
+    ]
+    preferences = {category_id: float(rng.uniform(0, 1)) for category_id in range(1, 20, 2)}
+    engine = ScoringEngine()
+    engine.load_rows(rows)
+    
+    scored = [
+        (bot_id, rating * (1.0 + preferences.get(category_id, 0.0)))
+        for bot_id, category_id, rating in rows
+    ]
+    scored.sort(key=lambda x: x[1], reverse=True)
+    
+    assert engine.top_k(preferences, limit=10) == [bot_id for bot_id, _ in scored[:10]]
\ No newline at end of file
@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from ..database import Base
+from .. import crud, models, schemas
+from ..services import search_index
+from ..services.search_index import SearchIndex, Tokenizer
+
+@pytest.fixture
+def index():
+    index = SearchIndex(refresh_interval=30, full_reload_interval=600)
+    index.load_rows([
+        (1, "Погода", "Прогноз погоды для вашего города", 1, True),
+        (2, "Переводчик", "Перевод текстов с английского на русский", 2, True),
+        (3, "Weather Bot", "Daily weather forecasts", 1, True),
+        (4, "Новости", "Свежие новости и прогноз погоды каждый день", 3, True),
+        (5, "Старый погодный бот", "Больше не работает", 1, False)
+    ])
+    return index
+
+def test_tokenizer_stems_russian_and_english():
+    pytest.importorskip("snowballstemmer")
+    tokenizer = Tokenizer()
+    assert tokenizer.tokens("Погоды, Ёлки") == tokenizer.tokens("погода елки")
+    assert tokenizer.tokens("forecasts") == tokenizer.tokens("forecast")
+
+def test_search_ranks_name_matches_first(index):
+    # Совпадение в названии весит больше совпадения в описании
+    hits = index.search("погода")
+    assert [bot_id for bot_id, _ in hits] == [1, 4]
+    assert hits[0][1] > hits[1][1] > 0
+
+def test_search_english(index):
+    assert [bot_id for bot_id, _ in index.search("weather")] == [3]
+
+def test_search_prefix(index):
+    # Недописанное последнее слово ищется по префиксу
+    assert [bot_id for bot_id, _ in index.search("перев")] == [2]
+    assert [bot_id for bot_id, _ in index.search("weath")] == [3]
+
+def test_search_category_filter_and_limit(index):
+    assert [bot_id for bot_id, _ in index.search("погода", category_id=3)] == [4]
+    assert len(index.search("прогноз", limit=1)) == 1
+
+def test_inactive_bots_not_indexed(index):
+    assert len(index) == 4
+    assert index.search("работает") == []
+
+def test_upsert_and_remove(index):
+    index.upsert_bot(2, "Погода и переводы", None, 2, True)
+    index.remove_bot(1)
+
+    assert index.search("переводчик") == []
+    assert [bot_id for bot_id, _ in index.search("погода")] == [2, 4]
+
+    # Деактивация убирает бота из поиска
+    index.upsert_bot(4, "Новости", "Прогноз погоды", 3, False)
+    assert [bot_id for bot_id, _ in index.search("погода")] == [2]
+
+def test_empty_query(index):
+    assert index.search("  ,. ") == []
+
+async def test_search_bots_loads_ranked_bots(monkeypatch):
+    monkeypatch.setattr(search_index, "_search_index", SearchIndex(refresh_interval=30, full_reload_interval=600))
+    engine = create_async_engine("sqlite+aiosqlite://")
+    async with engine.begin() as connection:
+        await connection.run_sync(
+            Base.metadata.create_all,
+            tables=[models.Category.__table__, models.Bot.__table__]
+        )
+    session = async_sessionmaker(engine, expire_on_commit=False)()
+    session.add(models.Category(id=1, name="Tools"))
+    session.add_all([
+        models.Bot(id=1, name="Прогноз", description="Погода на неделю", price=1.0, category_id=1),
+        models.Bot(id=2, name="Погода", description="Погода сейчас", price=1.0, category_id=1)
+    ])
+    await session.commit()
+
+    # Первый поиск загружает индекс из базы
+    hits = await crud.search_bots(session, "погода")
+    assert [(bot.id, bot.name) for bot, _ in hits] == [(2, "Погода"), (1, "Прогноз")]
+
+    # Изменение бота сразу отражается в индексе
+    await crud.update_bot(session, 2, schemas.BotUpdate(name="Погода", price=1.0, category_id=1, is_active=False))
+    assert [bot.id for bot, _ in await crud.search_bots(session, "погода")] == [1]
+    await session.close()
+    await engine.dispose()
@@ -0,0 +1,86 @@
+import pytest
+import numpy as np
+from ..services.similarity_index import UserSimilarityIndex
+
+@pytest.fixture
+def index():
+    index = UserSimilarityIndex(refresh_interval=60, full_reload_interval=3600, compaction_threshold=10)
+    index.build([
+        (1, 1, 1.0),
+        (1, 2, 1.0),
+        (2, 1, 1.0),
+        (2, 2, 0.9),
+        (3, 2, 1.0),
+        (4, 3, 1.0),
+        (5, 1, 0.0)
+    ])
+    return index
+
+def test_similar_users(index):
+    # Пользователь 4 не пересекается с 1, у пользователя 5 нет предпочтений
+    similar = index.similar(1, limit=5)
+    
+    assert [user_id for user_id, _ in similar] == [2, 3]
+    assert similar[0][1] == pytest.approx(0.9986, abs=1e-3)
+    assert len(index) == 4
+
+def test_similar_unknown_user(index):
+    assert index.similar(42) == []
+
+def test_update_user_overlay(index):
+    # Новый и измененный пользователи учитываются до перестроения матрицы
+    index.update_user(6, {1: 1.0, 2: 1.0})
+    index.update_user(3, {3: 1.0})
+    
+    assert [user_id for user_id, _ in index.similar(1, limit=5)] == [6, 2]
+    assert [user_id for user_id, _ in index.similar(4, limit=5)] == [3]
+
+def test_compaction_keeps_results(index):
+    index.update_user(6, {1: 1.0, 2: 1.0})
+    before = index.similar(1, limit=5)
+    index.compact()
+    after = index.similar(1, limit=5)
+    
+    assert [user_id for user_id, _ in after] == [user_id for user_id, _ in before]
+    assert [score for _, score in after] == pytest.approx([score for _, score in before], abs=1e-5)
+
+def test_batch_matches_single_queries():
+    # Блочный расчет совпадает с поштучными запросами и полным перебором
+    rng = np.random.default_rng(0)
+    rows = [
+        (user_id, int(category_id), float(rng.uniform(0.1, 1)))
+        for user_id in range(1, 301)
+        for category_id in rng.choice(30, size=4, replace=False)
+    ]
+    index = UserSimilarityIndex()
+    index.build(rows)
+    
+    dense = np.zeros((301, 30))
+    for user_id, category_id, score in rows:
+        dense[user_id, category_id] = score
+    dense[1:] /= np.linalg.norm(dense[1:], axis=1, keepdims=True)
+    
+    batch = index.similar_batch(range(1, 301), limit=5, block_size=16)
+    for user_id in (1, 150, 300):
+        scores = dense @ dense[user_id]
+        scores[user_id] = 0
+        expected = np.sort(scores)[::-1][:5]
+        
+        assert [score for _, score in batch[user_id]] == pytest.approx(expected, abs=1e-5)
+        single = index.similar(user_id, limit=5)
+        assert [score for _, score in single] == pytest.approx(expected, abs=1e-5)
+
+def test_batch_candidates_bounded():
+    # Из каждой категории берутся только пользователи с наибольшим весом
+    rows = [(user_id, 1, 0.1 * user_id) for user_id in range(1, 11)]
+    rows += [(user_id, 2, 1.0) for user_id in range(1, 11)]
+    rows += [(11, 3, 1.0)]
+    index = UserSimilarityIndex()
+    index.build(rows)
+    
+    batch = index.similar_batch([1, 11], limit=10, max_candidates=3)
+    
+    # Пользователь 1 сравнивается только с кандидатами категорий 1 и 2
+    assert len(batch[1]) <= 5
+    assert {user_id for user_id, _ in batch[1]} >= {8, 9, 10}
+    assert batch[11] == []
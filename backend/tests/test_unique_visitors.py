@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from ..services.unique_visitors import UniqueVisitorCounter, visitors_key
+
+async def test_unique_visitors(redis):
+    counter = UniqueVisitorCounter(retention_days=30)
+    today = datetime.utcnow().date()
+    yesterday = today - timedelta(days=1)
+    old_day = today - timedelta(days=60)
+
+    await counter.add_events([
+        {"user_id": 1, "event_type": "bot_view", "event_data": {"bot_id": 1}, "created_at": datetime.utcnow()},
+        {"user_id": 1, "event_type": "bot_view", "event_data": {"bot_id": 1}, "created_at": datetime.utcnow()},
+        {"user_id": 2, "event_type": "bot_view", "event_data": {"bot_id": 1}, "created_at": datetime.utcnow()},
+        {"user_id": 3, "event_type": "search", "event_data": {"query": "бот"}, "created_at": datetime.utcnow()},
+        # Анонимные события не учитываются
+        {"user_id": None, "event_type": "bot_view", "event_data": {"bot_id": 2}, "created_at": datetime.utcnow()}
+    ])
+    await counter.add(yesterday, 2, bot_id=1)
+    await counter.add(yesterday, 4, bot_id=1)
+
+    assert await counter.count_visitors(today, today) == 3
+    # Пользователь 2 был в оба дня и считается один раз
+    assert await counter.count_visitors(yesterday, today) == 4
+    assert await counter.count_bot_viewers(1, yesterday, today) == 3
+    assert await counter.count_bot_viewers(2, today, today) == 0
+    assert await counter.count_bot_viewers_by_day(1, [yesterday, today, old_day]) == {
+        yesterday: 2,
+        today: 2,
+        old_day: None
+    }
+    # Период старше срока хранения
+    assert await counter.count_visitors(old_day, today) is None
+    assert 0 < await counter.cache.redis.ttl(visitors_key(today)) <= 32 * 86400